@@ -1,12 +1,101 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./eagles_v3.db"
+# Settled freights and their transactions (services/archive.py)
+ARCHIVE_DATABASE_PATH = os.getenv("EAGLES_ARCHIVE_DB", "./eagles_archive.db")
+
+# Storage profile for the SQLite database.
+#
+# Every connection is opened through create_db_engine() and gets the pragmas
+# below. WAL lets reads run while a write is in progress, so a dashboard poll
+# no longer stalls behind a commit (or the other way around). Each connection
+# also attaches the archive database, with the same journal settings.
+#
+# Two engines share the file:
+#   engine       writes; a single connection, so concurrent writers queue in
+#                the pool (up to WRITE_TIMEOUT_SECONDS) instead of failing
+#                with "database is locked"
+#   read_engine  a pool of query_only connections for GET endpoints
+#                (get_read_db); an accidental write there raises
+#   async_read_engine
+#                the same, through aiosqlite, for async def endpoints
+#                (get_async_read_db); they wait on the database without
+#                taking a thread pool worker. Writes stay on the writer
+#
+# The writer manages its own transactions (BEGIN IMMEDIATE on first use)
+# instead of pysqlite's implicit BEGIN, which does not mix with SAVEPOINT;
+# services/writer.py relies on savepoints to group several units of work into
+# one commit.
+#
+# Hold the writer only for the unit of work: read through get_read_db and do
+# remote calls or file processing before taking it where possible.
+
+BUSY_TIMEOUT_MS = 5000
+WRITE_TIMEOUT_SECONDS = int(os.getenv("EAGLES_DB_WRITE_TIMEOUT", "30"))
+READ_POOL_SIZE = int(os.getenv("EAGLES_DB_READ_POOL", "8"))
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL", # durable at checkpoints; with WAL a crash never corrupts
+    "busy_timeout": BUSY_TIMEOUT_MS,
+    "cache_size": -16000, # KiB per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+def _apply_pragmas(read_only):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DATABASE_PATH,))
+        for name, value in PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        for name in ("journal_mode", "synchronous"):
+            cursor.execute(f"PRAGMA archive.{name} = {PRAGMAS[name]}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        else:
+            dbapi_connection.isolation_level = None # BEGIN comes from _begin_immediate
+        cursor.close()
+    return on_connect
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+def _begin_immediate(conn):
+    # Take the write lock up front: there is only one writer connection, so
+    # this never waits on the app itself, and a transaction that read first
+    # cannot fail later when it upgrades to a write
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def create_db_engine(url=SQLALCHEMY_DATABASE_URL, read_only=False, pool_size=1, pool_timeout=WRITE_TIMEOUT_SECONDS):
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000},
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=pool_timeout,
+    )
+    event.listen(engine, "connect", _apply_pragmas(read_only))
+    if not read_only:
+        event.listen(engine, "begin", _begin_immediate)
+    return engine
+
+engine = create_db_engine()
+read_engine = create_db_engine(read_only=True, pool_size=READ_POOL_SIZE)
+
+async_read_engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+    connect_args={"timeout": BUSY_TIMEOUT_MS / 1000},
+    pool_size=READ_POOL_SIZE,
+    max_overflow=0,
 )
+event.listen(async_read_engine.sync_engine, "connect", _apply_pragmas(True))
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+# Nothing is committed through it, so loaded objects may outlive the session
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 
 def get_db():
     db = SessionLocal()
@@ -14,3 +103,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+def checkpoint():
+    """Folds the WAL into the database files (before copying the *.db files)."""
+    # Outside a transaction, or SQLite cannot checkpoint
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        cursor.execute("PRAGMA archive.wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
@@ -3,15 +3,16 @@ from typing import List, Optional
 from routers.auth import get_current_user
 import models
 
+def has_permission(user: models.User, required_permission: str):
+    # Admin bypass
+    if user.role == "ADMIN":
+        return True
+    user_permissions = user.permissions.split(",") if user.permissions else []
+    return required_permission in user_permissions
+
 def check_permission(required_permission: str):
     def permission_checker(user: models.User = Depends(get_current_user)):
-        # Admin bypass
-        if user.role == "ADMIN":
-            return user
-        
-        # Check permission
-        user_permissions = user.permissions.split(",") if user.permissions else []
-        if required_permission not in user_permissions:
+        if not has_permission(user, required_permission):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Missing permission: {required_permission}"
@@ -0,0 +1,89 @@
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+# Application logging.
+#
+# Request handlers only put records on an in-memory queue; a background
+# QueueListener thread does the formatting and file I/O. Configure with:
+#   EAGLES_LOG_LEVEL=DEBUG|INFO|WARNING   (default INFO)
+#   EAGLES_LOG_SAMPLING="routers.dashboard=0.1,services.cache=0.05"
+#     keeps that fraction of DEBUG/INFO records per module; WARNING and
+#     above are always kept.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(BASE_DIR, "logs")
+LOG_FILE = os.path.join(LOG_DIR, "eagles.log")
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+QUEUE_SIZE = 10000
+
+_listener = None
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rates):
+        super().__init__()
+        # Longest prefix first so "routers.dashboard" wins over "routers"
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: records are dropped if the writer falls behind."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+def parse_sampling(value):
+    rates = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        name, rate = item.split("=", 1)
+        try:
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+def setup_logging():
+    global _listener
+    if _listener is not None:
+        return
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=5, encoding="utf-8"
+    )
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sampling(os.getenv("EAGLES_LOG_SAMPLING"))))
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("EAGLES_LOG_LEVEL", "INFO").upper())
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    _listener.start()
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
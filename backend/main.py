@@ -1,11 +1,16 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-import traceback
+import logging
 import os
 
-from routers import drivers, clients, freights, vehicles, vehicle_types, templates, auth, dashboard, financial, billing, backup, system
+from logging_config import setup_logging, shutdown_logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+from routers import drivers, clients, freights, vehicles, vehicle_types, templates, auth, dashboard, financial, billing, backup, system, imports, sync as sync_router
 import models, database
+from services import archive, cache, delays, events, excel_import, locations, media, migrations, projections, rollup, sync, writer
 
 app = FastAPI(title="Eagles Transportes API", version="1.0.0")
 
@@ -17,6 +22,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "Upload-Offset", "ETag"],
 )
 
 from static_config import mount_static
@@ -26,15 +32,25 @@ mount_static(app)
 async def catch_exceptions_middleware(request: Request, call_next):
     try:
         return await call_next(request)
-    except Exception as e:
-        log_path = r"c:\Users\Marcelo Kodrai\Documents\projetos_python\Eagles Transportes\backend\traceback_global.log"
-        with open(log_path, "w") as f:
-            f.write(f"GLOBAL ERROR: {e}\n")
-            traceback.print_exc(file=f)
+    except Exception:
+        logger.exception("GLOBAL ERROR on %s %s", request.method, request.url.path)
         return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
 
-# Create Tables
-models.Base.metadata.create_all(bind=database.engine)
+# Create or upgrade the schema (tables, columns, indexes, full-text index)
+migrations.upgrade(database.engine)
+
+# Keep derived columns/tables in step with freight writes.
+# Order matters: the rollup keys on the origin_state resolved by locations.
+locations.register(database.SessionLocal)
+rollup.register(database.SessionLocal)
+events.register(database.SessionLocal)
+sync.register(database.SessionLocal)
+cache.register(database.SessionLocal)
+
+# Journal consumers run in the background, woken by commits that wrote events
+events.subscribe(projections.runner.notify)
+# Recheck delays right after writes, not only on the next tick
+cache.dashboard_cache.subscribe(delays.job.notify)
 
 # Include Routers
 app.include_router(drivers.router)
@@ -49,6 +65,8 @@ app.include_router(financial.router)
 app.include_router(billing.router)
 app.include_router(backup.router)
 app.include_router(system.router)
+app.include_router(imports.router)
+app.include_router(sync_router.router)
 
 @app.on_event("startup")
 def seed_data():
@@ -133,7 +151,7 @@ Qualquer dúvida estou à disposição."""
             is_active=True,
             is_online=False
         ))
-        print("DEBUG: Seeded admin user")
+        logger.info("Seeded admin user")
         count += 1
     else:
         # Update admin password just in case
@@ -141,9 +159,40 @@ Qualquer dúvida estou à disposição."""
     
     if count > 0 or t_count > 0:
         db.commit()
+
+    # City reference table (from frontend/public/cities.json)
+    locations.ensure_cities(db)
+
+    # Backfill the daily rollup on first start
+    rollup.ensure_built(db)
+
+    # Spreadsheet import: default profile, and jobs cut short by a restart
+    excel_import.ensure_default_profile(db)
+    excel_import.mark_interrupted(db)
     
     db.close()
 
+    writer.write_queue.start()
+    projections.runner.start()
+    projections.runner.notify() # catch up on events written while stopped
+    delays.job.start()
+    delays.job.notify()
+    archive.job.start()
+    archive.job.notify() # first pass right away, then every ARCHIVE_CHECK_SECONDS
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    projections.runner.stop()
+    delays.job.stop()
+    archive.job.stop()
+    writer.write_queue.stop() # runs what is still queued
+    media.shutdown()
+    shutdown_logging()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await database.async_read_engine.dispose()
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
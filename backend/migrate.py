@@ -0,0 +1,25 @@
+import sys
+
+import database
+from services import migrations
+
+# Brings eagles_v3.db up to the current schema (services/migrations.py).
+# main.py does the same on start; run this to upgrade without starting the API.
+#   python migrate.py           apply pending migrations
+#   python migrate.py --status  list pending migrations only
+
+def main():
+    pending = migrations.pending(database.engine)
+    if not pending:
+        print("Schema is up to date.")
+        return
+    for version, name, _ in pending:
+        print(f"Pending: {version} {name}")
+    if "--status" in sys.argv:
+        return
+
+    applied = migrations.upgrade(database.engine)
+    print(f"Done. {len(applied)} migrations applied.")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Index, Table, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import relationship
 from datetime import datetime
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./eagles_v3.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engines and sessions live in database.py; the schema is built and upgraded
+# by services/migrations.py
 
 Base = declarative_base()
 
@@ -42,6 +38,10 @@ class Driver(Base):
     cnh_path = Column(String, nullable=True)
     address_proof_path = Column(String, nullable=True)
     crlv_path = Column(String, nullable=True)
+
+    # Delta sync (services/sync.py)
+    updated_at = Column(DateTime, nullable=True)
+    change_version = Column(Integer, nullable=True, index=True)
     
     freights = relationship("Freight", back_populates="driver")
 
@@ -68,11 +68,34 @@ class Client(Base):
     neighborhood = Column(String)
     city = Column(String)
     state = Column(String)
+
+    # Delta sync (services/sync.py)
+    updated_at = Column(DateTime, nullable=True)
+    change_version = Column(Integer, nullable=True, index=True)
     
     freights = relationship("Freight", back_populates="client")
 
+class City(Base):
+    __tablename__ = "cities"
+
+    # Reference list built from frontend/public/cities.json (IBGE names + UF)
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String) # e.g. "SAO PAULO"
+    name_key = Column(String, index=True) # Upper case, no accents - used for matching
+    state = Column(String, index=True) # UF
+
 class Freight(Base):
     __tablename__ = "freights"
+    __table_args__ = (
+        # Listing: every filter of GET /freights/ followed by the (pickup_date, id) keyset order
+        Index("ix_freights_pickup_date_id", "pickup_date", "id"),
+        Index("ix_freights_status_pickup_date_id", "status", "pickup_date", "id"),
+        Index("ix_freights_client_pickup_date_id", "client_id", "pickup_date", "id"),
+        Index("ix_freights_driver_pickup_date_id", "driver_id", "pickup_date", "id"),
+        Index("ix_freights_billing_status_pickup_date_id", "billing_status", "pickup_date", "id"),
+        # Ids are never reused, even after the newest rows are deleted or archived
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"))
@@ -81,6 +104,12 @@ class Freight(Base):
     origin = Column(String)
     destination = Column(String)
     pickup_date = Column(DateTime)
+
+    # Resolved from origin/destination at write time (services/locations.py)
+    origin_city_id = Column(Integer, ForeignKey("cities.id"), nullable=True, index=True)
+    origin_state = Column(String, nullable=True, index=True) # UF
+    destination_city_id = Column(Integer, ForeignKey("cities.id"), nullable=True, index=True)
+    destination_state = Column(String, nullable=True, index=True) # UF
     delivery_date = Column(DateTime)
     
     valor_motorista = Column(Float)
@@ -96,18 +125,117 @@ class Freight(Base):
     
     # Driver Acceptance & Delivery Logic
     rejection_reason = Column(String, nullable=True)
-    delivery_photos = Column(String, nullable=True) # JSON list of paths
+    delivery_photos = Column(String, nullable=True) # Legacy JSON list of paths; see Attachment
     accepted_at = Column(DateTime, nullable=True)
     delivered_at = Column(DateTime, nullable=True)
     
     # Billing / Boleto Info
     billing_status = Column(String, default="PENDING") # PENDING, ISSUED, PAID, CANCELLED
-    boleto_id = Column(String, nullable=True)
+    boleto_id = Column(String, nullable=True, index=True) # Asaas webhook lookup
     boleto_url = Column(String, nullable=True)
     boleto_expiry_date = Column(DateTime, nullable=True)
+
+    # Delta sync (services/sync.py)
+    updated_at = Column(DateTime, nullable=True)
+    change_version = Column(Integer, nullable=True, index=True)
     
     client = relationship("Client", back_populates="freights")
     driver = relationship("Driver", back_populates="freights")
+    attachments = relationship("Attachment", back_populates="freight", cascade="all, delete-orphan", order_by="Attachment.id")
+
+class Attachment(Base):
+    __tablename__ = "attachments"
+    __table_args__ = (
+        # Re-sending the same photo for a freight does not add it twice
+        UniqueConstraint("freight_id", "kind", "sha256", name="uq_attachments_freight_kind_sha256"),
+    )
+
+    # Files are stored by content hash under uploads/media (services/media.py)
+    id = Column(Integer, primary_key=True, index=True)
+    freight_id = Column(Integer, ForeignKey("freights.id"), index=True)
+    kind = Column(String, default="DELIVERY_PROOF")
+    sha256 = Column(String, index=True) # of the uploaded bytes
+    path = Column(String) # recompressed image, relative to backend/
+    thumb_path = Column(String)
+    original_filename = Column(String, nullable=True)
+    content_type = Column(String, default="image/jpeg")
+    width = Column(Integer)
+    height = Column(Integer)
+    size_bytes = Column(Integer)
+    created_at = Column(DateTime, default=datetime.now)
+
+    freight = relationship("Freight", back_populates="attachments")
+
+class FreightDailyRollup(Base):
+    __tablename__ = "freight_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("day", "status_bucket", "origin_state", "vehicle_type", name="uq_freight_daily_rollup_key"),
+    )
+
+    # Maintained by services/rollup.py on every freight write; rebuild with rebuild_rollup.py
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, index=True, nullable=False) # pickup day
+    status_bucket = Column(String, nullable=False) # QUOTED, ACTIVE, DELIVERED, REJECTED, OTHER
+    origin_state = Column(String, nullable=False) # UF, "Outros" or "N/A"
+    vehicle_type = Column(String, nullable=False) # Driver vehicle type or "Sem Veículo"
+
+    freight_count = Column(Integer, default=0)
+    revenue = Column(Float, default=0.0) # sum of valor_cliente
+    driver_cost = Column(Float, default=0.0) # sum of valor_motorista
+
+class FreightEvent(Base):
+    __tablename__ = "freight_events"
+
+    # Append-only journal of freight writes (services/events.py); id is the offset projections consume by
+    id = Column(Integer, primary_key=True, index=True)
+    freight_id = Column(Integer, index=True) # no FK: events outlive deleted freights
+    type = Column(String) # CREATED, UPDATED, DELETED, DELAYED
+    data = Column(String) # JSON: {"changes": {field: [old, new]}, "state": {...}}
+    created_at = Column(DateTime, default=datetime.now)
+
+class ProjectionOffset(Base):
+    __tablename__ = "projection_offsets"
+
+    name = Column(String, primary_key=True)
+    last_event_id = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class DriverStats(Base):
+    __tablename__ = "driver_stats"
+
+    # Projection of freight_events (services/projections.py)
+    driver_id = Column(Integer, primary_key=True)
+    assigned_count = Column(Integer, default=0)
+    accepted_count = Column(Integer, default=0)
+    rejected_count = Column(Integer, default=0)
+    delivered_count = Column(Integer, default=0)
+    delivered_revenue = Column(Float, default=0.0) # sum of valor_cliente
+    delivered_driver_pay = Column(Float, default=0.0) # sum of valor_motorista
+    last_delivered_at = Column(DateTime, nullable=True)
+
+class DelayedFreight(Base):
+    __tablename__ = "delayed_freights"
+
+    # Active freights past their delivery date, kept by services/delays.py
+    freight_id = Column(Integer, ForeignKey("freights.id"), primary_key=True)
+    detected_at = Column(DateTime, default=datetime.now, index=True)
+
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    # Single row (id=1): last change version handed out (services/sync.py)
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0)
+
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+
+    # Deleted freights/clients/drivers, so /sync can report deletions
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String, index=True) # freights, clients, drivers
+    entity_id = Column(Integer)
+    change_version = Column(Integer, index=True)
+    deleted_at = Column(DateTime, default=datetime.now)
 
 class FinancialCategory(Base):
     __tablename__ = "financial_categories"
@@ -120,6 +248,11 @@ class FinancialCategory(Base):
 
 class FinancialTransaction(Base):
     __tablename__ = "financial_transactions"
+    __table_args__ = (
+        # Date ranges (history, dashboard, export), optionally by INCOME/EXPENSE
+        Index("ix_financial_transactions_date_type", "date", "type"),
+        {"sqlite_autoincrement": True}, # as freights: archived ids stay unique
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String) # INCOME, EXPENSE
@@ -130,11 +263,50 @@ class FinancialTransaction(Base):
     status = Column(String, default="PENDING") # PAID, PENDING, OVERDUE
     
     # Optional relation to a freight (e.g. for automatic expense generation)
-    related_freight_id = Column(Integer, ForeignKey("freights.id"), nullable=True)
+    related_freight_id = Column(Integer, ForeignKey("freights.id"), nullable=True, index=True)
     
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+# Cold storage (services/archive.py): settled freights and their transactions,
+# moved to eagles_archive.db, which every connection attaches as "archive".
+# Same columns and ids as the hot tables, no foreign keys across databases.
+def _archive_table(table, *indexes):
+    columns = [Column(c.name, c.type, primary_key=c.primary_key) for c in table.columns]
+    return Table(table.name, Base.metadata, *columns, Column("archived_at", DateTime), *indexes, schema="archive")
+
+class ArchivedFreight(Base):
+    __table__ = _archive_table(
+        Freight.__table__,
+        Index("ix_archive_freights_pickup_date_id", "pickup_date", "id"),
+        Index("ix_archive_freights_client_pickup_date_id", "client_id", "pickup_date", "id"),
+        Index("ix_archive_freights_driver_pickup_date_id", "driver_id", "pickup_date", "id"),
+    )
+
+    # Read-only, so archived rows render through schemas.Freight like hot ones
+    client = relationship("Client", primaryjoin="foreign(ArchivedFreight.client_id) == Client.id", viewonly=True)
+    driver = relationship("Driver", primaryjoin="foreign(ArchivedFreight.driver_id) == Driver.id", viewonly=True)
+    attachments = relationship(
+        "Attachment", primaryjoin="ArchivedFreight.id == foreign(Attachment.freight_id)",
+        viewonly=True, order_by="Attachment.id",
+    )
+
+class ArchivedTransaction(Base):
+    __table__ = _archive_table(
+        FinancialTransaction.__table__,
+        Index("ix_archive_financial_transactions_date_type", "date", "type"),
+        Index("ix_archive_financial_transactions_related_freight_id", "related_freight_id"),
+    )
+
+class ArchiveState(Base):
+    __tablename__ = "archive_state"
+
+    # Single row (id=1): newest pickup_date / transaction date moved so far
+    id = Column(Integer, primary_key=True)
+    freights_until = Column(DateTime, nullable=True)
+    transactions_until = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, nullable=True)
+
 class Quotation(BaseModel if False else Base): # Hack to avoid linter confusion if needed, but standard Base is fine
     __tablename__ = "quotations"
     
@@ -174,4 +346,61 @@ class SystemSetting(Base):
     value = Column(String)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
-Base.metadata.create_all(bind=engine)
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    # Resumable delivery proof upload (services/resumable.py); offsets are the part file sizes
+    id = Column(String, primary_key=True) # opaque token
+    freight_id = Column(Integer, ForeignKey("freights.id"), index=True)
+    parts = Column(String) # JSON list of {"filename", "size"}
+    status = Column(String, default="OPEN") # OPEN, COMPLETED
+    result = Column(String, nullable=True) # JSON response of finalize
+    created_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, index=True)
+
+class ImportProfile(Base):
+    __tablename__ = "import_profiles"
+
+    # Column mapping for spreadsheet imports (services/excel_import.py)
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    sheet = Column(String, nullable=True) # None = first sheet
+    header_row = Column(Integer, default=1)
+    columns = Column(String) # JSON: field -> header text
+    status_map = Column(String, nullable=True) # JSON: sheet status -> freight status
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    profile_id = Column(Integer, ForeignKey("import_profiles.id"))
+    filename = Column(String)
+    file_path = Column(String)
+    status = Column(String, default="PENDING") # PENDING, RUNNING, DONE, FAILED, INTERRUPTED
+
+    # Last sheet row committed; a resumed job starts after it
+    checkpoint_row = Column(Integer, default=0)
+    total_rows = Column(Integer, nullable=True)
+    processed_rows = Column(Integer, default=0)
+    inserted = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    errors = Column(String, nullable=True) # JSON list of {"row", "message"}
+    message = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    profile = relationship("ImportProfile")
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    # One row per applied step of services/migrations.py
+    version = Column(Integer, primary_key=True)
+    name = Column(String)
+    applied_at = Column(DateTime, default=datetime.now)
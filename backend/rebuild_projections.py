@@ -0,0 +1,19 @@
+from database import SessionLocal
+import models
+from services import migrations, projections
+
+# Replays freight_events from the start into every projection (driver_stats).
+# Run after changing a projection's logic or restoring a backup.
+
+def main():
+    print("Rebuilding projections from freight_events...")
+    db = SessionLocal()
+    try:
+        migrations.upgrade(db.get_bind())
+        events = projections.rebuild(db)
+        print(f"Done. {events} events replayed.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
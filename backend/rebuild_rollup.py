@@ -0,0 +1,20 @@
+from database import SessionLocal
+import models
+from services import migrations, rollup
+
+# Recomputes freight_daily_rollup from the freights table.
+# Run after restoring a backup or editing freights outside the API.
+
+def main():
+    print("Rebuilding freight_daily_rollup...")
+    db = SessionLocal()
+    try:
+        migrations.upgrade(db.get_bind())
+        groups = rollup.rebuild(db)
+        rows = db.query(models.FreightDailyRollup).count()
+        print(f"Done. {groups} freight groups -> {rows} rollup rows.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
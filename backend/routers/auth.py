@@ -4,9 +4,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_read_db, get_db, get_read_db
 import models, schemas
+from services import writer
 
 # Configuration
 SECRET_KEY = "eagles_transportes_secret_key_change_me_in_production"
@@ -36,8 +39,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+LAST_SEEN_INTERVAL = timedelta(minutes=1)
+
+def _mark_online(user_id):
+    # Queued to the writer without waiting: the request may not need the
+    # writer at all, and may already hold it through get_db
+    seen = datetime.now()
+    def work(db):
+        db.query(models.User).filter(models.User.id == user_id).update(
+            {"last_seen": seen, "is_online": True}, synchronize_session=False
+        )
+    writer.submit(work)
+
 # Dependencies
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_authenticated_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_read_db)):
+    """The token's user, without the online mark of get_current_user (for /logout)."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -52,14 +68,16 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+    # Runs on every authenticated request: on the event loop, not a pool thread
+    user = await db.scalar(select(models.User).where(models.User.username == token_data.username))
     if user is None:
         raise credentials_exception
-    
-    # Update online status
-    user.last_seen = datetime.now()
-    user.is_online = True
-    db.commit()
+    return user
+
+async def get_current_user(user: models.User = Depends(get_authenticated_user)):
+    # Update online status (at most once a minute per user)
+    if not user.is_online or user.last_seen is None or datetime.now() - user.last_seen > LAST_SEEN_INTERVAL:
+        _mark_online(user.id)
     
     return user
 
@@ -97,9 +115,12 @@ def login_for_access_token(form_data: schemas.LoginData, db: Session = Depends(g
     return {"access_token": access_token, "token_type": "bearer", "user": user}
 
 @router.post("/logout")
-def logout(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    current_user.is_online = False
-    db.commit()
+def logout(current_user: models.User = Depends(get_authenticated_user)):
+    # Through the writer queue, so it lands after any online mark an earlier
+    # request queued; this request queues none
+    def work(db):
+        db.query(models.User).filter(models.User.id == current_user.id).update({"is_online": False}, synchronize_session=False)
+    writer.run(work)
     return {"message": "Successfully logged out"}
 
 @router.get("/users/me", response_model=schemas.User)
@@ -109,7 +130,7 @@ def read_users_me(current_user: models.User = Depends(get_current_active_user)):
 # User Management (Admin Only)
 
 @router.get("/users/", response_model=List[schemas.User])
-def read_users(db: Session = Depends(get_db), current_user: models.User = Depends(get_admin_user)):
+def read_users(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_admin_user)):
     return db.query(models.User).all()
 
 @router.post("/users/", response_model=schemas.User)
@@ -4,6 +4,8 @@ import os
 from datetime import datetime
 import glob
 
+import database
+
 router = APIRouter(
     prefix="/backup",
     tags=["backup"]
@@ -26,6 +28,8 @@ def create_backup():
         # 1. Backup DB
         # Find the actual DB file. It might be eagles.db or eagles_v2.db
         # I'll check what exists.
+        # Recent commits may still be in the WAL file; fold them in first
+        database.checkpoint()
         db_files = glob.glob(os.path.join(BASE_DIR, "*.db"))
         for db_file in db_files:
             shutil.copy2(db_file, backup_dir)
@@ -78,6 +82,7 @@ def restore_backup(backup_id: str):
         # We try to copy over. If it fails, we assume it's locked.
         
         db_files = glob.glob(os.path.join(source_dir, "*.db"))
+        database.checkpoint()
         for src_db in db_files:
             filename = os.path.basename(src_db)
             dst_db = os.path.join(BASE_DIR, filename)
@@ -85,6 +90,10 @@ def restore_backup(backup_id: str):
             # Try atomic replace if possible, or simple copy
             try:
                 shutil.copy2(src_db, dst_db)
+                # A WAL left over from the replaced database must not be replayed onto the backup
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(dst_db + suffix):
+                        os.remove(dst_db + suffix)
             except PermissionError:
                  raise HTTPException(status_code=400, detail="O banco de dados está em uso e não pode ser substituído agora. Pare o servidor para restaurar.")
         
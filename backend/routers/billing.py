@@ -1,19 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 import requests
 import os
 import json
+import logging
 from datetime import datetime, timedelta
 
-from database import get_db
+from database import get_async_read_db, get_db, get_read_db
 import models
 from routers.auth import get_current_user
+from services import archive, loaders, writer
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/billing",
     tags=["billing"]
@@ -21,6 +27,8 @@ router = APIRouter(
 
 # Default to Sandbox if not specified
 DEFAULT_ASAAS_API_URL = "https://sandbox.asaas.com/api/v3"
+# (connect, read) seconds for every Asaas call
+ASAAS_TIMEOUT = (5, 30)
 
 def get_asaas_config(db_session=None):
     if not db_session:
@@ -70,13 +78,13 @@ def get_or_create_customer(client: models.Client, db: Session):
 
     search_url = f"{api_url}/customers?cpfCnpj={cpf_cnpj}"
     try:
-        res = requests.get(search_url, headers=get_headers(db))
+        res = requests.get(search_url, headers=get_headers(db), timeout=ASAAS_TIMEOUT)
         if res.status_code == 200:
             data = res.json()
             if data.get("data"):
                 return data["data"][0]["id"]
     except Exception as e:
-        print(f"Error searching customer: {e}")
+        logger.warning("Error searching customer: %s", e)
 
     # 2. Create if not found
     payload = {
@@ -93,7 +101,7 @@ def get_or_create_customer(client: models.Client, db: Session):
     
     
     try:
-        res = requests.post(f"{api_url}/customers", headers=get_headers(db), json=payload)
+        res = requests.post(f"{api_url}/customers", headers=get_headers(db), json=payload, timeout=ASAAS_TIMEOUT)
         if res.status_code == 200:
             return res.json()["id"]
         elif res.status_code == 400:
@@ -109,12 +117,12 @@ def get_or_create_customer(client: models.Client, db: Session):
     raise HTTPException(status_code=500, detail="Falha desconhecida ao obter cliente Asaas")
 
 @router.get("/pending", response_model=List[dict])
-def get_pending_billing(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def get_pending_billing(db: AsyncSession = Depends(get_async_read_db), current_user: models.User = Depends(get_current_user)):
     # Freights that are DELIVERED but billing_status is PENDING or None
-    freights = db.query(models.Freight).filter(
+    freights = (await db.scalars(select(models.Freight).options(*loaders.freight_with_client()).where(
         models.Freight.status == "DELIVERED",
         (models.Freight.billing_status == "PENDING") | (models.Freight.billing_status == None)
-    ).all()
+    ))).all()
     
     # Return simplified list
     return [{
@@ -127,12 +135,11 @@ def get_pending_billing(db: Session = Depends(get_db), current_user: models.User
     } for f in freights]
 
 @router.get("/issued", response_model=List[dict])
-def get_issued_billing(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    # Freights with generated boletos
-    freights = db.query(models.Freight).filter(
-        models.Freight.billing_status.in_(["ISSUED", "PAID", "OVERDUE", "RECEIVED", "CONFIRMED"])
-    ).all()
-    
+async def get_issued_billing(db: AsyncSession = Depends(get_async_read_db), current_user: models.User = Depends(get_current_user)):
+    # Freights with generated boletos; paid ones a year old come from the
+    # archive (services/archive.py), which run_sync reads over aiosqlite
+    freights = await db.run_sync(_issued_freights)
+
     return [{
         "id": f.id,
         "client_name": f.client.name,
@@ -145,9 +152,16 @@ def get_issued_billing(db: Session = Depends(get_db), current_user: models.User
         "boleto_expiry": f.boleto_expiry_date
     } for f in freights]
 
+def _issued_freights(db: Session):
+    def build(F):
+        return db.query(F).options(*loaders.freight_with_client(F)).filter(
+            F.billing_status.in_(["ISSUED", "PAID", "OVERDUE", "RECEIVED", "CONFIRMED"])
+        )
+    return archive.freights(db, build, archive.freights_reach(db, billing_status="PAID"))
+
 @router.post("/emit/{freight_id}")
-def emit_boleto(freight_id: int, req: BoletoRequest, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    freight = db.query(models.Freight).filter(models.Freight.id == freight_id).first()
+def emit_boleto(freight_id: int, req: BoletoRequest, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
+    freight = db.query(models.Freight).options(*loaders.freight_with_client()).filter(models.Freight.id == freight_id).first()
     if not freight:
         raise HTTPException(status_code=404, detail="Frete não encontrado")
     
@@ -157,7 +171,9 @@ def emit_boleto(freight_id: int, req: BoletoRequest, db: Session = Depends(get_d
     if not freight.client:
         raise HTTPException(status_code=400, detail="Frete sem cliente associado")
 
-    # 1. Get Customer ID with DB session
+    # Asaas is asked first (like /billing/sync): the writer connection is only
+    # taken for the updates at the end, never held across the HTTP calls
+    # 1. Get Customer ID
     customer_id = get_or_create_customer(freight.client, db)
     
     # 2. Create Payment (Boleto)
@@ -171,36 +187,39 @@ def emit_boleto(freight_id: int, req: BoletoRequest, db: Session = Depends(get_d
         "postalService": False 
     }
     
+    api_key, api_url = get_asaas_config(db)
     try:
-        api_key, api_url = get_asaas_config(db)
-        res = requests.post(f"{api_url}/payments", headers=get_headers(db), json=payload)
-        if res.status_code == 200:
-            data = res.json()
-            
-            # Update Freight
-            freight.boleto_id = data["id"]
-            freight.boleto_url = data["bankSlipUrl"]
-            freight.boleto_expiry_date = datetime.strptime(req.due_date, "%Y-%m-%d")
-            freight.billing_status = "ISSUED"
-            
-            # Also Create a Financial Transaction (Receivable)
-            transaction = models.FinancialTransaction(
-                type="INCOME",
-                category="Frete",
-                description=f"Faturamento Frete #{freight.id} - {freight.client.name}",
-                amount=req.value,
-                date=datetime.now(),
-                status="PENDING",
-                related_freight_id=freight.id
-            )
-            db.add(transaction)
-            
-            db.commit()
-            return {"success": True, "boleto_url": data["bankSlipUrl"]}
-        else:
-            raise HTTPException(status_code=400, detail=f"Erro Asaas: {res.text}")
-    except Exception as e:
+        res = requests.post(f"{api_url}/payments", headers=get_headers(db), json=payload, timeout=ASAAS_TIMEOUT)
+    except requests.RequestException as e:
         raise HTTPException(status_code=500, detail=f"Erro de conexão: {str(e)}")
+    if res.status_code != 200:
+        raise HTTPException(status_code=400, detail=f"Erro Asaas: {res.text}")
+    data = res.json()
+    client_name = freight.client.name
+
+    def work(wdb):
+        freight = wdb.get(models.Freight, freight_id)
+        if freight is None:
+            raise HTTPException(status_code=404, detail="Frete não encontrado")
+
+        # Update Freight
+        freight.boleto_id = data["id"]
+        freight.boleto_url = data["bankSlipUrl"]
+        freight.boleto_expiry_date = datetime.strptime(req.due_date, "%Y-%m-%d")
+        freight.billing_status = "ISSUED"
+        
+        # Also Create a Financial Transaction (Receivable)
+        wdb.add(models.FinancialTransaction(
+            type="INCOME",
+            category="Frete",
+            description=f"Faturamento Frete #{freight_id} - {client_name}",
+            amount=req.value,
+            date=datetime.now(),
+            status="PENDING",
+            related_freight_id=freight_id
+        ))
+    writer.run(work)
+    return {"success": True, "boleto_url": data["bankSlipUrl"]}
 
 
 # Settings Endpoints
@@ -210,7 +229,7 @@ class AsaasSettings(BaseModel):
     environment: str # 'SANDBOX' or 'PRODUCTION'
 
 @router.get("/config")
-def get_asaas_settings(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_asaas_settings(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     key, url = get_asaas_config(db)
     env = "PRODUCTION" if "api.asaas.com" in url else "SANDBOX"
     # Obfuscate key for security
@@ -222,7 +241,7 @@ class WebhookEvent(BaseModel):
     payment: dict
 
 @router.post("/webhook")
-def asaas_webhook(event: WebhookEvent, db: Session = Depends(get_db)):
+def asaas_webhook(event: WebhookEvent):
     """Receives and processes Asaas webhooks"""
     payment_id = event.payment.get("id")
     status_map = {
@@ -234,7 +253,7 @@ def asaas_webhook(event: WebhookEvent, db: Session = Depends(get_db)):
     
     new_status = status_map.get(event.event)
     
-    if new_status and payment_id:
+    def work(db):
         freight = db.query(models.Freight).filter(models.Freight.boleto_id == payment_id).first()
         if freight:
             freight.billing_status = new_status
@@ -245,34 +264,39 @@ def asaas_webhook(event: WebhookEvent, db: Session = Depends(get_db)):
                 if transaction:
                     transaction.status = "COMPLETED"
                     transaction.date = datetime.now() # Update to actual payment date?
-            
-            db.commit()
+    
+    if new_status and payment_id:
+        writer.run(work)
     
     return {"received": True}
 
 @router.post("/sync")
-def sync_billing_status(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def sync_billing_status(
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
     """Manually updates status from Asaas"""
-    api_key, api_url = get_asaas_config(db)
+    api_key, api_url = get_asaas_config(read_db)
     headers = {"access_token": api_key}
     
     # Get all non-finalized freights that have a boleto
-    freights = db.query(models.Freight).filter(
+    freights = read_db.query(models.Freight.id, models.Freight.boleto_id, models.Freight.billing_status).filter(
         models.Freight.billing_status.in_(["ISSUED", "OVERDUE", "PENDING"]),
         models.Freight.boleto_id != None
     ).all()
     
-    updated_count = 0
-    
-    for f in freights:
+    # Ask Asaas first; the writer connection is only taken for the updates
+    changes = {}
+    for freight_id, boleto_id, billing_status in freights:
         try:
-            res = requests.get(f"{api_url}/payments/{f.boleto_id}", headers=headers)
+            res = requests.get(f"{api_url}/payments/{boleto_id}", headers=headers, timeout=ASAAS_TIMEOUT)
             if res.status_code == 200:
                 data = res.json()
                 asaas_status = data.get("status")
                 
                 # Map Asaas -> Local
-                new_status = f.billing_status
+                new_status = billing_status
                 if asaas_status in ["RECEIVED", "CONFIRMED"]:
                     new_status = "PAID"
                 elif asaas_status == "OVERDUE":
@@ -281,22 +305,23 @@ def sync_billing_status(db: Session = Depends(get_db), current_user: models.User
                     # Check duplicate logic if needed, otherwise stay ISSUED/PENDING
                     new_status = "ISSUED" 
                 
-                if new_status != f.billing_status:
-                    f.billing_status = new_status
-                    
-                    # Update transaction if PAID
-                    if new_status == "PAID":
-                        transaction = db.query(models.FinancialTransaction).filter(models.FinancialTransaction.related_freight_id == f.id).first()
-                        if transaction:
-                            transaction.status = "COMPLETED"
-                            
-                    updated_count += 1
+                if new_status != billing_status:
+                    changes[freight_id] = new_status
         except Exception as e:
-            print(f"Error syncing freight {f.id}: {e}")
+            logger.warning("Error syncing freight %s: %s", freight_id, e)
             continue
+    
+    for f in db.query(models.Freight).filter(models.Freight.id.in_(changes)).all():
+        f.billing_status = changes[f.id]
+        
+        # Update transaction if PAID
+        if f.billing_status == "PAID":
+            transaction = db.query(models.FinancialTransaction).filter(models.FinancialTransaction.related_freight_id == f.id).first()
+            if transaction:
+                transaction.status = "COMPLETED"
             
     db.commit()
-    return {"message": f"Sincronização concluída. {updated_count} boletos atualizados."}
+    return {"message": f"Sincronização concluída. {len(changes)} boletos atualizados."}
 
 @router.post("/config")
 def update_asaas_settings(settings: AsaasSettings, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
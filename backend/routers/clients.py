@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
+import logging
 import models, schemas
-from database import get_db
+from database import get_db, get_read_db
+from services import sync
 
-print("DEBUG: ROUTERS CLIENTS LOADED", flush=True)
-print("DEBUG: Schemas file:", schemas.__file__, flush=True)
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
@@ -14,7 +15,7 @@ def create_client(client: schemas.ClientCreate, db: Session = Depends(get_db)):
     try:
         data = client.dict()
         if 'address' in data:
-            print("DEBUG: Removing phantom address field", flush=True)
+            logger.debug("Removing phantom address field")
             del data['address']
         
         db_client = models.Client(**data)
@@ -22,21 +23,20 @@ def create_client(client: schemas.ClientCreate, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(db_client)
         return db_client
-    except Exception as e:
-        import traceback
-        log_path = r"c:\Users\Marcelo Kodrai\Documents\projetos_python\Eagles Transportes\backend\traceback.log"
-        with open(log_path, "w") as f:
-            f.write(f"CRITICAL ERROR: {e}\n")
-            traceback.print_exc(file=f)
-        raise e
+    except Exception:
+        logger.exception("CRITICAL ERROR creating client")
+        raise
 
 @router.get("/", response_model=List[schemas.Client])
-def read_clients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_clients(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    cached = sync.not_modified(db, request, response)
+    if cached:
+        return cached
     clients = db.query(models.Client).offset(skip).limit(limit).all()
     return clients
 
 @router.get("/{client_id}", response_model=schemas.Client)
-def read_client(client_id: int, db: Session = Depends(get_db)):
+def read_client(client_id: int, db: Session = Depends(get_read_db)):
     client = db.query(models.Client).filter(models.Client.id == client_id).first()
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
@@ -1,148 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict, Any
+from sqlalchemy import func, case, and_, or_
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+import asyncio
+import json
 import models, schemas
-from database import get_db
-from collections import defaultdict
+from database import ReadSessionLocal, get_async_read_db, get_read_db
+from services import archive, delays, loaders, rollup
+from services.cache import dashboard_cache
+from services.pagination import set_page_headers
+from services.live import DashboardHub
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+ACTIVE_STATUSES = rollup.ACTIVE_STATUSES
+
 @router.get("/stats")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    def log_debug(msg):
-        with open("debug_dashboard_runtime.txt", "a", encoding="utf-8") as f:
-            f.write(f"{datetime.now()}: {msg}\n")
-            
-    log_debug("---/stats called---")
+async def get_dashboard_stats(db: AsyncSession = Depends(get_async_read_db)):
+    # Hits never leave the event loop; a miss runs the queries over aiosqlite
+    return await dashboard_cache.get_or_compute_async(("stats",), lambda: db.run_sync(build_dashboard_stats))
+
+@router.get("/cache")
+def get_dashboard_cache_stats():
+    return {**dashboard_cache.stats(), "live_subscribers": live_hub.subscriber_count}
+
+def _live_snapshot():
+    db = ReadSessionLocal()
+    try:
+        return jsonable_encoder(dashboard_cache.get_or_compute(("stats",), lambda: build_dashboard_stats(db)))
+    finally:
+        db.close()
+
+live_hub = DashboardHub(_live_snapshot)
+dashboard_cache.subscribe(live_hub.notify)
+
+SSE_KEEPALIVE_SECONDS = 15
+
+@router.get("/stream")
+async def stream_dashboard(request: Request):
+    """Server-Sent Events: one "snapshot" on connect, then "delta" events with changed parts only."""
+    queue = await live_hub.subscribe()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+        finally:
+            live_hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def build_dashboard_stats(db: Session):
     now = datetime.now()
     start_of_month = datetime(now.year, now.month, 1)
-    
-    # 1. KPIs
-    
-    # Monthly Revenue (Faturamento)
-    # Filter: pickup_date in current month, status NOT REJECTED or QUOTED
-    revenue_query = db.query(func.sum(models.Freight.valor_cliente)).filter(
-        models.Freight.pickup_date >= start_of_month,
-        models.Freight.status.notin_(['REJECTED', 'QUOTED'])
-    ).scalar()
-    
-    monthly_revenue = revenue_query or 0.0
-
-    # Monthly Driver Cost (Pagamento Motoristas)
-    # Filter: pickup_date in current month, status NOT REJECTED or QUOTED
-    cost_query = db.query(func.sum(models.Freight.valor_motorista)).filter(
-        models.Freight.pickup_date >= start_of_month,
-        models.Freight.status.notin_(['REJECTED', 'QUOTED'])
-    ).scalar()
-    
-    monthly_driver_cost = cost_query or 0.0
-
-    # Active Freights
-    active_statuses = ['RECRUITING', 'ASSIGNED', 'IN_TRANSIT', 'LOADING']
-    active_count = db.query(models.Freight).filter(models.Freight.status.in_(active_statuses)).count()
-
-    # Deliveries Today
     today_start = datetime(now.year, now.month, now.day)
     today_end = today_start + timedelta(days=1)
-    deliveries_today_count = db.query(models.Freight).filter(
-        models.Freight.delivery_date >= today_start,
-        models.Freight.delivery_date < today_end,
-        models.Freight.status != 'REJECTED'
-    ).count()
-
-    # Delays (Atrasos)
-    # Active freights where delivery_date < now
-    delayed_count = db.query(models.Freight).filter(
-        models.Freight.status.in_(active_statuses),
-        models.Freight.delivery_date < now
-    ).count()
+    three_months_ago = now - timedelta(days=90)
+
+    R = models.FreightDailyRollup
+    billable_buckets = R.status_bucket.notin_(['REJECTED', 'QUOTED'])
+
+    # 1. KPIs
+    # Revenue and driver cost come from the daily rollup (status NOT REJECTED or QUOTED)
+    monthly_revenue, monthly_driver_cost = db.query(func.sum(R.revenue), func.sum(R.driver_cost)).filter(
+        R.day >= start_of_month.date(),
+        billable_buckets
+    ).one()
+
+    # Active and today counts - one round trip with conditional aggregates
+    F = models.Freight
+    active = F.status.in_(ACTIVE_STATUSES)
+    due_today = and_(F.delivery_date >= today_start, F.delivery_date < today_end, F.status != 'REJECTED')
+
+    active_count, deliveries_today_count = db.query(
+        func.count(case((active, 1))),
+        func.count(case((due_today, 1))),
+    ).filter(or_(active, due_today)).one()
+
+    # Kept up to date in the background (services/delays.py)
+    delayed_count = delays.delayed_count(db)
 
     # 2. Recent Freights (Table)
     # Get 5 most recent active freights, ordered by pickup date
-    recent_freights = db.query(models.Freight).filter(
+    recent_freights = db.query(models.Freight).options(*loaders.freight_full()).filter(
         models.Freight.status.notin_(['QUOTED', 'REJECTED', 'DELIVERED'])
     ).order_by(models.Freight.pickup_date.asc()).limit(5).all()
-    
-    # 3. Analytics (Charts)
-    
-    # Freights by Origin State
-    # We need to fetch all active/delivered freights to analyze patterns
-    # Limit to last 3 months for relevance
-    three_months_ago = now - timedelta(days=90)
-    analytics_freights = db.query(models.Freight).filter(
-        models.Freight.pickup_date >= three_months_ago,
-        models.Freight.status.notin_(['QUOTED', 'REJECTED'])
-    ).all()
-    
-    state_counts = defaultdict(int)
-    log_debug(f"Analytics loop start. Count: {len(analytics_freights)}")
-    
-    for f in analytics_freights:
-        # Default bucket
-        bucket = "N/A"
-        
-        if f.origin:
-            try:
-                # Normalization
-                raw = f.origin.strip()
-                parsed_state = None
-                
-                # Logic: Split by dash or comma
-                if "-" in raw:
-                    parts = raw.split("-")
-                    parsed_state = parts[-1].strip().upper()
-                elif "," in raw:
-                    parts = raw.split(",")
-                    parsed_state = parts[-1].strip().upper()
-                
-                # Validation
-                if parsed_state:
-                    if len(parsed_state) == 2:
-                        bucket = parsed_state
-                    elif len(parsed_state) < 4:
-                         bucket = parsed_state
-                    else:
-                        bucket = "Outros"
-                else:
-                    bucket = "Outros"
-            except Exception as e:
-                log_debug(f"Error parsing origin '{f.origin}': {e}")
-                bucket = "Outros"
-        
-        state_counts[bucket] += 1
-        log_debug(f"Freight {f.id} ('{f.origin}') -> {bucket}")
-
-    log_debug(f"Final State Counts: {dict(state_counts)}")
-    freights_by_state = [{"name": k, "value": v} for k, v in state_counts.items()]
+
+    # 3. Analytics (Charts) - last 3 months of the rollup
+    window = (R.day >= three_months_ago.date(), billable_buckets)
+
+    state_rows = db.query(R.origin_state, func.sum(R.freight_count)).filter(*window).group_by(R.origin_state).all()
+    freights_by_state = [{"name": k, "value": v} for k, v in state_rows]
     freights_by_state.sort(key=lambda x: x['value'], reverse=True)
 
-    # Freights by Vehicle Type
-    # Join with Driver
-    vehicle_counts = defaultdict(int)
-    
-    # We can use a direct query for this, but iterating the already fetched list is fine for small scale
-    # Better to query DB directly for correctness if we want ALL time or specific range
-    # Let's use the same 'analytics_freights' list (last 3 months)
-    for f in analytics_freights:
-        if f.driver and f.driver.vehicle_type:
-            vehicle_counts[f.driver.vehicle_type] += 1
-        else:
-            vehicle_counts["Sem Veículo"] += 1
-            
-    freights_by_vehicle = [{"name": k, "value": v} for k, v in vehicle_counts.items()]
+    vehicle_rows = db.query(R.vehicle_type, func.sum(R.freight_count)).filter(*window).group_by(R.vehicle_type).all()
+    freights_by_vehicle = [{"name": k, "value": v} for k, v in vehicle_rows]
     freights_by_vehicle.sort(key=lambda x: x['value'], reverse=True)
 
     return {
         "kpis": {
-            "monthly_revenue": monthly_revenue,
-            "monthly_driver_cost": monthly_driver_cost,
+            "monthly_revenue": monthly_revenue or 0.0,
+            "monthly_driver_cost": monthly_driver_cost or 0.0,
             "active_freights": active_count,
             "deliveries_today": deliveries_today_count,
             "delays": delayed_count
         },
-        "recent_freights": recent_freights,
+        # Serialized here so cached entries never hold session-bound ORM objects
+        "recent_freights": [schemas.Freight.from_orm(f) for f in recent_freights],
         "charts": {
             "by_state": freights_by_state,
             "by_vehicle": freights_by_vehicle
@@ -153,75 +130,72 @@ def get_dashboard_stats(db: Session = Depends(get_db)):
 def get_dashboard_drilldown(
     filter_type: str, 
     filter_value: str, 
-    db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_read_db)
 ):
-    # Reuse similar logic to main stats: look at last 3 months
+    items, total, next_cursor = dashboard_cache.get_or_compute(
+        ("drilldown", filter_type, filter_value, cursor, limit),
+        lambda: build_dashboard_drilldown(db, filter_type, filter_value, cursor, limit)
+    )
+    set_page_headers(response, total, next_cursor)
+    return items
+
+def build_dashboard_drilldown(db: Session, filter_type: str, filter_value: str, cursor=None, limit=100):
     now = datetime.now()
+
+    # Charts look at the last 3 months, same as the main stats
     three_months_ago = now - timedelta(days=90)
-    
-    query = db.query(models.Freight).filter(
-        models.Freight.pickup_date >= three_months_ago,
-        models.Freight.status.notin_(['QUOTED', 'REJECTED'])
-    )
-    
-    all_freights = query.all()
-    filtered_freights = []
-    
-    with open("debug_dashboard_runtime.txt", "a", encoding="utf-8") as f:
-        f.write(f"{datetime.now()}: Drilldown for type={filter_type} value={filter_value}. Found {len(all_freights)} candidates.\n")
-    
+
+    def window(F):
+        return (F.pickup_date >= three_months_ago, F.status.notin_(['QUOTED', 'REJECTED']))
+
     if filter_type == "state":
-        for f in all_freights:
-            state = "Outros"
-            if f.origin:
-                if "," in f.origin:
-                    s = f.origin.split(",")[-1].strip().upper()
-                    if len(s) == 2 or len(s) == 3: state = s
-                elif "-" in f.origin:
-                    s = f.origin.split("-")[-1].strip().upper()
-                    if len(s) == 2 or len(s) == 3: state = s
-                elif len(f.origin) == 2:
-                     state = f.origin.upper()
-
-            if state == filter_value:
-                filtered_freights.append(f)
-                
-    elif filter_type == "vehicle":
-        target = filter_value.strip().upper()
-        for f in all_freights:
-            v_type = "SEM VEÍCULO"
-            if f.driver and f.driver.vehicle_type:
-                v_type = f.driver.vehicle_type.strip().upper()
+        # Indexed lookup on the state resolved at write time
+        def build(F):
+            if filter_value == "N/A":
+                state_filter = or_(F.origin.is_(None), F.origin == "")
+            elif filter_value == "Outros":
+                state_filter = and_(F.origin_state.is_(None), F.origin != "")
             else:
-                 v_type = "SEM VEÍCULO"
-            
-            if v_type == target:
-                filtered_freights.append(f)
-            elif v_type == "SEM VEÍCULO" and target == "SEM VEÍCULO":
-                 filtered_freights.append(f)
+                state_filter = F.origin_state == filter_value
+            return db.query(F).options(*loaders.freight_full(F)).filter(*window(F)).filter(state_filter)
+
+    elif filter_type == "vehicle":
+        # The chart groups on the raw vehicle type, so the bucket it emits is
+        # matched exactly (SQLite's upper() would miss "Caminhão")
+        def build(F):
+            query = db.query(F).options(*loaders.freight_full(F)).outerjoin(
+                models.Driver, F.driver_id == models.Driver.id
+            ).filter(*window(F))
+            if filter_value == rollup.NO_VEHICLE:
+                return query.filter(or_(
+                    models.Driver.vehicle_type.is_(None), models.Driver.vehicle_type.in_(["", rollup.NO_VEHICLE])
+                ))
+            return query.filter(models.Driver.vehicle_type == filter_value)
 
     elif filter_type == "kpi":
-        # Specific logic for KPI cards - DIRECT QUERY to match stats logic
-        active_statuses = ['RECRUITING', 'ASSIGNED', 'IN_TRANSIT', 'LOADING']
+        # Same conditions as the KPI cards; none of them matches a settled
+        # freight, so these never read the archive
         today_start = datetime(now.year, now.month, now.day)
         today_end = today_start + timedelta(days=1)
-        
-        if filter_value == "active":
-             filtered_freights = db.query(models.Freight).filter(models.Freight.status.in_(active_statuses)).all()
-             
-        elif filter_value == "today":
-             # Delivery date is today
-             filtered_freights = db.query(models.Freight).filter(
-                models.Freight.delivery_date >= today_start,
-                models.Freight.delivery_date < today_end,
-                models.Freight.status != 'REJECTED'
-             ).all()
-             
-        elif filter_value == "delayed":
-             # Active and late
-             filtered_freights = db.query(models.Freight).filter(
-                models.Freight.status.in_(active_statuses),
-                models.Freight.delivery_date < now
-             ).all()
-
-    return filtered_freights
+
+        def build(F):
+            query = db.query(F).options(*loaders.freight_full(F))
+            if filter_value == "active":
+                return query.filter(F.status.in_(ACTIVE_STATUSES))
+            if filter_value == "today":
+                return query.filter(F.delivery_date >= today_start, F.delivery_date < today_end, F.status != 'REJECTED')
+            return query.join(models.DelayedFreight, models.DelayedFreight.freight_id == F.id)
+
+        if filter_value not in ("active", "today", "delayed"):
+            return [], 0, None
+    else:
+        return [], 0, None
+
+    # Only reaches the archive when it holds freights picked up in the window
+    reach = filter_type != "kpi" and archive.freights_reach(db, three_months_ago)
+    total = archive.count_freights(db, build, reach)
+    freights, next_cursor = archive.paginate_freights(db, build, cursor, limit, reach=reach)
+    return [schemas.Freight.from_orm(f) for f in freights], total, next_cursor
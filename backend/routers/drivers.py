@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 import models, schemas
-from database import get_db
+from database import get_db, get_read_db
+from services import sync
 
 router = APIRouter(prefix="/drivers", tags=["drivers"])
 
@@ -15,12 +16,20 @@ def create_driver(driver: schemas.DriverCreate, db: Session = Depends(get_db)):
     return db_driver
 
 @router.get("/", response_model=List[schemas.Driver])
-def read_drivers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_drivers(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    cached = sync.not_modified(db, request, response)
+    if cached:
+        return cached
     drivers = db.query(models.Driver).offset(skip).limit(limit).all()
     return drivers
 
     return driver
 
+@router.get("/stats", response_model=List[schemas.DriverStats])
+def read_driver_stats(db: Session = Depends(get_read_db)):
+    # Maintained from the freight journal by services/projections.py
+    return db.query(models.DriverStats).order_by(models.DriverStats.delivered_count.desc()).all()
+
 @router.put("/{driver_id}", response_model=schemas.Driver)
 def update_driver(driver_id: int, driver_update: schemas.DriverCreate, db: Session = Depends(get_db)):
     db_driver = db.query(models.Driver).filter(models.Driver.id == driver_id).first()
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 import models, schemas
-from database import get_db
+from database import get_db, get_read_db
+from services import archive, export, writer
 from routers.auth import get_current_active_user
 
 router = APIRouter(
@@ -16,7 +18,7 @@ router = APIRouter(
 # --- Categories Endpoints ---
 
 @router.get("/categories", response_model=List[schemas.FinancialCategory])
-def read_categories(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_categories(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     return db.query(models.FinancialCategory).all()
 
 @router.post("/categories", response_model=schemas.FinancialCategory)
@@ -49,17 +51,17 @@ def delete_category(id: int, db: Session = Depends(get_db), current_user: models
 @router.get("/history")
 def get_financial_history(
     months: int = 12,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     # Calculate start date
     end_date = datetime.now()
     start_date = end_date - timedelta(days=30*months)
     
-    # Query transactions in range
-    transactions = db.query(models.FinancialTransaction).filter(
-        models.FinancialTransaction.date >= start_date
-    ).all()
+    # Query transactions in range, archived ones included (services/archive.py)
+    transactions = archive.transactions(
+        db, lambda T: db.query(T).filter(T.date >= start_date), start_date
+    )
     
     # Aggregate by Month
     history = {} # "YYYY-MM": {income: 0, expense: 0}
@@ -90,20 +92,27 @@ def get_financial_history(
 def get_financial_summary(
     month: Optional[int] = Query(None),
     year: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    query = db.query(models.FinancialTransaction)
-    
+    date_from = None
     if month and year:
-        query = query.filter(
-            func.extract('month', models.FinancialTransaction.date) == month,
-            func.extract('year', models.FinancialTransaction.date) == year
-        )
+        date_from = datetime(year, month, 1)
     elif year:
-        query = query.filter(func.extract('year', models.FinancialTransaction.date) == year)
-        
-    transactions = query.all()
+        date_from = datetime(year, 1, 1)
+
+    def build(T):
+        query = db.query(T)
+        if month and year:
+            query = query.filter(
+                func.extract('month', T.date) == month,
+                func.extract('year', T.date) == year
+            )
+        elif year:
+            query = query.filter(func.extract('year', T.date) == year)
+        return query
+
+    transactions = archive.transactions(db, build, date_from)
     
     total_income = sum(t.amount for t in transactions if t.type == 'INCOME')
     total_expense = sum(t.amount for t in transactions if t.type == 'EXPENSE')
@@ -132,28 +141,52 @@ def read_transactions(
     limit: int = 100,
     type: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    query = db.query(models.FinancialTransaction)
-    if type:
-        query = query.filter(models.FinancialTransaction.type == type)
-    if status:
-        query = query.filter(models.FinancialTransaction.status == status)
-        
-    return query.order_by(models.FinancialTransaction.date.desc()).offset(skip).limit(limit).all()
+    def build(T):
+        query = db.query(T)
+        if type:
+            query = query.filter(T.type == type)
+        if status:
+            query = query.filter(T.status == status)
+        return query
+
+    return archive.transactions_page(db, build, skip, limit, status)
+
+@router.get("/transactions/export")
+def export_transactions(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    def build(T):
+        return export.transactions_query(type, status, date_from, date_to, T=T)
+    stmt = export.ordered(archive.union_transactions(db, build, date_from, status), "date", "id")
+    filename = f"lancamentos_{datetime.now():%Y%m%d_%H%M}.{format}"
+    return StreamingResponse(
+        export.stream(format, stmt, export.TRANSACTION_HEADERS, "Lançamentos"),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.post("/transactions", response_model=schemas.FinancialTransaction)
 def create_transaction(
     transaction: schemas.FinancialTransactionCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    db_transaction = models.FinancialTransaction(**transaction.dict())
-    db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
-    return db_transaction
+    def work(wdb):
+        db_transaction = models.FinancialTransaction(**transaction.dict())
+        wdb.add(db_transaction)
+        wdb.flush()
+        return db_transaction.id
+    transaction_id = writer.run(work)
+    return db.get(models.FinancialTransaction, transaction_id)
 
 @router.patch("/transactions/{transaction_id}", response_model=schemas.FinancialTransaction)
 def update_transaction(
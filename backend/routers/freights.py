@@ -1,10 +1,17 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
 import models, schemas
-from database import get_db
-from dependencies import check_permission
+from database import ReadSessionLocal, SessionLocal, get_async_read_db, get_db, get_read_db
+from dependencies import check_permission, has_permission
+from routers.auth import get_current_user
+from services import archive, export, freight_batch, ingest, loaders, matching, media, resumable, search, sync, writer
+from services.pagination import set_page_headers
 
 router = APIRouter(prefix="/freights", tags=["freights"])
 
@@ -25,29 +32,176 @@ def create_freight(
     db.refresh(db_freight)
     return db_freight
 
+@router.post("/bulk")
+async def bulk_create_freights(
+    request: Request,
+    current_user: models.User = Depends(check_permission('create_freight'))
+):
+    # Body: NDJSON (application/x-ndjson) or a JSON array of FreightCreate records.
+    # Committed in chunks; rows that fail validation are reported, not fatal.
+    # A body that cannot be parsed on is a 400 that still reports what was written.
+    content_type = request.headers.get("content-type", "")
+    ndjson = "ndjson" in content_type or "jsonl" in content_type
+    db = SessionLocal()
+    try:
+        result = await ingest.ingest_stream(db, request.stream(), ndjson)
+    finally:
+        db.close()
+    if result["error"]:
+        return JSONResponse(status_code=400, content={"detail": result["error"], **result})
+    return result
+
+@router.post("/batch")
+def batch_freight_operations(
+    batch: schemas.FreightBatch,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(check_permission('edit_freight'))
+):
+    # Operations run in order in one transaction; results are per freight
+    try:
+        return freight_batch.apply_operations(db, batch.operations, can_delete=has_permission(current_user, 'delete_freight'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/", response_model=List[schemas.Freight])
-def read_freights(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    freights = db.query(models.Freight).offset(skip).limit(limit).all()
+async def read_freights(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    status: Optional[List[str]] = Query(None),
+    client_id: Optional[int] = None,
+    driver_id: Optional[int] = None,
+    billing_status: Optional[str] = None,
+    pickup_from: Optional[datetime] = None,
+    pickup_to: Optional[datetime] = None,
+    with_count: bool = False,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # The listing itself is Query code shared with the sync helpers
+    # (archive, sync.not_modified); run_sync drives it over aiosqlite
+    return await db.run_sync(
+        _list_freights, request, response, cursor, limit, order, status, client_id,
+        driver_id, billing_status, pickup_from, pickup_to, with_count,
+    )
+
+def _list_freights(db: Session, request, response, cursor, limit, order, status, client_id,
+                   driver_id, billing_status, pickup_from, pickup_to, with_count):
+    cached = sync.not_modified(db, request, response)
+    if cached:
+        return cached
+
+    # Keyset pagination on (pickup_date, id): pass X-Next-Cursor back as ?cursor=
+    def build(F):
+        query = db.query(F).options(*loaders.freight_full(F))
+        if status:
+            query = query.filter(F.status.in_(status))
+        if client_id is not None:
+            query = query.filter(F.client_id == client_id)
+        if driver_id is not None:
+            query = query.filter(F.driver_id == driver_id)
+        if billing_status:
+            query = query.filter(F.billing_status == billing_status)
+        if pickup_from:
+            query = query.filter(F.pickup_date >= pickup_from)
+        if pickup_to:
+            query = query.filter(F.pickup_date < pickup_to)
+        return query
+
+    # Settled freights older than a year live in the archive (services/archive.py)
+    reach = archive.freights_reach(db, pickup_from, status, billing_status)
+    total = archive.count_freights(db, build, reach) if with_count else None
+    freights, next_cursor = archive.paginate_freights(db, build, cursor, limit, descending=(order == "desc"), reach=reach)
+    set_page_headers(response, total, next_cursor)
     return freights
 
-@router.get("/{freight_id}", response_model=schemas.Freight)
-def read_freight(freight_id: int, db: Session = Depends(get_db)):
+@router.get("/search", response_model=List[schemas.Freight])
+def search_freights(
+    response: Response,
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    # Ranked hits over origin, destination, observation and CT-e number
+    freights, total = search.search_freights(db, q, limit, offset)
+    set_page_headers(response, total)
+    return freights
+
+@router.get("/export")
+def export_freights(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    status: Optional[List[str]] = Query(None),
+    client_id: Optional[int] = None,
+    driver_id: Optional[int] = None,
+    billing_status: Optional[str] = None,
+    pickup_from: Optional[datetime] = None,
+    pickup_to: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    # Same filters as the list, every matching row, streamed (services/export.py)
+    def build(F):
+        return export.freights_query(status, client_id, driver_id, billing_status, pickup_from, pickup_to, F=F)
+    reach = archive.freights_reach(db, pickup_from, status, billing_status)
+    stmt = export.ordered(archive.union_freights(db, build, reach), "pickup_date", "id")
+    filename = f"fretes_{datetime.now():%Y%m%d_%H%M}.{format}"
+    return StreamingResponse(
+        export.stream(format, stmt, export.FREIGHT_HEADERS, "Fretes"),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/uploads/{upload_id}")
+def read_delivery_upload(upload_id: str, db: Session = Depends(get_read_db)):
+    # Offsets to resume from after a dropped connection
+    return resumable.describe(resumable.get_open(db, upload_id))
+
+@router.get("/{freight_id}/events", response_model=List[schemas.FreightEvent])
+def read_freight_events(freight_id: int, db: Session = Depends(get_read_db)):
+    # History of the freight, oldest first (services/events.py)
+    return db.query(models.FreightEvent).filter(
+        models.FreightEvent.freight_id == freight_id
+    ).order_by(models.FreightEvent.id).all()
+
+@router.get("/{freight_id}/candidates", response_model=List[schemas.DriverCandidate])
+def read_driver_candidates(
+    freight_id: int,
+    vehicle_type: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    # Ranked ACTIVE drivers for assignment (services/matching.py)
     freight = db.query(models.Freight).filter(models.Freight.id == freight_id).first()
+    if freight is None:
+        raise HTTPException(status_code=404, detail="Freight not found")
+    return matching.rank(matching.driver_features(db), freight, vehicle_type, limit)
+
+@router.get("/{freight_id}", response_model=schemas.Freight)
+async def read_freight(freight_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    freight = await db.scalar(select(models.Freight).options(*loaders.freight_full()).where(models.Freight.id == freight_id))
+    if freight is None:
+        AF = models.ArchivedFreight
+        freight = await db.scalar(select(AF).options(*loaders.freight_full(AF)).where(AF.id == freight_id))
     if freight is None:
         raise HTTPException(status_code=404, detail="Freight not found")
     return freight
 
-@router.patch("/{freight_id}/status", response_model=schemas.Freight)
-def update_freight_status(freight_id: int, status: str, db: Session = Depends(get_db)):
-    freight = db.query(models.Freight).filter(models.Freight.id == freight_id).first()
+def _get_freight_for_write(db: Session, freight_id: int):
+    freight = db.get(models.Freight, freight_id)
     if freight is None:
         raise HTTPException(status_code=404, detail="Freight not found")
-    
-    freight.status = status
-    db.commit()
-    db.refresh(freight)
     return freight
 
+@router.patch("/{freight_id}/status", response_model=schemas.Freight)
+def update_freight_status(freight_id: int, status: str, db: Session = Depends(get_read_db)):
+    def work(wdb):
+        _get_freight_for_write(wdb, freight_id).status = status
+    writer.run(work)
+    # Committed by the writer; read it back with everything the schema shows
+    return db.query(models.Freight).options(*loaders.freight_full()).filter(models.Freight.id == freight_id).first()
+
 @router.patch("/{freight_id}/assign/{driver_id}", response_model=schemas.Freight)
 def assign_driver(freight_id: int, driver_id: int, db: Session = Depends(get_db)):
     freight = db.query(models.Freight).filter(models.Freight.id == freight_id).first()
@@ -63,62 +217,90 @@ def assign_driver(freight_id: int, driver_id: int, db: Session = Depends(get_db)
     return freight
 
 @router.post("/{freight_id}/accept")
-def accept_freight(freight_id: int, db: Session = Depends(get_db)):
-    freight = db.query(models.Freight).filter(models.Freight.id == freight_id).first()
-    if not freight:
-        raise HTTPException(status_code=404, detail="Freight not found")
-    
-    freight.status = "ASSIGNED"
-    freight.accepted_at = datetime.now()
-    db.commit()
+def accept_freight(freight_id: int):
+    def work(db):
+        freight = _get_freight_for_write(db, freight_id)
+        freight.status = "ASSIGNED"
+        freight.accepted_at = datetime.now()
+    writer.run(work)
     return {"message": "Freight accepted"}
 
 @router.post("/{freight_id}/reject")
-def reject_freight(freight_id: int, reason: str = Body(..., embed=True), db: Session = Depends(get_db)):
-    freight = db.query(models.Freight).filter(models.Freight.id == freight_id).first()
-    if not freight:
-        raise HTTPException(status_code=404, detail="Freight not found")
-    
-    freight.status = "REJECTED"
-    freight.rejection_reason = reason
-    db.commit()
+def reject_freight(freight_id: int, reason: str = Body(..., embed=True)):
+    def work(db):
+        freight = _get_freight_for_write(db, freight_id)
+        freight.status = "REJECTED"
+        freight.rejection_reason = reason
+    writer.run(work)
     return {"message": "Freight rejected"}
 
 from fastapi import UploadFile, File, Form
-import shutil
-import os
-import json
 
 @router.post("/{freight_id}/deliver")
 def deliver_freight(
     freight_id: int, 
     files: List[UploadFile] = File(...), 
-    db: Session = Depends(get_db)
 ):
-    freight = db.query(models.Freight).filter(models.Freight.id == freight_id).first()
-    if not freight:
-        raise HTTPException(status_code=404, detail="Freight not found")
+    _require_freight(freight_id)
         
     if len(files) < 3:
         raise HTTPException(status_code=400, detail="Minimum of 3 photos required")
 
-    upload_dir = f"uploads/delivery_proofs/{freight_id}"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    saved_paths = []
-    
-    for file in files:
-        file_path = f"{upload_dir}/{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        saved_paths.append(file_path)
-    
-    freight.status = "DELIVERED"
-    freight.delivered_at = datetime.now()
-    freight.delivery_photos = json.dumps(saved_paths)
-    
-    db.commit()
-    return {"message": "Delivery confirmed", "photos": saved_paths}
+    # Recompressed, thumbnailed and stored by content hash (services/media.py)
+    # with no session open; only the rows go through the writer
+    uploads = [(file.filename, file.file.read()) for file in files]
+    try:
+        photos = media.save_photos(uploads)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def work(db):
+        return media.confirm_delivery(db, _get_freight_for_write(db, freight_id), photos)
+    return writer.run(work)
+
+def _require_freight(freight_id: int):
+    db = ReadSessionLocal()
+    try:
+        if not db.query(models.Freight.id).filter(models.Freight.id == freight_id).first():
+            raise HTTPException(status_code=404, detail="Freight not found")
+    finally:
+        db.close()
+
+# Resumable delivery uploads (services/resumable.py): for drivers on unstable connections
+
+@router.post("/{freight_id}/uploads", status_code=201)
+def create_delivery_upload(freight_id: int, upload: schemas.UploadSessionCreate):
+    _require_freight(freight_id)
+    return writer.run(lambda db: resumable.describe(resumable.create(db, freight_id, upload.files)))
+
+@router.patch("/uploads/{upload_id}/parts/{index}", status_code=204)
+async def upload_delivery_part(upload_id: str, index: int, request: Request):
+    # Body: raw bytes starting at the Upload-Offset header
+    try:
+        start = int(request.headers["upload-offset"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Upload-Offset header required")
+
+    def load_part():
+        db = ReadSessionLocal()
+        try:
+            state = resumable.describe(resumable.get_open(db, upload_id))
+        finally:
+            db.close()
+        if state["status"] != "OPEN":
+            raise HTTPException(status_code=409, detail="Upload already finalized")
+        if not 0 <= index < len(state["parts"]):
+            raise HTTPException(status_code=404, detail="Part not found")
+        return state["parts"][index]
+
+    part = await run_in_threadpool(load_part)
+    new_offset = await resumable.write_part(upload_id, index, part["size"], start, request.stream())
+    return Response(status_code=204, headers={"Upload-Offset": str(new_offset)})
+
+@router.post("/uploads/{upload_id}/finalize")
+def finalize_delivery_upload(upload_id: str):
+    # Photos are processed outside the writer (services/resumable.py)
+    return resumable.finalize(upload_id)
 
 from dependencies import check_permission
 
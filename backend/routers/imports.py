@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import uuid
+from typing import List
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+import models, schemas
+from database import get_db, get_read_db
+from dependencies import check_permission
+from services import excel_import, writer
+
+router = APIRouter(
+    prefix="/imports",
+    tags=["imports"]
+)
+
+# Uploaded spreadsheets are kept outside the public /uploads mount
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTS_DIR = os.path.join(BASE_DIR, "imports")
+
+def _profile_values(profile: schemas.ImportProfileCreate):
+    try:
+        excel_import.validate_columns(profile.columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    values = profile.dict()
+    values["columns"] = json.dumps(profile.columns, ensure_ascii=False)
+    values["status_map"] = json.dumps(profile.status_map, ensure_ascii=False)
+    return values
+
+@router.get("/profiles", response_model=List[schemas.ImportProfile])
+def read_profiles(db: Session = Depends(get_read_db)):
+    return db.query(models.ImportProfile).order_by(models.ImportProfile.name).all()
+
+@router.post("/profiles", response_model=schemas.ImportProfile)
+def create_profile(
+    profile: schemas.ImportProfileCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(check_permission('create_freight'))
+):
+    if db.query(models.ImportProfile).filter(models.ImportProfile.name == profile.name).first():
+        raise HTTPException(status_code=400, detail="Profile with this name already exists")
+    db_profile = models.ImportProfile(**_profile_values(profile))
+    db.add(db_profile)
+    db.commit()
+    db.refresh(db_profile)
+    return db_profile
+
+@router.put("/profiles/{profile_id}", response_model=schemas.ImportProfile)
+def update_profile(
+    profile_id: int,
+    profile: schemas.ImportProfileCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(check_permission('create_freight'))
+):
+    db_profile = db.query(models.ImportProfile).filter(models.ImportProfile.id == profile_id).first()
+    if not db_profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    for field, value in _profile_values(profile).items():
+        setattr(db_profile, field, value)
+    db.commit()
+    db.refresh(db_profile)
+    return db_profile
+
+@router.post("/jobs", response_model=schemas.ImportJob)
+def create_job(
+    profile_id: int = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(check_permission('create_freight'))
+):
+    profile = db.query(models.ImportProfile).filter(models.ImportProfile.id == profile_id).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not file.filename.lower().endswith((".xlsx", ".xlsm")):
+        raise HTTPException(status_code=400, detail="Only .xlsx/.xlsm files are supported")
+
+    # Copied before the writer is taken: it is only needed for the insert
+    os.makedirs(IMPORTS_DIR, exist_ok=True)
+    file_path = os.path.join(IMPORTS_DIR, f"{uuid.uuid4().hex}{os.path.splitext(file.filename)[1].lower()}")
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+    def work(wdb):
+        job = models.ImportJob(profile_id=profile_id, filename=file.filename, file_path=file_path)
+        wdb.add(job)
+        wdb.flush()
+        return job.id
+    job_id = writer.run(work)
+
+    excel_import.start(job_id)
+    return db.get(models.ImportJob, job_id)
+
+@router.get("/jobs", response_model=List[schemas.ImportJob])
+def read_jobs(limit: int = 50, db: Session = Depends(get_read_db)):
+    return db.query(models.ImportJob).order_by(models.ImportJob.id.desc()).limit(limit).all()
+
+@router.get("/jobs/{job_id}", response_model=schemas.ImportJob)
+def read_job(job_id: int, db: Session = Depends(get_read_db)):
+    job = db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.post("/jobs/{job_id}/resume", response_model=schemas.ImportJob)
+def resume_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(check_permission('create_freight'))
+):
+    # Continues after checkpoint_row; rows already committed are not read again
+    job = db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if job.status not in ("FAILED", "INTERRUPTED") or excel_import.is_running(job.id):
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+    excel_import.start(job.id)
+    return job
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+import schemas
+from database import get_read_db
+from services import sync
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+@router.get("/", response_model=schemas.SyncChanges)
+def read_changes(since: int = Query(0, ge=0), db: Session = Depends(get_read_db)):
+    # since=0 returns everything; keep the returned version for the next call
+    return sync.changes(db, since)
@@ -16,7 +16,7 @@ def get_db():
         db.close()
 
 @router.get("/", response_model=List[schemas.MessageTemplate])
-def read_templates(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_templates(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_read_db)):
     templates = db.query(models.MessageTemplate).offset(skip).limit(limit).all()
     return templates
 
@@ -13,7 +13,7 @@ def get_db():
         db.close()
 
 @router.get("/", response_model=List[schemas.VehicleType])
-def read_vehicle_types(db: Session = Depends(get_db)):
+def read_vehicle_types(db: Session = Depends(database.get_read_db)):
     return db.query(models.VehicleType).all()
 
 @router.post("/", response_model=schemas.VehicleType)
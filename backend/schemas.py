@@ -1,6 +1,10 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Driver Schemas
 class DriverBase(BaseModel):
@@ -22,9 +26,12 @@ class Driver(DriverBase):
     cnh_path: Optional[str]
     address_proof_path: Optional[str]
     crlv_path: Optional[str]
+    updated_at: Optional[datetime] = None
+    change_version: Optional[int] = None
 
     class Config:
         orm_mode = True
+        from_attributes = True
 
 # Client Schemas
 from pydantic import BaseModel, validator
@@ -47,6 +54,8 @@ class ClientBase(BaseModel):
 
     @validator('cnpj')
     def validate_document(cls, v):
+        if v is None:
+            return v
         try:
             # Remove non-digits
             clean_doc = "".join([d for d in v if d.isdigit()])
@@ -65,21 +74,21 @@ class ClientBase(BaseModel):
                  raise ValueError('Documento deve ter 11 (CPF) ou 14 (CNPJ) dígitos')
         except ValueError as ve:
              raise ve
-        except Exception as e:
-            import traceback
-            log_path = r"c:\Users\Marcelo Kodrai\Documents\projetos_python\Eagles Transportes\backend\traceback_schema.log"
-            with open(log_path, "w") as f:
-                f.write(f"SCHEMA ERROR: {e}\n")
-                traceback.print_exc(file=f)
-            raise e
+        except Exception:
+            logger.exception("SCHEMA ERROR validating document")
+            raise
 
 class ClientCreate(ClientBase):
     pass
 
 class Client(ClientBase):
     id: int
+    cnpj: Optional[str] = None # clients created by spreadsheet imports have no document yet
+    updated_at: Optional[datetime] = None
+    change_version: Optional[int] = None
     class Config:
         orm_mode = True
+        from_attributes = True
 
 # Freight Schemas
 class FreightBase(BaseModel):
@@ -97,14 +106,36 @@ class FreightBase(BaseModel):
 class FreightCreate(FreightBase):
     pass
 
+class Attachment(BaseModel):
+    id: int
+    kind: str
+    path: str
+    thumb_path: str
+    original_filename: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    size_bytes: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
 class Freight(FreightBase):
     id: int
     driver_id: Optional[int] = None
     driver: Optional[Driver] = None
     client: Optional[Client] = None
+
+    # Resolved locations
+    origin_city_id: Optional[int] = None
+    origin_state: Optional[str] = None
+    destination_city_id: Optional[int] = None
+    destination_state: Optional[str] = None
     
     rejection_reason: Optional[str] = None
-    delivery_photos: Optional[str] = None
+    delivery_photos: Optional[str] = None # legacy, see attachments
+    attachments: List[Attachment] = []
     accepted_at: Optional[datetime] = None
     delivered_at: Optional[datetime] = None
     
@@ -113,9 +144,13 @@ class Freight(FreightBase):
     boleto_id: Optional[str] = None
     boleto_url: Optional[str] = None
     boleto_expiry_date: Optional[datetime] = None
+
+    updated_at: Optional[datetime] = None
+    change_version: Optional[int] = None
     
     class Config:
         orm_mode = True
+        from_attributes = True
 
 # Quotation Schemas
 class QuotationBase(BaseModel):
@@ -136,6 +171,7 @@ class Quotation(QuotationBase):
     status: str
     class Config:
         orm_mode = True
+        from_attributes = True
 
 # Vehicle Types Schemas
 class VehicleTypeBase(BaseModel):
@@ -148,6 +184,7 @@ class VehicleType(VehicleTypeBase):
     id: int
     class Config:
         orm_mode = True
+        from_attributes = True
 
 # Message Template Schemas
 class MessageTemplateBase(BaseModel):
@@ -179,6 +216,7 @@ class User(UserBase):
     
     class Config:
         orm_mode = True
+        from_attributes = True
 
 class Token(BaseModel):
     access_token: str
@@ -203,6 +241,7 @@ class MessageTemplate(MessageTemplateBase):
     id: int
     class Config:
         orm_mode = True
+        from_attributes = True
 
 # Financial Schemas
 class FinancialCategoryBase(BaseModel):
@@ -219,6 +258,7 @@ class FinancialCategory(FinancialCategoryBase):
     
     class Config:
         orm_mode = True
+        from_attributes = True
 
 class FinancialTransactionBase(BaseModel):
     type: str # INCOME, EXPENSE
@@ -248,3 +288,124 @@ class FinancialTransaction(FinancialTransactionBase):
     
     class Config:
         orm_mode = True
+        from_attributes = True
+
+# Freight Journal Schemas
+def _parse_json(v):
+    return json.loads(v) if isinstance(v, str) else v
+
+class FreightEvent(BaseModel):
+    id: int
+    freight_id: int
+    type: str
+    data: Dict[str, Any]
+    created_at: datetime
+
+    @validator('data', pre=True)
+    def parse_data(cls, v):
+        return _parse_json(v) or {}
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+class DriverStats(BaseModel):
+    driver_id: int
+    assigned_count: int = 0
+    accepted_count: int = 0
+    rejected_count: int = 0
+    delivered_count: int = 0
+    delivered_revenue: float = 0.0
+    delivered_driver_pay: float = 0.0
+    last_delivered_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+# Driver Matching Schemas
+class DriverCandidate(BaseModel):
+    driver_id: int
+    name: str
+    phone: Optional[str] = None
+    vehicle_type: Optional[str] = None
+    score: float
+    features: Dict[str, float] # backhaul, acceptance, availability, vehicle
+    active_freights: int
+    last_destination: Optional[str] = None
+
+# Delta Sync Schemas
+class SyncChanges(BaseModel):
+    version: int # pass back as ?since= on the next sync
+    freights: List[Freight]
+    clients: List[Client]
+    drivers: List[Driver]
+    deleted: Dict[str, List[int]] # entity -> ids
+
+# Batch Freight Operations
+class FreightOperation(BaseModel):
+    op: Literal["status", "assign", "unassign", "delete"]
+    freight_ids: List[int]
+    status: Optional[str] = None # for "status"
+    driver_id: Optional[int] = None # for "assign"
+
+class FreightBatch(BaseModel):
+    operations: List[FreightOperation]
+
+# Resumable Upload Schemas
+class UploadPart(BaseModel):
+    filename: str
+    size: int
+
+class UploadSessionCreate(BaseModel):
+    files: List[UploadPart]
+
+# Spreadsheet Import Schemas
+class ImportProfileBase(BaseModel):
+    name: str
+    sheet: Optional[str] = None
+    header_row: int = 1
+    columns: Dict[str, str] # field -> header text
+    status_map: Dict[str, str] = {}
+
+    @validator('columns', 'status_map', pre=True)
+    def parse_json_fields(cls, v):
+        return _parse_json(v) or {}
+
+class ImportProfileCreate(ImportProfileBase):
+    pass
+
+class ImportProfile(ImportProfileBase):
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+class ImportJob(BaseModel):
+    id: int
+    profile_id: int
+    filename: str
+    status: str
+    checkpoint_row: int = 0
+    total_rows: Optional[int] = None
+    processed_rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = []
+    message: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @validator('errors', pre=True)
+    def parse_errors(cls, v):
+        return _parse_json(v) or []
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
@@ -0,0 +1,252 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+import models
+from services import cache, events, scheduler, sync
+from services.pagination import encode_cursor, paginate
+
+logger = logging.getLogger(__name__)
+
+# Hot/cold storage for settled freights.
+#
+# A freight that is DELIVERED, billed PAID, picked up more than
+# ARCHIVE_AFTER_DAYS ago and has no PENDING/OVERDUE transaction left does not
+# change any more. The archive job moves it, with its financial transactions,
+# into eagles_archive.db (attached as "archive", see database.py), so the hot
+# tables scanned by the lists, billing and history queries stay small.
+#
+# archive_state holds the newest pickup_date and transaction date moved so
+# far. The query facade below adds the archive to a query only when the
+# requested range reaches back that far (or has no lower bound) and its
+# filters can match a settled row; otherwise it runs the hot query alone.
+#
+# Rows keep their id; both hot tables are AUTOINCREMENT (migration 12), so an
+# archived id is never handed out again. A move is two commits on the
+# writer: copy into the archive, then delete from the hot tables what did
+# not change in between (the attached databases do not commit atomically
+# together in WAL mode).
+# If a row ends up in both, the hot copy wins everywhere.
+#
+# What else the move does:
+#   rollup   nothing: the daily rollup keeps counting archived freights, so
+#            the dashboard never reads the archive (rebuild() includes it)
+#   journal  one ARCHIVED event per freight (projections ignore it)
+#   sync     a tombstone, so delta clients drop it as a full resync would
+#   cache    touched: lists and drilldowns are recomputed
+#   search   the archive has its own full-text index (services/search.py)
+# Attachments and journal events stay in the hot tables, under the same id.
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("EAGLES_ARCHIVE_AFTER_DAYS", "365")) # 0 turns archiving off
+ARCHIVE_CHECK_SECONDS = int(os.getenv("EAGLES_ARCHIVE_CHECK_SECONDS", str(6 * 3600)))
+BATCH_SIZE = 500
+OPEN_TRANSACTION_STATUSES = ("PENDING", "OVERDUE")
+
+# --- Query facade ---
+
+def _until(db: Session, column):
+    return db.scalar(select(column).where(models.ArchiveState.id == 1))
+
+def reaches(db: Session, column, date_from=None):
+    """True if archived rows may fall on or after date_from (None: no lower bound)."""
+    until = _until(db, column)
+    return until is not None and (date_from is None or date_from <= until)
+
+def not_in_hot(AF):
+    """Skips archived freights that are still (or again) in the hot table."""
+    return ~exists().where(models.Freight.id == AF.id)
+
+def not_in_hot_transactions(AT):
+    return ~exists().where(models.FinancialTransaction.id == AT.id)
+
+def freights_reach(db: Session, pickup_from=None, status=None, billing_status=None):
+    """Whether a freight query with these filters has to read the archive."""
+    if status and "DELIVERED" not in status:
+        return False
+    if billing_status and billing_status != "PAID":
+        return False
+    return reaches(db, models.ArchiveState.freights_until, pickup_from)
+
+def _freight_order(freight):
+    # SQLite order: NULL pickup dates first ascending, last descending
+    return (freight.pickup_date is not None, freight.pickup_date or datetime.min, freight.id)
+
+def paginate_freights(db: Session, build, cursor=None, limit=100, descending=True, reach=False):
+    """paginate() by (pickup_date, id) over build(F) for the hot and, if reach, archived freights.
+
+    build(F) returns the filtered ORM query for F (models.Freight or
+    models.ArchivedFreight); reach comes from freights_reach().
+    """
+    F, AF = models.Freight, models.ArchivedFreight
+    rows, next_cursor = paginate(build(F), F.pickup_date, F.id, cursor, limit, descending=descending)
+    if not reach:
+        return rows, next_cursor
+    # A full page newer than anything archived: the archive cannot add to it
+    until = _until(db, models.ArchiveState.freights_until)
+    if descending and next_cursor and rows[-1].pickup_date is not None and rows[-1].pickup_date > until:
+        return rows, next_cursor
+
+    cold, cold_cursor = paginate(build(AF).filter(not_in_hot(AF)), AF.pickup_date, AF.id, cursor, limit, descending=descending)
+    merged = sorted(rows + cold, key=_freight_order, reverse=descending)
+    more = len(merged) > limit or next_cursor or cold_cursor
+    merged = merged[:limit]
+    if more and merged:
+        return merged, encode_cursor(merged[-1].pickup_date, merged[-1].id)
+    return merged, None
+
+def count_freights(db: Session, build, reach=False):
+    F, AF = models.Freight, models.ArchivedFreight
+    total = build(F).order_by(None).count()
+    if reach:
+        total += build(AF).filter(not_in_hot(AF)).order_by(None).count()
+    return total
+
+def union_freights(db: Session, build, reach=False):
+    """Core select of build(F) over both tables (exports); build(F) must not be ordered."""
+    F, AF = models.Freight, models.ArchivedFreight
+    if not reach:
+        return build(F)
+    return union_all(build(F), build(AF).where(not_in_hot(AF)))
+
+def transactions(db: Session, build, date_from=None, status=None):
+    """All rows of build(T) from the hot table plus, when the range reaches it, the archive."""
+    T, AT = models.FinancialTransaction, models.ArchivedTransaction
+    rows = build(T).all()
+    if status not in OPEN_TRANSACTION_STATUSES and reaches(db, models.ArchiveState.transactions_until, date_from):
+        rows += build(AT).filter(not_in_hot_transactions(AT)).all()
+    return rows
+
+def freights(db: Session, build, reach=False):
+    """All rows of build(F) from the hot table plus, if reach, the archive."""
+    F, AF = models.Freight, models.ArchivedFreight
+    rows = build(F).all()
+    if reach:
+        rows += build(AF).filter(not_in_hot(AF)).all()
+    return rows
+
+def _transaction_order(transaction):
+    return (transaction.date is not None, transaction.date or datetime.min)
+
+def transactions_page(db: Session, build, skip=0, limit=100, status=None):
+    """Newest first, offset pagination over build(T) for both tables."""
+    T, AT = models.FinancialTransaction, models.ArchivedTransaction
+    rows = build(T).order_by(T.date.desc()).limit(skip + limit).all()
+    if status in OPEN_TRANSACTION_STATUSES or not reaches(db, models.ArchiveState.transactions_until):
+        return rows[skip:]
+    until = _until(db, models.ArchiveState.transactions_until)
+    if len(rows) == skip + limit and rows[-1].date is not None and rows[-1].date > until:
+        return rows[skip:]
+
+    cold = build(AT).filter(not_in_hot_transactions(AT)).order_by(AT.date.desc()).limit(skip + limit).all()
+    merged = sorted(rows + cold, key=_transaction_order, reverse=True)
+    return merged[skip:skip + limit]
+
+def union_transactions(db: Session, build, date_from=None, status=None):
+    """Core select of build(T) over both tables (exports); build(T) must not be ordered."""
+    T, AT = models.FinancialTransaction, models.ArchivedTransaction
+    if status in OPEN_TRANSACTION_STATUSES or not reaches(db, models.ArchiveState.transactions_until, date_from):
+        return build(T)
+    return union_all(build(T), build(AT).where(not_in_hot_transactions(AT)))
+
+# --- Archive job ---
+
+def _eligible(db: Session, cutoff, limit):
+    F, T = models.Freight, models.FinancialTransaction
+    return db.scalars(
+        select(F.id).where(
+            F.status == "DELIVERED",
+            F.billing_status == "PAID",
+            F.pickup_date < cutoff,
+            ~exists().where(T.related_freight_id == F.id, T.status.in_(OPEN_TRANSACTION_STATUSES)),
+        ).order_by(F.id).limit(limit)
+    ).all()
+
+def _versions(db: Session, F, T, ids):
+    """freight id -> (change_version, ((transaction id, updated_at), ...))"""
+    freights = dict(db.execute(select(F.id, F.change_version).where(F.id.in_(ids))).all())
+    transactions = {}
+    for freight_id, transaction_id, updated_at in db.execute(
+        select(T.related_freight_id, T.id, T.updated_at).where(T.related_freight_id.in_(ids)).order_by(T.id)
+    ):
+        transactions.setdefault(freight_id, []).append((transaction_id, updated_at))
+    return {i: (version, tuple(transactions.get(i, ()))) for i, version in freights.items()}
+
+def _copy(db: Session, hot, cold, where, now):
+    columns = [c.name for c in hot.columns]
+    db.execute(
+        insert(cold).prefix_with("OR REPLACE").from_select(
+            columns + ["archived_at"], select(*hot.columns, literal(now)).where(where)
+        )
+    )
+
+def archive_batch(db: Session, cutoff):
+    """Moves up to BATCH_SIZE settled freights; returns how many moved."""
+    F, T = models.Freight, models.FinancialTransaction
+    AF, AT = models.ArchivedFreight, models.ArchivedTransaction
+    ids = _eligible(db, cutoff, BATCH_SIZE)
+    if not ids:
+        return 0
+
+    now = datetime.now()
+    copied = _versions(db, F, T, ids)
+    # A REPLACE would skip the archive's full-text delete trigger
+    db.execute(delete(AF).where(AF.id.in_(ids)))
+    _copy(db, F.__table__, AF.__table__, F.id.in_(ids), now)
+    _copy(db, T.__table__, AT.__table__, T.related_freight_id.in_(ids), now)
+    db.commit()
+
+    # Only what nobody wrote to since the copy leaves the hot tables
+    current = _versions(db, F, T, ids)
+    moved = [i for i in ids if i in current and current[i] == copied[i]]
+    changed = [i for i in ids if i not in moved]
+    if changed:
+        db.execute(delete(AT).where(AT.related_freight_id.in_(changed)))
+        db.execute(delete(AF).where(AF.id.in_(changed)))
+
+    if moved:
+        stored = events.stored_state(db, moved, events.STATE_COLUMNS)
+        freights_until = db.scalar(select(func.max(F.pickup_date)).where(F.id.in_(moved)))
+        transactions_until = db.scalar(select(func.max(T.date)).where(T.related_freight_id.in_(moved)))
+
+        db.execute(delete(T).where(T.related_freight_id.in_(moved)))
+        db.execute(delete(models.DelayedFreight).where(models.DelayedFreight.freight_id.in_(moved)))
+        db.execute(delete(F).where(F.id.in_(moved)))
+
+        state = db.get(models.ArchiveState, 1) or models.ArchiveState(id=1)
+        state.freights_until = max(filter(None, [state.freights_until, freights_until]), default=None)
+        state.transactions_until = max(filter(None, [state.transactions_until, transactions_until]), default=None)
+        state.archived_at = now
+        db.add(state)
+
+        events.append(db, [events.event_row(i, "ARCHIVED", state=stored[i]) for i in moved])
+        sync.add_tombstones(db, "freights", moved)
+        cache.touch(db)
+    db.commit()
+    return len(moved)
+
+def has_settled(db: Session):
+    """True if some freight is due to move (read-only, for the job's check)."""
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return False
+    return bool(_eligible(db, datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS), 1))
+
+def archive_settled(db: Session, older_than_days=None):
+    """Moves every eligible freight, a batch at a time. Returns how many moved."""
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    if days <= 0:
+        return 0
+    cutoff = datetime.now() - timedelta(days=days)
+    total = 0
+    while True:
+        moved = archive_batch(db, cutoff)
+        total += moved
+        if moved < BATCH_SIZE:
+            break
+    if total:
+        logger.info("Archived %s settled freights picked up before %s", total, cutoff.date())
+    return total
+
+job = scheduler.PeriodicJob("archive", archive_settled, ARCHIVE_CHECK_SECONDS, check=has_settled)
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import models
+
+# In-process response cache for the dashboard endpoints.
+#
+# Entries are tagged with a data version. Any committed write to a freight,
+# driver, client or financial transaction bumps the version, which drops the
+# whole cache. The TTL covers what changes with the clock alone
+# ("deliveries today"); delays are written by services/delays.py.
+
+DASHBOARD_TTL_SECONDS = 30
+MAX_ENTRIES = 256
+
+# Models whose writes change what the dashboard shows
+TRACKED_MODELS = (models.Freight, models.Driver, models.Client, models.FinancialTransaction)
+
+class ResponseCache:
+    def __init__(self, ttl_seconds=DASHBOARD_TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}
+        self._key_locks = {} # key -> [lock, callers holding or waiting for it]
+        self._computing = {} # key -> future done when an async computation ends
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def get_or_compute(self, key, compute):
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry
+
+        # One computation per key at a time; concurrent callers wait for it.
+        # The lock is dropped with its last caller, so keys seen once
+        # (drilldown filters) do not pile up.
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+        try:
+            with key_lock[0]:
+                entry = self._lookup(key, count=False)
+                if entry is not None:
+                    return entry
+
+                version = self.version
+                value = compute()
+                self._store(key, version, value)
+                return value
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if not key_lock[1]:
+                    del self._key_locks[key]
+
+    async def get_or_compute_async(self, key, compute):
+        """get_or_compute() for async endpoints; compute() returns an awaitable.
+
+        Runs on the event loop, so concurrent misses wait for the computation
+        in progress instead of blocking on the per-key thread lock.
+        """
+        first = True
+        while True:
+            entry = self._lookup(key, count=first)
+            if entry is not None:
+                return entry
+            running = self._computing.get(key)
+            if running is None:
+                break
+            await asyncio.wait([running])
+            first = False
+
+        done = asyncio.get_running_loop().create_future()
+        self._computing[key] = done
+        try:
+            version = self.version
+            value = await compute()
+            self._store(key, version, value)
+            return value
+        finally:
+            del self._computing[key]
+            done.set_result(None)
+
+    def _store(self, key, version, value):
+        with self._lock:
+            # Computed from data older than the current version: not kept
+            if version == self.version:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[key] = (version, time.monotonic() + self.ttl_seconds, value)
+
+    def _lookup(self, key, count=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == self.version and entry[1] > time.monotonic():
+                if count:
+                    self.hits += 1
+                return entry[2]
+            if count:
+                self.misses += 1
+            return None
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self.invalidations += 1
+            self._entries.clear()
+            version = self.version
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(version)
+
+    def subscribe(self, listener):
+        """Calls listener(version) after every bump."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+dashboard_cache = ResponseCache()
+
+def touch(session: Session):
+    """Marks the session's transaction as changing dashboard data (for Core/bulk writes)."""
+    session.info["cache_dirty"] = True
+
+def _after_flush(session: Session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, TRACKED_MODELS):
+            touch(session)
+            return
+
+def _after_commit(session: Session):
+    # Also fired when a SAVEPOINT is released (writer units): wait for the real commit
+    if session.in_nested_transaction():
+        return
+    if session.info.pop("cache_dirty", False):
+        dashboard_cache.bump()
+
+def _after_rollback(session: Session):
+    session.info.pop("cache_dirty", None)
+
+def register(session_factory):
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
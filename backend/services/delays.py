@@ -0,0 +1,71 @@
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+import models
+from services import cache, events, rollup, scheduler
+
+logger = logging.getLogger(__name__)
+
+# Delayed freight detection.
+#
+# A background job keeps delayed_freights equal to the active freights whose
+# delivery date has passed: it adds the newly late ones (appending a DELAYED
+# journal event for each), drops the ones that were delivered, rejected or
+# rescheduled, and invalidates the dashboard cache when the set changed.
+# The "delays" KPI and drilldown read the set instead of comparing
+# delivery_date with the clock on every request.
+#
+# The job runs every CHECK_SECONDS and also right after any dashboard data
+# change, so a delivery leaves the set within moments. Each run compares the
+# set on the read pool first and takes the writer only if it is out of date.
+# Readers join back to freights, which also hides rows of freights deleted
+# since the last run.
+
+CHECK_SECONDS = int(os.getenv("EAGLES_DELAY_CHECK_SECONDS", "60"))
+
+def late_freights(db: Session, now=None):
+    """Ids of the active freights past their delivery date."""
+    F = models.Freight
+    return set(db.scalars(
+        select(F.id).where(F.status.in_(rollup.ACTIVE_STATUSES), F.delivery_date < (now or datetime.now()))
+    ))
+
+def _changes(db: Session, now=None):
+    late = late_freights(db, now)
+    stored = set(db.scalars(select(models.DelayedFreight.freight_id)))
+    return sorted(late - stored), sorted(stored - late)
+
+def needs_refresh(db: Session):
+    """True if delayed_freights is out of date (read-only, for the job's check)."""
+    added, removed = _changes(db)
+    return bool(added or removed)
+
+def refresh(db: Session, now=None):
+    """Brings delayed_freights up to date. Returns (added, removed) freight ids."""
+    D = models.DelayedFreight
+    added, removed = _changes(db, now)
+    if not (added or removed):
+        return [], []
+
+    if removed:
+        db.execute(delete(D).where(D.freight_id.in_(removed)))
+    if added:
+        detected_at = datetime.now()
+        db.execute(insert(D), [{"freight_id": i, "detected_at": detected_at} for i in added])
+        state = events.stored_state(db, added, events.STATE_COLUMNS)
+        events.append(db, [events.event_row(i, "DELAYED", state=state[i]) for i in added])
+        logger.info("Freights delayed: %s", added)
+    cache.touch(db)
+    db.commit()
+    return added, removed
+
+def delayed_count(db: Session):
+    return db.query(func.count(models.DelayedFreight.freight_id)).join(
+        models.Freight, models.Freight.id == models.DelayedFreight.freight_id
+    ).scalar()
+
+job = scheduler.PeriodicJob("delays", refresh, CHECK_SECONDS, check=needs_refresh)
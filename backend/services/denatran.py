@@ -1,5 +1,8 @@
 import requests
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Configuration paths
 BASE_CERT_PATH = r"C:\Users\Marcelo Kodrai\Documents\projetos_python\Eagles Transportes\Certificado_Digital"
@@ -28,7 +31,7 @@ class DenatranClient:
         }
 
         try:
-            print(f"DEBUG: Consulting DENATRAN for plate {placa} with CPF {self.cpf_usuario}...")
+            logger.debug("Consulting DENATRAN for plate %s", placa)
             response = requests.get(
                 url,
                 headers=headers,
@@ -37,7 +40,7 @@ class DenatranClient:
             )
             
             if response.status_code != 200:
-                print(f"DEBUG: Denatran Error {response.status_code}: {response.text}")
+                logger.warning("Denatran Error %s: %s", response.status_code, response.text)
                 raise Exception(f"Erro {response.status_code} - {response.text}")
 
             dados = response.json()
@@ -55,5 +58,5 @@ class DenatranClient:
             }
             
         except Exception as e:
-            print(f"DEBUG: Exception in DenatranClient: {e}")
+            logger.exception("Exception in DenatranClient")
             raise e
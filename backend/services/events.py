@@ -0,0 +1,124 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+import models
+
+# Freight event journal (freight_events).
+#
+# Every freight write appends one event in the same transaction: CREATED and
+# DELETED carry the freight state, UPDATED carries {field: [old, new]} for
+# the columns that changed plus the state after the change. ORM writes are
+# captured by the flush hooks below; Core/bulk writers call append().
+# DELAYED (state only) is appended by services/delays.py when a freight
+# passes its delivery date while still active. Projections (services/projections.py) consume the journal by event id.
+
+# Derived from origin/destination or sync bookkeeping, not journaled
+SKIPPED_COLUMNS = {
+    "id", "origin_city_id", "origin_state", "destination_city_id", "destination_state",
+    "updated_at", "change_version",
+}
+STATE_COLUMNS = ("status", "driver_id", "client_id", "valor_cliente", "valor_motorista")
+
+_columns = None
+_listeners = []
+
+def journaled_columns():
+    global _columns
+    if _columns is None:
+        _columns = [c.key for c in models.Freight.__table__.columns if c.key not in SKIPPED_COLUMNS]
+    return _columns
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def event_row(freight_id, type, state=None, changes=None):
+    data = {"state": {k: (state or {}).get(k) for k in STATE_COLUMNS}}
+    if changes:
+        data["changes"] = changes
+    return {
+        "freight_id": freight_id,
+        "type": type,
+        "data": json.dumps(data, default=_json_default, ensure_ascii=False),
+        "created_at": datetime.now(),
+    }
+
+def diff(old, new):
+    """{field: [old, new]} for the fields whose value differs."""
+    return {k: [old.get(k), v] for k, v in new.items() if old.get(k) != v}
+
+def stored_state(session: Session, freight_ids, columns=None):
+    """freight id -> {column: value}, read from the database (pre-flush state)."""
+    columns = columns or journaled_columns()
+    F = models.Freight
+    rows = session.execute(select(F.id, *[getattr(F, c) for c in columns]).where(F.id.in_(freight_ids))).all()
+    return {row[0]: dict(zip(columns, row[1:])) for row in rows}
+
+def append(session: Session, rows):
+    """Appends event rows (see event_row) from Core/bulk writers."""
+    if rows:
+        session.execute(insert(models.FreightEvent), rows)
+        session.info["events_written"] = True
+
+def subscribe(listener):
+    """listener() is called after a commit that wrote events."""
+    _listeners.append(listener)
+
+def _current_state(freight):
+    return {c: getattr(freight, c) for c in journaled_columns()}
+
+def _before_flush(session: Session, flush_context, instances):
+    new = [o for o in session.new if isinstance(o, models.Freight)]
+    dirty = [o for o in session.dirty if isinstance(o, models.Freight) and session.is_modified(o)]
+    deleted = [o for o in session.deleted if isinstance(o, models.Freight)]
+
+    pending = []
+    stored_ids = [o.id for o in dirty + deleted if o.id is not None]
+    stored = stored_state(session, stored_ids) if stored_ids else {}
+
+    for freight in new:
+        pending.append((freight, "CREATED", None))
+    for freight in dirty:
+        changes = diff(stored.get(freight.id, {}), _current_state(freight))
+        if changes:
+            pending.append((freight, "UPDATED", changes))
+    for freight in deleted:
+        pending.append((freight, "DELETED", stored.get(freight.id)))
+    session.info["pending_events"] = pending
+
+def _after_flush(session: Session, flush_context):
+    pending = session.info.pop("pending_events", None)
+    if not pending:
+        return
+    rows = []
+    for freight, type, extra in pending:
+        if type == "DELETED":
+            rows.append(event_row(freight.id, type, state=extra or {}))
+        else:
+            state = {c: getattr(freight, c) for c in STATE_COLUMNS}
+            rows.append(event_row(freight.id, type, state=state, changes=extra))
+    # Inside the flush: written with the same connection and transaction
+    session.connection().execute(insert(models.FreightEvent), rows)
+    session.info["events_written"] = True
+
+def _after_commit(session: Session):
+    # Also fired when a SAVEPOINT is released (writer units): wait for the real commit
+    if session.in_nested_transaction():
+        return
+    if session.info.pop("events_written", False):
+        for listener in _listeners:
+            listener()
+
+def _after_rollback(session: Session):
+    session.info.pop("events_written", None)
+    session.info.pop("pending_events", None)
+
+def register(session_factory):
+    event.listen(session_factory, "before_flush", _before_flush)
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
@@ -0,0 +1,370 @@
+import json
+import logging
+import re
+import threading
+from datetime import date, datetime
+
+import openpyxl
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+from services import locations
+
+logger = logging.getLogger(__name__)
+
+# Spreadsheet ("grade") import.
+#
+# Sheets are read with openpyxl in read-only mode, one row at a time, so
+# memory stays flat whatever the file size. A saved ImportProfile maps sheet
+# headers to fields; rows become clients, drivers and freights, upserted in
+# batches. Each batch commits together with the job's checkpoint row, so a
+# failed or interrupted job resumes exactly after the last committed row.
+
+BATCH_SIZE = 200
+MAX_ERRORS = 500
+
+FIELDS = {
+    "client_name", "cte_number", "valor_cliente", "origin", "pickup_date", "destination",
+    "delivery_date", "vehicle_plate", "antt", "driver_name", "driver_cpf", "valor_motorista",
+    "vehicle_type", "status", "observation",
+}
+REQUIRED_FIELDS = {"client_name", "origin", "destination", "pickup_date"}
+
+# "GRADE ATUALIZADA EAGLES TRANSPORTES" layout
+DEFAULT_PROFILE = {
+    "name": "Grade Eagles",
+    "sheet": "PROGRAMAÇÃO DE CARGAS 2026",
+    "header_row": 7,
+    "columns": {
+        "client_name": "CLIENTE: TOMADOR DO SERVIÇO",
+        "cte_number": "CT-e",
+        "valor_cliente": "VALOR",
+        "origin": "ORIGEM",
+        "pickup_date": "DATA COLETA",
+        "destination": "DESTINO",
+        "delivery_date": "DATA ENTREGA",
+        "vehicle_plate": "VEICULO",
+        "antt": "ANTT",
+        "driver_name": "MOTORISTA",
+        "driver_cpf": "CPF",
+        "valor_motorista": "VALOR/MT",
+        "vehicle_type": "TIPO",
+        "status": "STATUS DA CARGA",
+    },
+    "status_map": {
+        "EM CONTRATAÇÃO": "RECRUITING",
+        "CONTRATADO": "ASSIGNED",
+        "CARREGANDO": "LOADING",
+        "EM TRANSITO": "IN_TRANSIT",
+        "DESCARREGANDO": "IN_TRANSIT",
+        "ENTREGUE": "DELIVERED",
+        "COTAÇÃO": "QUOTED",
+        "CANCELADO": "REJECTED",
+    },
+}
+
+# "CTE-181", "CTe 7", "CTE-": rows whose CT-e is not issued yet. Stored as
+# NULL, so they are matched on (client, pickup, origin, destination)
+CTE_PLACEHOLDER = re.compile(r"CT-?E\s*-?\s*\d{0,4}", re.IGNORECASE)
+
+DATE_FORMATS = ("%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+_running = set()
+_lock = threading.Lock()
+
+def ensure_default_profile(db: Session):
+    if db.query(models.ImportProfile).filter(models.ImportProfile.name == DEFAULT_PROFILE["name"]).first():
+        return
+    db.add(models.ImportProfile(
+        name=DEFAULT_PROFILE["name"],
+        sheet=DEFAULT_PROFILE["sheet"],
+        header_row=DEFAULT_PROFILE["header_row"],
+        columns=json.dumps(DEFAULT_PROFILE["columns"], ensure_ascii=False),
+        status_map=json.dumps(DEFAULT_PROFILE["status_map"], ensure_ascii=False),
+    ))
+    db.commit()
+
+def validate_columns(columns):
+    unknown = set(columns) - FIELDS
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    missing = REQUIRED_FIELDS - set(columns)
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(sorted(missing))}")
+
+def mark_interrupted(db: Session):
+    """Jobs left RUNNING/PENDING by a previous process can only be resumed."""
+    db.query(models.ImportJob).filter(models.ImportJob.status.in_(["RUNNING", "PENDING"])).update(
+        {"status": "INTERRUPTED"}, synchronize_session=False
+    )
+    db.commit()
+
+def start(job_id):
+    """Runs the job in a background thread. Returns False if it is already running."""
+    with _lock:
+        if job_id in _running:
+            return False
+        _running.add(job_id)
+    threading.Thread(target=_run, args=(job_id,), name=f"import-job-{job_id}", daemon=True).start()
+    return True
+
+def is_running(job_id):
+    return job_id in _running
+
+def _run(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        with _lock:
+            _running.discard(job_id)
+
+def run_job(job_id):
+    db = SessionLocal()
+    try:
+        job = db.get(models.ImportJob, job_id)
+        job.status = "RUNNING"
+        job.message = None
+        job.started_at = job.started_at or datetime.now()
+        job.finished_at = None
+        db.commit()
+
+        try:
+            _import(db, job)
+            job.status = "DONE"
+            job.finished_at = datetime.now()
+        except Exception as e:
+            logger.exception("Import job %s failed", job_id)
+            db.rollback()
+            job.status = "FAILED"
+            job.message = str(e)
+        db.commit()
+        logger.info("Import job %s %s: %s inserted, %s updated, %s failed",
+                    job_id, job.status, job.inserted, job.updated, job.failed)
+    finally:
+        db.close()
+
+# Cell parsing
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = " ".join(str(value).split())
+    return text or None
+
+def _number(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = re.sub(r"[^\d,.\-]", "", str(value))
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"Invalid number: {value!r}")
+
+def _date(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    text = " ".join(re.sub(r"(?i)(\d)\s*h\b", r"\1", str(value)).split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value!r}")
+
+def _digits(value):
+    return "".join(c for c in str(value or "") if c.isdigit())
+
+def _match_columns(header, columns):
+    """field -> column index, matching headers case/accent/space-insensitively."""
+    positions = {}
+    for i, cell in enumerate(header):
+        key = locations.normalize(str(cell)) if cell is not None else ""
+        if key and key not in positions:
+            positions[key] = i
+
+    matched, missing = {}, []
+    for field, title in columns.items():
+        index = positions.get(locations.normalize(title))
+        if index is None:
+            missing.append(title)
+        else:
+            matched[field] = index
+    if missing:
+        raise ValueError(f"Columns not found in header row: {', '.join(missing)}")
+    return matched
+
+class _Lookups:
+    """Clients by name and drivers by CPF/name, loaded once per run."""
+
+    def __init__(self, db: Session):
+        self.clients = {}
+        for client_id, name in db.query(models.Client.id, models.Client.name):
+            self.clients.setdefault(locations.normalize(name), client_id)
+        self.drivers_by_cpf, self.drivers_by_name = {}, {}
+        for driver_id, name, cpf in db.query(models.Driver.id, models.Driver.name, models.Driver.cpf):
+            if _digits(cpf):
+                self.drivers_by_cpf.setdefault(_digits(cpf), driver_id)
+            self.drivers_by_name.setdefault(locations.normalize(name), driver_id)
+
+    def client_id(self, db: Session, name):
+        key = locations.normalize(name)
+        if key not in self.clients:
+            client = models.Client(name=name.upper(), phone="")
+            db.add(client)
+            db.flush()
+            self.clients[key] = client.id
+        return self.clients[key]
+
+    def driver_id(self, db: Session, row):
+        name, cpf = row.get("driver_name"), _digits(row.get("driver_cpf"))
+        if not name and not cpf:
+            return None
+        if cpf and cpf in self.drivers_by_cpf:
+            return self.drivers_by_cpf[cpf]
+        key = locations.normalize(name)
+        if not cpf:
+            # Drivers are registered by CPF; without one only link an existing driver
+            return self.drivers_by_name.get(key)
+
+        driver = models.Driver(
+            name=(name or cpf).upper(),
+            phone="",
+            cpf=_text(row.get("driver_cpf")),
+            antt=_text(row.get("antt")),
+            vehicle_plate=_text(row.get("vehicle_plate")),
+            vehicle_type=(_text(row.get("vehicle_type")) or "").upper() or None,
+            status="ACTIVE",
+        )
+        db.add(driver)
+        db.flush()
+        self.drivers_by_cpf[cpf] = driver.id
+        self.drivers_by_name.setdefault(key, driver.id)
+        return driver.id
+
+def _parse_row(row, status_map):
+    """Row dict -> freight values. Returns None for blank/title rows; raises ValueError."""
+    origin, destination = _text(row.get("origin")), _text(row.get("destination"))
+    pickup_date = _date(row.get("pickup_date"))
+    if not origin and not destination and pickup_date is None:
+        return None
+
+    client_name = _text(row.get("client_name"))
+    missing = [name for name, value in (("client", client_name), ("origin", origin),
+               ("destination", destination), ("pickup date", pickup_date)) if not value]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+
+    raw_status = locations.normalize(_text(row.get("status")))
+    if raw_status and raw_status not in status_map:
+        raise ValueError(f"Unknown status: {_text(row.get('status'))!r}")
+
+    cte_number = _text(row.get("cte_number"))
+    if cte_number and (CTE_PLACEHOLDER.fullmatch(cte_number) or not _digits(cte_number)):
+        cte_number = None
+    return {
+        "client_name": client_name,
+        "origin": origin.upper(),
+        "destination": destination.upper(),
+        "pickup_date": pickup_date,
+        "delivery_date": _date(row.get("delivery_date")) or pickup_date,
+        "valor_cliente": _number(row.get("valor_cliente")) or 0.0,
+        "valor_motorista": _number(row.get("valor_motorista")) or 0.0,
+        "status": status_map.get(raw_status, "QUOTED"),
+        "cte_number": cte_number,
+        "observation": _text(row.get("observation")),
+    }
+
+def _import(db: Session, job: models.ImportJob):
+    profile = job.profile
+    columns = json.loads(profile.columns)
+    status_map = {locations.normalize(k): v for k, v in json.loads(profile.status_map or "{}").items()}
+    header_row = profile.header_row or 1
+
+    workbook = openpyxl.load_workbook(job.file_path, read_only=True, data_only=True)
+    try:
+        if profile.sheet and profile.sheet not in workbook.sheetnames:
+            raise ValueError(f"Sheet not found: {profile.sheet}")
+        sheet = workbook[profile.sheet] if profile.sheet else workbook.worksheets[0]
+
+        header = next(sheet.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+        positions = _match_columns(header, columns)
+        if sheet.max_row:
+            job.total_rows = max(sheet.max_row - header_row, 0)
+            db.commit()
+
+        lookups = _Lookups(db)
+        first_row = max(job.checkpoint_row or 0, header_row) + 1
+        batch = []
+        for row_number, values in enumerate(sheet.iter_rows(min_row=first_row, values_only=True), first_row):
+            batch.append((row_number, {f: values[i] if i < len(values) else None for f, i in positions.items()}))
+            if len(batch) >= BATCH_SIZE:
+                _import_batch(db, job, batch, status_map, lookups)
+                batch = []
+        if batch:
+            _import_batch(db, job, batch, status_map, lookups)
+    finally:
+        workbook.close()
+
+def _import_batch(db: Session, job: models.ImportJob, batch, status_map, lookups):
+    F = models.Freight
+    errors = []
+    parsed = []
+    for row_number, row in batch:
+        try:
+            values = _parse_row(row, status_map)
+        except ValueError as e:
+            errors.append({"row": row_number, "message": str(e)})
+            continue
+        if values is None:
+            job.skipped += 1
+            continue
+        values["client_id"] = lookups.client_id(db, values.pop("client_name"))
+        values["driver_id"] = lookups.driver_id(db, row)
+        parsed.append(values)
+
+    # Existing freights: by CT-e when the sheet has one, else by (client, pickup, origin, destination)
+    ctes = {v["cte_number"] for v in parsed if v["cte_number"]}
+    natural = {(v["client_id"], v["pickup_date"], v["origin"], v["destination"]) for v in parsed if not v["cte_number"]}
+    by_cte, by_natural = {}, {}
+    if ctes:
+        for freight in db.query(F).filter(F.cte_number.in_(ctes)):
+            by_cte.setdefault(freight.cte_number, freight)
+    if natural:
+        for freight in db.query(F).filter(tuple_(F.client_id, F.pickup_date, F.origin, F.destination).in_(natural)):
+            by_natural.setdefault((freight.client_id, freight.pickup_date, freight.origin, freight.destination), freight)
+
+    for values in parsed:
+        if values["cte_number"]:
+            index, key = by_cte, values["cte_number"]
+        else:
+            index, key = by_natural, (values["client_id"], values["pickup_date"], values["origin"], values["destination"])
+
+        freight = index.get(key)
+        if freight is None:
+            index[key] = F(**values)
+            db.add(index[key])
+            job.inserted += 1
+        else:
+            for field, value in values.items():
+                setattr(freight, field, value)
+            job.updated += 1
+
+    job.failed += len(errors)
+    if errors:
+        previous = json.loads(job.errors or "[]")
+        job.errors = json.dumps((previous + errors)[:MAX_ERRORS], ensure_ascii=False)
+    job.processed_rows = (job.processed_rows or 0) + len(batch)
+    job.checkpoint_row = batch[-1][0]
+    db.commit()
@@ -0,0 +1,142 @@
+import codecs
+import csv
+import io
+import tempfile
+
+from openpyxl import Workbook
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+import models
+from database import ReadSessionLocal
+
+# Spreadsheet exports of freights and financial transactions.
+#
+# Rows are read with yield_per, so the database hands them over a batch at a
+# time instead of materializing the whole result. CSV is written to the
+# response as it goes (';' separated, decimal commas, UTF-8 with BOM so
+# Excel in pt-BR opens it with numbers and accents intact). XLSX uses
+# openpyxl's write-only workbook, which spills rows to a temporary file; the
+# finished file is then streamed in chunks. Either way memory does not grow
+# with the number of rows.
+#
+# The generators open their own session: they run after the endpoint has
+# returned, while the response is being sent.
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+YIELD_PER = 1000
+CSV_FLUSH_ROWS = 500
+FILE_CHUNK_BYTES = 64 * 1024
+
+def ordered(stmt, *columns):
+    """stmt ordered by the named output columns; stmt may be a UNION ALL."""
+    rows = stmt.subquery()
+    return select(rows).order_by(*(rows.c[name] for name in columns))
+
+def freights_query(status=None, client_id=None, driver_id=None, billing_status=None, pickup_from=None, pickup_to=None,
+                   F=models.Freight):
+    """Unordered; F may be models.ArchivedFreight (see archive.union_freights)."""
+    C = aliased(models.Client)
+    D = aliased(models.Driver)
+    stmt = (
+        select(
+            F.id, F.cte_number, F.pickup_date, F.delivery_date, C.name, C.cnpj,
+            F.origin, F.destination, D.name, D.vehicle_plate, F.status,
+            F.valor_cliente, F.valor_motorista, F.billing_status, F.delivered_at, F.observation,
+        )
+        .outerjoin(C, F.client_id == C.id)
+        .outerjoin(D, F.driver_id == D.id)
+    )
+    if status:
+        stmt = stmt.where(F.status.in_(status))
+    if client_id is not None:
+        stmt = stmt.where(F.client_id == client_id)
+    if driver_id is not None:
+        stmt = stmt.where(F.driver_id == driver_id)
+    if billing_status:
+        stmt = stmt.where(F.billing_status == billing_status)
+    if pickup_from:
+        stmt = stmt.where(F.pickup_date >= pickup_from)
+    if pickup_to:
+        stmt = stmt.where(F.pickup_date < pickup_to)
+    return stmt
+
+FREIGHT_HEADERS = [
+    "ID", "CT-e", "Coleta", "Entrega", "Cliente", "CNPJ/CPF",
+    "Origem", "Destino", "Motorista", "Placa", "Status",
+    "Valor Cliente", "Valor Motorista", "Faturamento", "Entregue em", "Observação",
+]
+
+def transactions_query(type=None, status=None, date_from=None, date_to=None, T=models.FinancialTransaction):
+    """Unordered; T may be models.ArchivedTransaction (see archive.union_transactions)."""
+    stmt = select(
+        T.id, T.date, T.type, T.category, T.description, T.amount, T.status, T.related_freight_id,
+    )
+    if type:
+        stmt = stmt.where(T.type == type)
+    if status:
+        stmt = stmt.where(T.status == status)
+    if date_from:
+        stmt = stmt.where(T.date >= date_from)
+    if date_to:
+        stmt = stmt.where(T.date < date_to)
+    return stmt
+
+TRANSACTION_HEADERS = ["ID", "Data", "Tipo", "Categoria", "Descrição", "Valor", "Status", "Frete"]
+
+def _rows(stmt):
+    db = ReadSessionLocal()
+    try:
+        for row in db.execute(stmt.execution_options(yield_per=YIELD_PER)):
+            yield row
+    finally:
+        db.close()
+
+def _csv_value(value):
+    if hasattr(value, "strftime"):
+        return value.strftime("%d/%m/%Y %H:%M")
+    if isinstance(value, float):
+        # Only floats are money here; pt-BR Excel wants a decimal comma
+        return f"{value:.2f}".replace(".", ",")
+    return value
+
+def stream_csv(stmt, headers):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow(headers)
+    yield codecs.BOM_UTF8 + buffer.getvalue().encode("utf-8")
+
+    buffer.seek(0)
+    buffer.truncate()
+    for count, row in enumerate(_rows(stmt), 1):
+        writer.writerow([_csv_value(v) for v in row])
+        if count % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def stream_xlsx(stmt, headers, title):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(headers)
+    for row in _rows(stmt):
+        sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        f.seek(0)
+        while True:
+            chunk = f.read(FILE_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+def stream(format, stmt, headers, title):
+    if format == "xlsx":
+        return stream_xlsx(stmt, headers, title)
+    return stream_csv(stmt, headers)
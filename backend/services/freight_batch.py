@@ -0,0 +1,98 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+import models
+from services import cache, events, rollup, sync
+
+logger = logging.getLogger(__name__)
+
+# Batch freight operations (POST /freights/batch).
+#
+# Each operation is one set-based UPDATE/DELETE over its freight ids, and the
+# whole batch is a single transaction. The rollup is adjusted once, from the
+# stored state of every touched freight before and after the batch, the
+# dashboard cache is invalidated once on commit, and each changed freight gets
+# its journal event and the transaction's sync version (deletes a tombstone).
+
+STATUSES = ["QUOTED", "RECRUITING", "ASSIGNED", "LOADING", "IN_TRANSIT", "DELIVERED", "REJECTED"]
+MAX_FREIGHTS = 1000
+
+def _fail(results, index, op, freight_ids, error):
+    results.extend({"index": index, "op": op, "freight_id": i, "ok": False, "error": error} for i in freight_ids)
+
+def apply_operations(db: Session, operations, can_delete=True):
+    """Runs the operations in order. Returns per-freight results; raises on database errors."""
+    F = models.Freight
+    all_ids = {i for operation in operations for i in operation.freight_ids}
+    if len(all_ids) > MAX_FREIGHTS:
+        raise ValueError(f"At most {MAX_FREIGHTS} freights per batch")
+
+    existing = set(db.scalars(select(F.id).where(F.id.in_(all_ids)))) if all_ids else set()
+    before = rollup.stored_contributions(db, existing) if existing else {}
+
+    results = []
+    journal = []
+    for index, operation in enumerate(operations):
+        op = operation.op
+        ids = list(dict.fromkeys(operation.freight_ids))
+        found = [i for i in ids if i in existing]
+        _fail(results, index, op, [i for i in ids if i not in existing], "Freight not found")
+        if not found:
+            continue
+
+        stored = events.stored_state(db, found, events.STATE_COLUMNS + ("delivered_at",))
+
+        if op == "status":
+            if operation.status not in STATUSES:
+                _fail(results, index, op, found, f"Invalid status: {operation.status}")
+                continue
+            values = {"status": operation.status}
+            if operation.status == "DELIVERED":
+                values["delivered_at"] = func.coalesce(F.delivered_at, datetime.now())
+            db.execute(update(F).where(F.id.in_(found)).values(**values, **sync.stamp_values(db)))
+        elif op == "assign":
+            if operation.driver_id is None or db.get(models.Driver, operation.driver_id) is None:
+                _fail(results, index, op, found, "Driver not found")
+                continue
+            # Same as /assign: the driver still has to accept
+            db.execute(update(F).where(F.id.in_(found)).values(driver_id=operation.driver_id, **sync.stamp_values(db)))
+        elif op == "unassign":
+            db.execute(update(F).where(F.id.in_(found)).values(driver_id=None, **sync.stamp_values(db)))
+        elif op == "delete":
+            if not can_delete:
+                _fail(results, index, op, found, "Missing permission: delete_freight")
+                continue
+            db.execute(delete(models.Attachment).where(models.Attachment.freight_id.in_(found)))
+            db.execute(delete(F).where(F.id.in_(found)))
+            sync.add_tombstones(db, "freights", found)
+            existing.difference_update(found)
+            journal += [events.event_row(i, "DELETED", state=stored[i]) for i in found]
+
+        if op != "delete":
+            after = events.stored_state(db, found, events.STATE_COLUMNS + ("delivered_at",))
+            for i in found:
+                changes = events.diff(stored[i], after[i])
+                if changes:
+                    journal.append(events.event_row(i, "UPDATED", state=after[i], changes=changes))
+
+        results.extend({"index": index, "op": op, "freight_id": i, "ok": True, "error": None} for i in found)
+
+    applied = [r for r in results if r["ok"]]
+    if applied:
+        after = rollup.stored_contributions(db, existing) if existing else {}
+        touched = {r["freight_id"] for r in applied}
+        rollup.apply(
+            db,
+            removed=[before.get(i) for i in touched],
+            added=[after.get(i) for i in touched],
+        )
+        events.append(db, journal)
+        cache.touch(db)
+    db.commit()
+
+    logger.info("Freight batch: %s operations, %s applied, %s failed",
+                len(operations), len(applied), len(results) - len(applied))
+    return {"applied": len(applied), "failed": len(results) - len(applied), "results": results}
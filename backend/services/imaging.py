@@ -0,0 +1,42 @@
+import io
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Image recompression, run inside the media process pool (services/media.py).
+#
+# Kept free of database/app imports: worker processes import only this module.
+
+MAX_SIZE = 2048 # longest side of the stored image
+THUMB_SIZE = 320
+QUALITY = 82
+THUMB_QUALITY = 70
+
+def _encode(image, quality):
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+def process_image(data):
+    """Photo bytes -> dict with recompressed JPEG, thumbnail and dimensions.
+
+    Raises ValueError for anything Pillow cannot read as an image.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        raise ValueError("not a valid image")
+
+    # Phone photos are often stored sideways with an EXIF rotation flag
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    image.thumbnail((MAX_SIZE, MAX_SIZE), Image.LANCZOS)
+    full = _encode(image, QUALITY)
+    width, height = image.size
+
+    image.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.LANCZOS)
+    thumb = _encode(image, THUMB_QUALITY)
+
+    return {"image": full, "thumb": thumb, "width": width, "height": height}
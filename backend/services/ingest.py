@@ -0,0 +1,248 @@
+import codecs
+import json
+import logging
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import models, schemas
+from services import cache, events, locations, rollup, sync
+
+logger = logging.getLogger(__name__)
+
+# Bulk freight ingestion.
+#
+# Records arrive as NDJSON (one object per line) or as a JSON array, and are
+# parsed incrementally as the request body streams in. Every CHUNK_SIZE
+# records are validated, checked against clients with one IN query, and
+# inserted with a single executemany in their own transaction. Core inserts
+# skip the ORM flush hooks, so locations, rollup, cache, the event journal and
+# the sync version are updated here.
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 1000
+
+class RecordParser:
+    """Incremental parser: feed() text as it arrives, get back complete records."""
+
+    def __init__(self, ndjson):
+        self.ndjson = ndjson
+        self.buffer = ""
+        self.started = False
+        self.finished = False
+        self.decoder = json.JSONDecoder()
+
+    def feed(self, text):
+        self.buffer += text
+        return self._drain_ndjson() if self.ndjson else self._drain_array()
+
+    def close(self):
+        """Returns the records left in the buffer; raises ValueError on truncated input."""
+        if self.ndjson:
+            records = self._drain_ndjson()
+            tail = self.buffer.strip()
+            self.buffer = ""
+            if tail:
+                records.append(self._loads(tail))
+            return records
+
+        records = self._drain_array()
+        if self.buffer.strip() or (self.started and not self.finished):
+            raise ValueError("Unexpected end of JSON array")
+        return records
+
+    def _loads(self, line):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            # Keep parsing: a bad line is a per-row error, not a failed upload
+            return ValueError(f"Invalid JSON: {e}")
+
+    def _drain_ndjson(self):
+        records = []
+        *lines, self.buffer = self.buffer.split("\n")
+        for line in lines:
+            line = line.strip()
+            if line:
+                records.append(self._loads(line))
+        return records
+
+    def _drain_array(self):
+        records = []
+        buf = self.buffer
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf) or self.finished:
+                break
+            if not self.started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array or NDJSON")
+                self.started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                self.finished = True
+                pos += 1
+                continue
+            try:
+                record, end = self.decoder.raw_decode(buf, pos)
+            except ValueError as e:
+                end = _element_end(buf, pos)
+                if end is None:
+                    break # incomplete element, wait for more data
+                # Malformed element: a per-row error, parsing resumes after it
+                record = ValueError(f"Invalid JSON: {e}")
+            records.append(record)
+            pos = end
+        self.buffer = buf[pos:]
+        return records
+
+def _element_end(buf, pos):
+    """Index of the "," or "]" ending the array element at pos, or None if not in buf yet."""
+    depth = 0
+    in_string = escaped = False
+    for i in range(pos, len(buf)):
+        c = buf[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "[{":
+            depth += 1
+        elif c in "]}":
+            if depth == 0 and c == "]":
+                return i
+            depth = max(depth - 1, 0)
+        elif c == "," and depth == 0:
+            return i
+    return None
+
+def _format_errors(e: ValidationError):
+    return [{"field": ".".join(str(p) for p in err["loc"]), "message": err["msg"]} for err in e.errors()]
+
+def ingest_chunk(db: Session, records, first_row):
+    """Validates and inserts one chunk. Returns (inserted, errors)."""
+    errors = []
+    valid = []
+    for offset, record in enumerate(records):
+        row = first_row + offset
+        if isinstance(record, ValueError):
+            errors.append({"row": row, "errors": [{"field": None, "message": str(record)}]})
+            continue
+        if not isinstance(record, dict):
+            errors.append({"row": row, "errors": [{"field": None, "message": "Expected a JSON object"}]})
+            continue
+        try:
+            valid.append((row, schemas.FreightCreate(**record)))
+        except ValidationError as e:
+            errors.append({"row": row, "errors": _format_errors(e)})
+
+    client_ids = {freight.client_id for _, freight in valid}
+    known = set(db.scalars(select(models.Client.id).where(models.Client.id.in_(client_ids)))) if client_ids else set()
+
+    values = []
+    contributions = []
+    for row, freight in valid:
+        if freight.client_id not in known:
+            errors.append({"row": row, "errors": [{"field": "client_id", "message": "Client not found"}]})
+            continue
+        data = freight.dict()
+        data["status"] = data["status"] or "QUOTED"
+        data["billing_status"] = "PENDING"
+        data["origin_city_id"], data["origin_state"] = locations.resolve(db, data["origin"])
+        data["destination_city_id"], data["destination_state"] = locations.resolve(db, data["destination"])
+        values.append(data)
+        contributions.append(rollup.contribution(
+            data["pickup_date"], data["status"], data["origin"], data["origin_state"],
+            None, data["valor_cliente"], data["valor_motorista"]
+        ))
+
+    if values:
+        try:
+            F = models.Freight
+            stamp = sync.stamp_values(db)
+            for data in values:
+                data.update(stamp)
+            ids = db.scalars(insert(F).returning(F.id, sort_by_parameter_order=True), values).all()
+            events.append(db, [events.event_row(i, "CREATED", state=v) for i, v in zip(ids, values)])
+            rollup.apply(db, added=contributions)
+            cache.touch(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    return len(values), errors
+
+class BulkIngest:
+    """Accumulates parsed records and writes them chunk by chunk."""
+
+    def __init__(self, db: Session, chunk_size=CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.error = None # why the upload stopped early, if it did
+
+    def ready(self):
+        return len(self.pending) >= self.chunk_size
+
+    def add(self, records):
+        self.pending.extend(records)
+
+    def flush(self, final=False):
+        while len(self.pending) >= self.chunk_size or (final and self.pending):
+            chunk = self.pending[:self.chunk_size]
+            self.pending = self.pending[self.chunk_size:]
+            inserted, errors = ingest_chunk(self.db, chunk, self.received + 1)
+            self.received += len(chunk)
+            self.inserted += inserted
+            self.failed += len(errors)
+            self.errors.extend(errors[:MAX_ERRORS - len(self.errors)])
+
+    def result(self):
+        logger.info("Bulk ingest: %s received, %s inserted, %s failed", self.received, self.inserted, self.failed)
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "error": self.error,
+        }
+
+async def ingest_stream(db: Session, chunks, ndjson, chunk_size=CHUNK_SIZE):
+    """Consumes an async iterator of body bytes; database work runs in the threadpool.
+
+    A body that is not a JSON array or ends mid-array stops the upload: the
+    records parsed up to there are still written, and the result says why in
+    "error" (None otherwise).
+    """
+    parser = RecordParser(ndjson)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    job = BulkIngest(db, chunk_size)
+
+    try:
+        async for data in chunks:
+            job.add(parser.feed(decoder.decode(data)))
+            if job.ready():
+                await run_in_threadpool(job.flush)
+
+        job.add(parser.feed(decoder.decode(b"", final=True)))
+        job.add(parser.close())
+    except ValueError as e:
+        job.error = str(e)
+    await run_in_threadpool(job.flush, True)
+    return job.result()
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Live dashboard fan-out (Server-Sent Events).
+#
+# Data version bumps (services/cache.py) are coalesced for a short debounce
+# window, the dashboard snapshot is computed once, and only what changed is
+# pushed to every connected operator. Each subscriber has a small bounded
+# queue; a client that falls behind gets its backlog replaced by one full
+# snapshot instead of holding memory or stalling the others.
+
+MAX_SUBSCRIBERS = 100
+QUEUE_SIZE = 8
+DEBOUNCE_SECONDS = 0.5
+REFRESH_SECONDS = 30 # clock-driven KPIs (deliveries today) change without writes
+
+class DashboardHub:
+    def __init__(self, compute, max_subscribers=MAX_SUBSCRIBERS, queue_size=QUEUE_SIZE,
+                 debounce_seconds=DEBOUNCE_SECONDS, refresh_seconds=REFRESH_SECONDS):
+        self.compute = compute
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.debounce_seconds = debounce_seconds
+        self.refresh_seconds = refresh_seconds
+        self._subscribers = set()
+        self._loop = None
+        self._pending = False
+        self._ticker = None
+        self._last = None
+
+    async def subscribe(self):
+        if len(self._subscribers) >= self.max_subscribers:
+            raise HTTPException(status_code=503, detail="Too many live dashboard connections")
+
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        snapshot = await run_in_threadpool(self.compute)
+        if self._last is None:
+            self._last = snapshot
+        queue.put_nowait({"event": "snapshot", "data": snapshot})
+
+        self._subscribers.add(queue)
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.ensure_future(self._tick())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            # notify() stops tracking changes with nobody listening: the next
+            # subscriber's snapshot becomes the base for deltas
+            self._last = None
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def notify(self, version=None):
+        """Thread-safe; called on every data version bump."""
+        loop = self._loop
+        if loop is None or not self._subscribers or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        if self._pending:
+            return
+        self._pending = True
+        self._loop.call_later(self.debounce_seconds, lambda: asyncio.ensure_future(self._publish()))
+
+    async def _tick(self):
+        while self._subscribers:
+            await asyncio.sleep(self.refresh_seconds)
+            self._schedule()
+
+    async def _publish(self):
+        self._pending = False
+        if not self._subscribers:
+            return
+        try:
+            snapshot = await run_in_threadpool(self.compute)
+        except Exception:
+            logger.exception("Live dashboard refresh failed")
+            return
+
+        delta = self._diff(self._last or {}, snapshot)
+        self._last = snapshot
+        if delta:
+            self._broadcast({"event": "delta", "data": delta})
+
+    @staticmethod
+    def _diff(old, new):
+        delta = {}
+        kpis = {k: v for k, v in new.get("kpis", {}).items() if old.get("kpis", {}).get(k) != v}
+        if kpis:
+            delta["kpis"] = kpis
+        for key in ("charts", "recent_freights"):
+            if old.get(key) != new.get(key):
+                delta[key] = new.get(key)
+        return delta
+
+    def _broadcast(self, message):
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Too far behind for deltas to apply: replace the backlog with a full snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                message_for_queue = {"event": "snapshot", "data": self._last}
+            else:
+                message_for_queue = message
+            queue.put_nowait(message_for_queue)
@@ -0,0 +1,34 @@
+import os
+
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+import models
+
+# Loader options for list endpoints that serialize relationships.
+#
+# Every query that returns rows rendered through schemas with nested objects
+# takes its options from here, so relationships are loaded in the same SELECT
+# instead of one lazy SELECT per row. With EAGLES_RAISE_ON_LAZY=1 (CI) any
+# relationship not listed raises on access, turning N+1 regressions into
+# errors.
+
+def raise_on_lazy():
+    return os.getenv("EAGLES_RAISE_ON_LAZY", "") == "1"
+
+def _with_strict(*options):
+    if raise_on_lazy():
+        return (*options, raiseload("*"))
+    return options
+
+def freight_full(F=models.Freight):
+    """schemas.Freight: nests Driver, Client and Attachments. F may be models.ArchivedFreight."""
+    return _with_strict(
+        joinedload(F.driver),
+        joinedload(F.client),
+        # one-to-many: a second IN query instead of multiplying joined rows
+        selectinload(F.attachments),
+    )
+
+def freight_with_client(F=models.Freight):
+    """Billing lists: only read client.name."""
+    return _with_strict(joinedload(F.client))
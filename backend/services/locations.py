@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import unicodedata
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+import models
+
+# City reference data and origin/destination resolution.
+#
+# Freight.origin / Freight.destination are free text typed by operators
+# ("CAMPINAS - SP", "Curitiba, PR", "São Paulo/SP"). They are resolved once,
+# at write time, into city id + UF columns so filters can use an index.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CITIES_JSON = os.path.join(os.path.dirname(BASE_DIR), "frontend", "public", "cities.json")
+
+UFS = {
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA",
+    "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO",
+}
+
+_SEPARATORS = re.compile(r"\s*(?:-|,|/)\s*")
+
+# (name_key, uf) -> city id, and name_key -> [city ids] for names typed without UF
+_index = None
+
+def normalize(text):
+    """Upper case, no accents, single spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.upper().split())
+
+def parse(text):
+    """Splits free text into (city name key, UF). Either part may be None."""
+    raw = normalize(text)
+    if not raw:
+        return None, None
+    if raw in UFS:
+        return None, raw
+
+    parts = [p for p in _SEPARATORS.split(raw) if p]
+    if len(parts) > 1 and parts[-1] in UFS:
+        return " ".join(parts[:-1]), parts[-1]
+    return raw, None
+
+def _load_index(session: Session):
+    global _index
+    if _index is None:
+        by_key, by_name = {}, {}
+        rows = session.execute(select(models.City.id, models.City.name_key, models.City.state)).all()
+        for city_id, name_key, state in rows:
+            by_key[(name_key, state)] = city_id
+            by_name.setdefault(name_key, []).append((city_id, state))
+        _index = (by_key, by_name)
+    return _index
+
+def resolve(session: Session, text):
+    """Returns (city_id, uf) for a free text location; unknown parts are None."""
+    name, uf = parse(text)
+    if name is None:
+        return None, uf
+
+    by_key, by_name = _load_index(session)
+    if uf:
+        return by_key.get((name, uf)), uf
+
+    # No UF typed: only trust the name if it is unambiguous
+    matches = by_name.get(name, [])
+    if len(matches) == 1:
+        return matches[0]
+    return None, None
+
+def assign(session: Session, freight: models.Freight):
+    freight.origin_city_id, freight.origin_state = resolve(session, freight.origin)
+    freight.destination_city_id, freight.destination_state = resolve(session, freight.destination)
+
+def _before_flush(session: Session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, models.Freight):
+            continue
+        if obj in session.new or _location_changed(obj):
+            assign(session, obj)
+
+def _location_changed(freight):
+    state = inspect(freight)
+    return state.attrs.origin.history.has_changes() or state.attrs.destination.history.has_changes()
+
+def register(session_factory):
+    event.listen(session_factory, "before_flush", _before_flush)
+
+def ensure_cities(session: Session, path=CITIES_JSON):
+    """Loads cities.json ("NOME - UF" entries) into the cities table, adding only missing ones."""
+    global _index
+    if not os.path.exists(path):
+        return 0
+
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    existing = set(session.execute(select(models.City.name_key, models.City.state)).all())
+    added = 0
+    for entry in entries:
+        name, uf = parse(entry)
+        if not name or not uf or (name, uf) in existing:
+            continue
+        session.add(models.City(name=entry.rsplit("-", 1)[0].strip().upper(), name_key=name, state=uf))
+        existing.add((name, uf))
+        added += 1
+
+    if added:
+        session.commit()
+        _index = None
+    return added
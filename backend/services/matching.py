@@ -0,0 +1,161 @@
+import numpy as np
+from sqlalchemy import case, func, select
+
+import models
+from services import locations, rollup
+from services.cache import ResponseCache, dashboard_cache
+
+# Driver recommendations for a freight (GET /freights/{id}/candidates).
+#
+# Every ACTIVE driver is reduced to a feature vector built with a few
+# aggregate queries: vehicle type, where the latest delivery ended, how often
+# offers were accepted (accepted_at) or turned down (rejection_reason), and
+# how many active freights are already assigned. The vectors are cached and
+# dropped with the dashboard cache, so they are rebuilt only after a write.
+# Ranking one freight is then a handful of NumPy array operations over all
+# drivers at once.
+
+# Score = weighted sum of features in [0, 1]
+WEIGHTS = {
+    "backhaul": 0.40,   # latest delivery ended where this freight is picked up
+    "acceptance": 0.25, # smoothed share of offers accepted
+    "availability": 0.25, # 1 / (1 + active freights)
+    "vehicle": 0.10,    # has a vehicle registered
+}
+# Backhaul proximity by how close the latest destination is to the pickup
+SAME_CITY, SAME_STATE, SAME_REGION = 1.0, 0.6, 0.3
+
+REGIONS = {
+    "N": ["AC", "AP", "AM", "PA", "RO", "RR", "TO"],
+    "NE": ["AL", "BA", "CE", "MA", "PB", "PE", "PI", "RN", "SE"],
+    "CO": ["DF", "GO", "MT", "MS"],
+    "SE": ["ES", "MG", "RJ", "SP"],
+    "S": ["PR", "RS", "SC"],
+}
+STATE_CODES = {uf: i for i, uf in enumerate(sorted(locations.UFS))}
+REGION_OF_STATE = np.array([
+    next(r for r, ufs in enumerate(REGIONS.values()) if uf in ufs) for uf in sorted(locations.UFS)
+] + [-1]) # last slot: unknown state
+
+def vehicle_key(vehicle_type):
+    return locations.normalize(vehicle_type)
+
+class DriverFeatures:
+    """Column arrays, one row per ACTIVE driver."""
+
+    def __init__(self, drivers, stats, last_delivery):
+        n = len(drivers)
+        self.ids = np.array([d.id for d in drivers], dtype=np.int64)
+        self.names = [d.name for d in drivers]
+        self.phones = [d.phone for d in drivers]
+        self.vehicle_types = [d.vehicle_type for d in drivers]
+        self.vehicle_keys = np.array([vehicle_key(d.vehicle_type) for d in drivers], dtype=object)
+        self.has_vehicle = (self.vehicle_keys != "").astype(np.float64)
+
+        self.accepted = np.zeros(n)
+        self.rejected = np.zeros(n)
+        self.active = np.zeros(n)
+        self.last_city = np.full(n, -1, dtype=np.int64)
+        self.last_state = np.full(n, len(STATE_CODES), dtype=np.int64)
+        self.last_destination = [None] * n
+
+        position = {driver_id: i for i, driver_id in enumerate(self.ids.tolist())}
+        for driver_id, accepted, rejected, active in stats:
+            i = position.get(driver_id)
+            if i is not None:
+                self.accepted[i], self.rejected[i], self.active[i] = accepted, rejected, active
+        for driver_id, destination, city_id, state in last_delivery:
+            i = position.get(driver_id)
+            if i is not None:
+                self.last_destination[i] = destination
+                self.last_city[i] = city_id if city_id is not None else -1
+                self.last_state[i] = STATE_CODES.get(state, len(STATE_CODES))
+
+        # Laplace smoothing: a driver without history starts at 0.5
+        self.acceptance = (self.accepted + 1) / (self.accepted + self.rejected + 2)
+        self.availability = 1 / (1 + self.active)
+        self.last_region = REGION_OF_STATE[self.last_state]
+
+    def __len__(self):
+        return len(self.ids)
+
+def build_features(db):
+    F = models.Freight
+    drivers = db.query(models.Driver).filter(models.Driver.status == "ACTIVE").order_by(models.Driver.id).all()
+
+    stats = db.execute(
+        select(
+            F.driver_id,
+            func.count(F.accepted_at),
+            func.count(F.rejection_reason),
+            func.count(case((F.status.in_(rollup.ACTIVE_STATUSES), 1))),
+        ).where(F.driver_id.isnot(None)).group_by(F.driver_id)
+    ).all()
+
+    # Latest delivery of each driver: where the truck is likely to be now
+    delivered_on = func.coalesce(F.delivered_at, F.delivery_date)
+    ranked = select(
+        F.driver_id, F.destination, F.destination_city_id, F.destination_state,
+        func.row_number().over(partition_by=F.driver_id, order_by=(delivered_on.desc(), F.id.desc())).label("n"),
+    ).where(F.driver_id.isnot(None), F.status == "DELIVERED").subquery()
+    last_delivery = db.execute(
+        select(ranked.c.driver_id, ranked.c.destination, ranked.c.destination_city_id, ranked.c.destination_state)
+        .where(ranked.c.n == 1)
+    ).all()
+
+    return DriverFeatures(drivers, stats, last_delivery)
+
+# Own cache, so /dashboard/cache counts only dashboard lookups; every
+# dashboard version bump also bumps it
+feature_cache = ResponseCache(max_entries=1)
+dashboard_cache.subscribe(lambda version: feature_cache.bump())
+
+def driver_features(db):
+    return feature_cache.get_or_compute(("driver_features",), lambda: build_features(db))
+
+def score(features: DriverFeatures, origin_city_id=None, origin_state=None):
+    """Per-feature arrays and the weighted total, aligned with features.ids."""
+    state = STATE_CODES.get(origin_state, -2) # -2 never matches the unknown slot
+    region = REGION_OF_STATE[state] if state >= 0 else -2
+
+    backhaul = np.zeros(len(features))
+    backhaul[features.last_region == region] = SAME_REGION
+    backhaul[features.last_state == state] = SAME_STATE
+    if origin_city_id is not None:
+        backhaul[features.last_city == origin_city_id] = SAME_CITY
+
+    parts = {
+        "backhaul": backhaul,
+        "acceptance": features.acceptance,
+        "availability": features.availability,
+        "vehicle": features.has_vehicle,
+    }
+    total = sum(WEIGHTS[name] * values for name, values in parts.items())
+    return parts, total
+
+def rank(features: DriverFeatures, freight: models.Freight, vehicle_type=None, limit=10):
+    """Top `limit` drivers for the freight. vehicle_type, if given, must match."""
+    parts, total = score(features, freight.origin_city_id, freight.origin_state)
+
+    candidates = np.arange(len(features))
+    if vehicle_type:
+        candidates = candidates[features.vehicle_keys == vehicle_key(vehicle_type)]
+    if limit < len(candidates):
+        # Partial selection first; only the top rows get fully sorted
+        top = np.argpartition(-total[candidates], limit - 1)[:limit]
+        candidates = candidates[top]
+    order = candidates[np.lexsort((features.ids[candidates], -total[candidates]))]
+
+    return [
+        {
+            "driver_id": int(features.ids[i]),
+            "name": features.names[i],
+            "phone": features.phones[i],
+            "vehicle_type": features.vehicle_types[i],
+            "score": round(float(total[i]), 4),
+            "features": {name: round(float(values[i]), 4) for name, values in parts.items()},
+            "active_freights": int(features.active[i]),
+            "last_destination": features.last_destination[i],
+        }
+        for i in order
+    ]
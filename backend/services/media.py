@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlalchemy.orm import Session
+
+import models
+from database import ReadSessionLocal
+from services.imaging import process_image
+
+logger = logging.getLogger(__name__)
+
+# Photo storage (delivery proofs).
+#
+# Uploaded photos are recompressed and thumbnailed in a process pool, so the
+# CPU work runs in parallel and off the request threads. Files are named by
+# the SHA-256 of the uploaded bytes: the same photo sent twice, for the same
+# or another freight, is stored and processed once. Metadata goes into the
+# attachments table, written afterwards through the writer queue
+# (services/writer.py), so a slow upload never holds the write lock.
+# Configure the pool with EAGLES_IMAGE_WORKERS (0 runs processing inline).
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEDIA_DIR = "uploads/media" # relative to backend/, served by the /uploads mount
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+WORKERS = int(os.getenv("EAGLES_IMAGE_WORKERS", "2"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS)
+        return _pool
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _process_all(items):
+    """[(sha256, filename, bytes)] -> {sha256: process_image() result}, in parallel when a pool is configured."""
+    results = {}
+    try:
+        if WORKERS <= 0:
+            for digest, filename, data in items:
+                results[digest] = process_image(data)
+            return results
+        futures = [(digest, filename, _get_pool().submit(process_image, data)) for digest, filename, data in items]
+        for digest, filename, future in futures:
+            results[digest] = future.result()
+        return results
+    except ValueError as e:
+        raise ValueError(f"{filename}: {e}")
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool next time
+        logger.exception("Image process pool broke, restarting it")
+        shutdown()
+        raise
+
+def _media_paths(digest):
+    folder = f"{MEDIA_DIR}/{digest[:2]}"
+    return f"{folder}/{digest}.jpg", f"{folder}/{digest}_thumb.jpg"
+
+def _write_once(relative_path, data):
+    path = os.path.join(BASE_DIR, relative_path)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _on_disk(attachment):
+    return all(os.path.exists(os.path.join(BASE_DIR, p)) for p in (attachment.path, attachment.thumb_path))
+
+def save_photos(uploads):
+    """uploads: [(filename, bytes)]. Stores the photos that are not on disk
+    yet and returns the values of their Attachment rows, in upload order.
+
+    Runs without a write transaction (the lookup uses a read session), so the
+    recompression never holds the writer; attach() adds the rows afterwards.
+    Raises ValueError if a file is too large or not an image.
+    """
+    A = models.Attachment
+    photos = []
+    for filename, data in uploads:
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise ValueError(f"{filename}: file larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+        photos.append((filename, data, hashlib.sha256(data).hexdigest()))
+
+    # Already processed, for this or another freight: reuse the stored files
+    stored = {}
+    db = ReadSessionLocal()
+    try:
+        for a in db.query(A).filter(A.sha256.in_({digest for _, _, digest in photos})):
+            if a.sha256 not in stored and _on_disk(a):
+                stored[a.sha256] = {
+                    "path": a.path, "thumb_path": a.thumb_path,
+                    "width": a.width, "height": a.height, "size_bytes": a.size_bytes,
+                }
+    finally:
+        db.close()
+
+    pending = {digest: (digest, filename, data) for filename, data, digest in photos if digest not in stored}
+    processed = _process_all(list(pending.values()))
+
+    result = []
+    for filename, data, digest in photos:
+        if digest not in stored:
+            output = processed[digest]
+            path, thumb_path = _media_paths(digest)
+            _write_once(path, output["image"])
+            _write_once(thumb_path, output["thumb"])
+            stored[digest] = {
+                "path": path, "thumb_path": thumb_path,
+                "width": output["width"], "height": output["height"], "size_bytes": len(output["image"]),
+            }
+        result.append({**stored[digest], "sha256": digest, "original_filename": filename, "content_type": "image/jpeg"})
+
+    logger.info("%s photos, %s processed, %s deduplicated", len(photos), len(processed), len(photos) - len(processed))
+    return result
+
+def attach(db: Session, freight_id, photos, kind="DELIVERY_PROOF"):
+    """Adds Attachment rows (not committed) for photos from save_photos() the
+    freight does not have yet; returns the freight's attachments for them."""
+    A = models.Attachment
+    attached = {a.sha256: a for a in db.query(A).filter(
+        A.freight_id == freight_id, A.kind == kind, A.sha256.in_({p["sha256"] for p in photos})
+    )}
+    result = []
+    for photo in photos:
+        if photo["sha256"] not in attached:
+            attachment = A(freight_id=freight_id, kind=kind, **photo)
+            db.add(attachment)
+            attached[photo["sha256"]] = attachment
+        result.append(attached[photo["sha256"]])
+    return result
+
+def confirm_delivery(db: Session, freight: models.Freight, photos):
+    """Attaches the stored proof photos and marks the freight DELIVERED (not committed)."""
+    attachments = attach(db, freight.id, photos)
+    freight.status = "DELIVERED"
+    freight.delivered_at = datetime.now()
+    return {
+        "message": "Delivery confirmed",
+        "photos": [a.path for a in attachments],
+        "thumbnails": [a.thumb_path for a in attachments],
+    }
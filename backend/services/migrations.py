@@ -0,0 +1,275 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import Session
+
+import models
+from services import locations, media, rollup, search
+
+logger = logging.getLogger(__name__)
+
+# Versioned schema migrations.
+#
+# MIGRATIONS is an ordered list of (version, name, step). upgrade() runs every
+# step whose version is not in schema_migrations yet, oldest first, each in
+# its own transaction together with the row that records it: a failing step
+# leaves nothing behind and is retried on the next start. main.py calls it on
+# import; migrate.py does the same from the command line.
+#
+# Step 1 creates the missing tables from the current models, so on a new
+# database the later steps find their columns and indexes already there.
+# Every step therefore checks before it adds. To change the schema, edit the
+# model and append a step; never renumber or edit an applied one.
+#
+# A step gets a Session joined to the migration transaction: commit() inside a
+# step (ensure_cities, rollup.rebuild) only releases a savepoint. It is a
+# plain Session, without the write hooks of SessionLocal.
+
+BATCH_SIZE = 500
+
+def _columns(db: Session, table):
+    return {row[1] for row in db.execute(text(f"PRAGMA table_info({table})"))}
+
+def _add_columns(db: Session, table, columns):
+    existing = _columns(db, table)
+    for name, ddl in columns:
+        if name not in existing:
+            logger.info("%s: adding column %s", table, name)
+            db.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+def _create_indexes(db: Session, *model_classes):
+    """Builds the indexes declared on the models that the database lacks."""
+    for model in model_classes:
+        for index in model.__table__.indexes:
+            index.create(db.connection(), checkfirst=True)
+
+def create_tables(db: Session):
+    models.Base.metadata.create_all(db.connection())
+
+def freight_billing_columns(db: Session):
+    # was migrate_db.py
+    _add_columns(db, "freights", [
+        ("billing_status", "VARCHAR DEFAULT 'PENDING'"),
+        ("boleto_id", "VARCHAR"),
+        ("boleto_url", "VARCHAR"),
+        ("boleto_expiry_date", "DATETIME"),
+    ])
+
+def freight_acceptance_columns(db: Session):
+    # was migrate_freights_v2.py / force_migrate.py
+    _add_columns(db, "freights", [
+        ("rejection_reason", "VARCHAR"),
+        ("delivery_photos", "VARCHAR"),
+        ("accepted_at", "DATETIME"),
+        ("delivered_at", "DATETIME"),
+    ])
+
+def driver_status(db: Session):
+    # was migrate_drivers_status.py: is_blocked became status
+    existing = _columns(db, "drivers")
+    if "status" in existing:
+        return
+    _add_columns(db, "drivers", [("status", "VARCHAR DEFAULT 'ACTIVE'")])
+    if "is_blocked" in existing:
+        db.execute(text("UPDATE drivers SET status = CASE WHEN is_blocked = 1 THEN 'INACTIVE' ELSE 'ACTIVE' END"))
+
+def freight_observation(db: Session):
+    # was add_observation_column.py / migrate_observation.py
+    _add_columns(db, "freights", [("observation", "VARCHAR")])
+
+def freight_locations(db: Session):
+    # was migrate_freight_locations.py: resolved origin/destination, backfilled
+    _add_columns(db, "freights", [
+        ("origin_city_id", "INTEGER REFERENCES cities(id)"),
+        ("origin_state", "VARCHAR"),
+        ("destination_city_id", "INTEGER REFERENCES cities(id)"),
+        ("destination_state", "VARCHAR"),
+    ])
+    locations.ensure_cities(db)
+
+    F = models.Freight
+    unresolved = select(F.id, F.origin, F.destination).where(
+        F.origin_state.is_(None), F.destination_state.is_(None)
+    ).order_by(F.id)
+    last_id = 0
+    total = 0
+    while True:
+        rows = db.execute(unresolved.where(F.id > last_id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        params = []
+        for freight_id, origin, destination in rows:
+            origin_city_id, origin_state = locations.resolve(db, origin)
+            destination_city_id, destination_state = locations.resolve(db, destination)
+            params.append({
+                "id": freight_id,
+                "origin_city_id": origin_city_id,
+                "origin_state": origin_state,
+                "destination_city_id": destination_city_id,
+                "destination_state": destination_state,
+            })
+        db.execute(update(F), params)
+        total += len(rows)
+        last_id = rows[-1][0]
+
+    if total:
+        # Rollup buckets are keyed on the resolved state
+        rollup.rebuild(db)
+        logger.info("freights: %s locations resolved", total)
+
+def sync_versions(db: Session):
+    # was migrate_sync_versions.py: existing rows all get version 1, so the
+    # first /sync?since=0 returns them
+    now = datetime.now()
+    for table in ("freights", "clients", "drivers"):
+        _add_columns(db, table, [("updated_at", "DATETIME"), ("change_version", "INTEGER")])
+        db.execute(
+            text(f"UPDATE {table} SET change_version = 1, updated_at = :now WHERE change_version IS NULL"),
+            {"now": now},
+        )
+    db.execute(text(
+        "INSERT INTO sync_state (id, version) VALUES (1, 1) "
+        "ON CONFLICT(id) DO UPDATE SET version = MAX(version, 1)"
+    ))
+
+def freights_full_text(db: Session):
+    search.ensure_index(db.connection())
+
+def secondary_indexes(db: Session):
+    # Everything declared on the models, among them the listing indexes
+    # (status/billing_status + pickup_date), freights.boleto_id,
+    # financial_transactions(date, type) and related_freight_id
+    _create_indexes(db, *[mapper.class_ for mapper in models.Base.registry.mappers])
+
+def archive_tables(db: Session):
+    # services/archive.py: archive_state here, the rest in eagles_archive.db
+    for model in (models.ArchiveState, models.ArchivedFreight, models.ArchivedTransaction):
+        model.__table__.create(db.connection(), checkfirst=True)
+    _create_indexes(db, models.ArchivedFreight, models.ArchivedTransaction)
+
+def delivery_photos(db: Session):
+    # was migrate_delivery_photos.py: the legacy freights.delivery_photos JSON
+    # lists (full-size files under uploads/delivery_proofs) become attachments,
+    # recompressed and thumbnailed. Originals are left on disk; a freight
+    # whose files cannot be read keeps its list and is logged.
+    F = models.Freight
+    rows = db.execute(
+        select(F.id, F.delivery_photos).where(F.delivery_photos.isnot(None), F.delivery_photos != "")
+    ).all()
+    moved = 0
+    for freight_id, photos in rows:
+        try:
+            paths = json.loads(photos)
+        except ValueError:
+            logger.warning("Freight %s: unreadable delivery_photos, skipped", freight_id)
+            continue
+
+        uploads = []
+        for path in paths:
+            full_path = os.path.join(media.BASE_DIR, path)
+            if not os.path.exists(full_path):
+                logger.warning("Freight %s: missing file %s", freight_id, path)
+                continue
+            with open(full_path, "rb") as f:
+                uploads.append((os.path.basename(path), f.read()))
+        try:
+            media.attach(db, freight_id, media.save_photos(uploads))
+        except ValueError as e:
+            logger.warning("Freight %s: %s", freight_id, e)
+            continue
+
+        db.execute(update(F).where(F.id == freight_id).values(delivery_photos=None))
+        moved += len(uploads)
+    if rows:
+        logger.info("delivery photos: %s photos from %s freights", moved, len(rows))
+
+def _rebuild_autoincrement(db: Session, model, archived_model):
+    table = model.__table__
+    name = table.name
+    ddl = db.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name})
+    if "AUTOINCREMENT" not in ddl.upper():
+        # SQLite cannot alter a primary key: copy into a new table and swap
+        logger.info("%s: rebuilding with AUTOINCREMENT", name)
+        create = str(CreateTable(table).compile(dialect=db.get_bind().dialect))
+        db.execute(text(create.replace(f"CREATE TABLE {name} (", f"CREATE TABLE {name}_rebuild (", 1)))
+        existing = _columns(db, name)
+        columns = ", ".join(c.name for c in table.columns if c.name in existing)
+        db.execute(text(f"INSERT INTO {name}_rebuild ({columns}) SELECT {columns} FROM {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+        db.execute(text(f"ALTER TABLE {name}_rebuild RENAME TO {name}"))
+        _create_indexes(db, model)
+
+    # Start past every id handed out so far, archived ones included
+    last = max(
+        db.scalar(select(func.max(model.id))) or 0,
+        db.scalar(select(func.max(archived_model.id))) or 0,
+    )
+    params = {"name": name, "last": last}
+    if not db.execute(text("UPDATE sqlite_sequence SET seq = MAX(seq, :last) WHERE name = :name"), params).rowcount:
+        db.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :last)"), params)
+
+def autoincrement_ids(db: Session):
+    # Without AUTOINCREMENT SQLite hands out max(id) + 1, which may be an id
+    # services/archive.py already moved to the archive
+    _rebuild_autoincrement(db, models.Freight, models.ArchivedFreight)
+    _rebuild_autoincrement(db, models.FinancialTransaction, models.ArchivedTransaction)
+    # The full-text triggers went with the old freights table
+    search.ensure_index(db.connection())
+
+def archive_full_text(db: Session):
+    # Searches read archived freights too (services/search.py)
+    search.ensure_index(db.connection(), "archive")
+
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    (2, "freight billing columns", freight_billing_columns),
+    (3, "freight acceptance columns", freight_acceptance_columns),
+    (4, "driver status", driver_status),
+    (5, "freight observation", freight_observation),
+    (6, "freight locations", freight_locations),
+    (7, "sync versions", sync_versions),
+    (8, "freights full-text index", freights_full_text),
+    (9, "secondary indexes", secondary_indexes),
+    (10, "archive tables", archive_tables),
+    (11, "delivery photos to attachments", delivery_photos),
+    (12, "autoincrement freight and transaction ids", autoincrement_ids),
+    (13, "archive full-text index", archive_full_text),
+]
+
+def applied_versions(engine):
+    with engine.connect() as conn:
+        models.SchemaMigration.__table__.create(conn, checkfirst=True)
+        versions = set(conn.scalars(select(models.SchemaMigration.version)))
+        conn.commit()
+    return versions
+
+def pending(engine):
+    applied = applied_versions(engine)
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+def upgrade(engine):
+    """Applies the pending migrations in order; returns the versions applied."""
+    done = []
+    for version, name, step in pending(engine):
+        with engine.connect() as conn:
+            with conn.begin():
+                # Another process may have applied it since pending() looked
+                if conn.scalar(select(models.SchemaMigration.version).where(models.SchemaMigration.version == version)):
+                    continue
+                db = Session(bind=conn, join_transaction_mode="create_savepoint")
+                try:
+                    step(db)
+                    db.add(models.SchemaMigration(version=version, name=name, applied_at=datetime.now()))
+                    db.commit()
+                except Exception:
+                    logger.exception("Migration %s (%s) failed; rolled back", version, name)
+                    raise
+                finally:
+                    db.close()
+        logger.info("Applied migration %s: %s", version, name)
+        done.append(version)
+    return done
@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, tuple_
+
+# Keyset (cursor) pagination over (sort column, id).
+#
+# The cursor is an opaque token holding the sort value and id of the last row
+# of the previous page, so every page is an index range scan and page 500
+# costs the same as page 1. NULL sort values are kept where SQLite orders
+# them (first ascending, last descending).
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, is_datetime=True):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if is_datetime and sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _segments(sort_column, id_column, cursor, descending):
+    """(condition, ordering) pairs read in sequence until the page is full.
+
+    Non-NULL rows after the cursor are one row-value range, (sort, id) < (?, ?),
+    which SQLite turns into an index seek; NULL sort values are a separate
+    segment ordered by id.
+    """
+    ordering = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+    if not cursor:
+        return [(None, ordering)]
+
+    sort_value, row_id = decode_cursor(cursor)
+    nulls = sort_column.is_(None)
+    if descending:
+        if sort_value is None:
+            return [(and_(nulls, id_column < row_id), (id_column.desc(),))]
+        return [
+            (tuple_(sort_column, id_column) < tuple_(sort_value, row_id), ordering),
+            (nulls, (id_column.desc(),)),
+        ]
+    if sort_value is None:
+        return [
+            (and_(nulls, id_column > row_id), (id_column.asc(),)),
+            (sort_column.isnot(None), ordering),
+        ]
+    return [(tuple_(sort_column, id_column) > tuple_(sort_value, row_id), ordering)]
+
+def paginate(query, sort_column, id_column, cursor=None, limit=100, descending=True, sort_attr=None):
+    """Returns (rows, next_cursor) for one page of an ORM query ordered by (sort_column, id)."""
+    rows = []
+    for condition, ordering in _segments(sort_column, id_column, cursor, descending):
+        segment = query if condition is None else query.filter(condition)
+        rows += segment.order_by(*ordering).limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr or sort_column.key), last.id)
+    return rows, next_cursor
+
+def set_page_headers(response, total=None, next_cursor=None):
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
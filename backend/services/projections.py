@@ -0,0 +1,161 @@
+import json
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+from services import scheduler
+
+# Projection runner over the freight event journal (services/events.py).
+#
+# Each projection keeps its own offset (projection_offsets.last_event_id) and
+# only reads events after it. A batch of events and the new offset commit
+# together, so a crash replays nothing twice and skips nothing (SQLite has a
+# single writer, so event ids become visible in order). The runner job
+# (services/scheduler.py) wakes up when a commit wrote events, with a periodic
+# poll as fallback; it takes the writer only when has_pending() finds events
+# past an offset. rebuild_projections.py resets and replays from event 1.
+#
+# The daily rollup and the dashboard cache version stay synchronous (updated
+# inside the writing transaction) because dashboards need to read their own
+# writes; projections here may lag by a moment.
+
+BATCH_SIZE = 500
+POLL_SECONDS = 5
+
+class DriverStatsProjection:
+    """Per-driver assignment/acceptance/delivery counters (driver_stats).
+
+    A deleted freight takes back everything its earlier events added, read
+    from the journal; last_delivered_at is left as it was.
+    """
+
+    name = "driver_stats"
+
+    def reset(self, db: Session):
+        db.query(models.DriverStats).delete()
+
+    def apply(self, db: Session, events):
+        deltas = defaultdict(lambda: defaultdict(float))
+        last_delivered = {}
+
+        for ev in events:
+            if ev.type == "DELETED":
+                history = db.scalars(
+                    select(models.FreightEvent)
+                    .where(models.FreightEvent.freight_id == ev.freight_id, models.FreightEvent.id < ev.id)
+                    .order_by(models.FreightEvent.id)
+                )
+                for past in history:
+                    self._apply_event(deltas, None, past, -1)
+            else:
+                self._apply_event(deltas, last_delivered, ev, 1)
+
+        table = models.DriverStats.__table__
+        for driver_id, values in deltas.items():
+            row = {k: values.get(k, 0) for k in (
+                "assigned_count", "accepted_count", "rejected_count", "delivered_count",
+                "delivered_revenue", "delivered_driver_pay",
+            )}
+            stmt = sqlite_insert(table).values(driver_id=driver_id, last_delivered_at=last_delivered.get(driver_id), **row)
+            set_ = {k: table.c[k] + stmt.excluded[k] for k in row}
+            if driver_id in last_delivered:
+                set_["last_delivered_at"] = stmt.excluded.last_delivered_at
+            db.execute(stmt.on_conflict_do_update(index_elements=["driver_id"], set_=set_))
+
+    def _apply_event(self, deltas, last_delivered, ev, sign):
+        data = json.loads(ev.data)
+        state, changes = data.get("state", {}), data.get("changes", {})
+        driver_id = state.get("driver_id")
+
+        if ev.type == "CREATED":
+            if driver_id:
+                deltas[driver_id]["assigned_count"] += sign
+                if state.get("status") == "DELIVERED":
+                    self._delivered(deltas[driver_id], state, sign)
+                    if last_delivered is not None:
+                        last_delivered[driver_id] = ev.created_at
+            return
+        if ev.type != "UPDATED":
+            return
+
+        if "driver_id" in changes and changes["driver_id"][1]:
+            deltas[changes["driver_id"][1]]["assigned_count"] += sign
+        if not driver_id:
+            return
+
+        d = deltas[driver_id]
+        if "status" in changes:
+            old, new = changes["status"]
+            if new == "ASSIGNED":
+                d["accepted_count"] += sign
+            elif new == "REJECTED":
+                d["rejected_count"] += sign
+            if new == "DELIVERED":
+                self._delivered(d, state, sign)
+                if last_delivered is not None:
+                    last_delivered[driver_id] = ev.created_at
+            elif old == "DELIVERED":
+                self._delivered(d, state, -sign)
+        elif state.get("status") == "DELIVERED":
+            # Values corrected after delivery
+            for field, target in (("valor_cliente", "delivered_revenue"), ("valor_motorista", "delivered_driver_pay")):
+                if field in changes:
+                    d[target] += sign * ((changes[field][1] or 0.0) - (changes[field][0] or 0.0))
+
+    @staticmethod
+    def _delivered(d, state, sign):
+        d["delivered_count"] += sign
+        d["delivered_revenue"] += sign * (state.get("valor_cliente") or 0.0)
+        d["delivered_driver_pay"] += sign * (state.get("valor_motorista") or 0.0)
+
+PROJECTIONS = [DriverStatsProjection()]
+
+def _offset(db: Session, name):
+    row = db.get(models.ProjectionOffset, name)
+    if row is None:
+        row = models.ProjectionOffset(name=name, last_event_id=0)
+        db.add(row)
+    return row
+
+def run_once(db: Session, batch_size=BATCH_SIZE):
+    """Feeds every projection the events after its offset. Returns events applied."""
+    applied = 0
+    for projection in PROJECTIONS:
+        while True:
+            offset = _offset(db, projection.name)
+            events = db.scalars(
+                select(models.FreightEvent)
+                .where(models.FreightEvent.id > offset.last_event_id)
+                .order_by(models.FreightEvent.id)
+                .limit(batch_size)
+            ).all()
+            if not events:
+                db.commit()
+                break
+            projection.apply(db, events)
+            offset.last_event_id = events[-1].id
+            offset.updated_at = datetime.now()
+            db.commit()
+            applied += len(events)
+    return applied
+
+def has_pending(db: Session):
+    """True if some projection is behind the journal (read-only, for the runner's check)."""
+    last_event_id = db.scalar(select(func.max(models.FreightEvent.id)))
+    if last_event_id is None:
+        return False
+    offsets = dict(db.execute(select(models.ProjectionOffset.name, models.ProjectionOffset.last_event_id)).all())
+    return any(offsets.get(projection.name, 0) < last_event_id for projection in PROJECTIONS)
+
+def rebuild(db: Session):
+    for projection in PROJECTIONS:
+        projection.reset(db)
+        _offset(db, projection.name).last_event_id = 0
+    db.commit()
+    return run_once(db)
+
+runner = scheduler.PeriodicJob("projections", run_once, POLL_SECONDS, check=has_pending)
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from sqlalchemy.orm import Session
+
+import models
+from database import ReadSessionLocal
+from services import media, writer
+
+logger = logging.getLogger(__name__)
+
+# Resumable delivery proof uploads (tus-like).
+#
+#   POST  /freights/{id}/uploads               declare the files -> upload id
+#   GET   /freights/uploads/{upload}           current offset of every part
+#   PATCH /freights/uploads/{upload}/parts/{n} Upload-Offset header + raw bytes
+#   POST  /freights/uploads/{upload}/finalize  process photos, mark DELIVERED
+#
+# Chunks are appended straight to a part file as they arrive; the part file
+# size is the offset, so whatever reached the disk before a dropped
+# connection counts and the driver resumes from there. Nothing is committed
+# to the freight until finalize finds every part complete.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSIONS_DIR = os.path.join(BASE_DIR, "upload_sessions") # not under the public /uploads mount
+MIN_PHOTOS = 3
+MAX_PHOTOS = 20
+EXPIRY = timedelta(hours=24)
+
+_part_locks = {}
+
+def _part_path(upload_id, index):
+    return os.path.join(SESSIONS_DIR, upload_id, f"{index}.part")
+
+def offset(upload_id, index):
+    path = _part_path(upload_id, index)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def describe(session: models.UploadSession):
+    parts = json.loads(session.parts)
+    return {
+        "upload_id": session.id,
+        "freight_id": session.freight_id,
+        "status": session.status,
+        "expires_at": session.expires_at,
+        "parts": [
+            {"index": i, "filename": p["filename"], "size": p["size"], "offset": offset(session.id, i)}
+            for i, p in enumerate(parts)
+        ],
+    }
+
+def purge_expired(db: Session):
+    expired = db.query(models.UploadSession).filter(models.UploadSession.expires_at < datetime.now()).all()
+    for session in expired:
+        shutil.rmtree(os.path.join(SESSIONS_DIR, session.id), ignore_errors=True)
+        db.delete(session)
+
+def create(db: Session, freight_id, files):
+    """Adds the upload session (not committed: a writer.run unit)."""
+    if not MIN_PHOTOS <= len(files) <= MAX_PHOTOS:
+        raise HTTPException(status_code=400, detail=f"Between {MIN_PHOTOS} and {MAX_PHOTOS} photos required")
+    for f in files:
+        if not 0 < f.size <= media.MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=400, detail=f"{f.filename}: invalid size")
+
+    purge_expired(db)
+    session = models.UploadSession(
+        id=uuid.uuid4().hex,
+        freight_id=freight_id,
+        parts=json.dumps([{"filename": f.filename, "size": f.size} for f in files]),
+        expires_at=datetime.now() + EXPIRY,
+    )
+    os.makedirs(os.path.join(SESSIONS_DIR, session.id), exist_ok=True)
+    db.add(session)
+    db.flush()
+    return session
+
+def get_open(db: Session, upload_id):
+    session = db.get(models.UploadSession, upload_id)
+    if session is None or session.expires_at < datetime.now():
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    return session
+
+async def write_part(upload_id, index, size, start, chunks):
+    """Appends the request body at `start`. Returns the new offset."""
+    key = (upload_id, index)
+    lock = _part_locks.setdefault(key, asyncio.Lock())
+    if lock.locked():
+        raise HTTPException(status_code=409, detail="This part is already being uploaded")
+
+    try:
+        async with lock:
+            return await _append(upload_id, index, size, start, chunks)
+    finally:
+        _part_locks.pop(key, None)
+
+async def _append(upload_id, index, size, start, chunks):
+    current = offset(upload_id, index)
+    if start != current:
+        raise HTTPException(status_code=409, detail="Offset mismatch", headers={"Upload-Offset": str(current)})
+
+    f = await run_in_threadpool(open, _part_path(upload_id, index), "ab")
+    try:
+        async for data in chunks:
+            if current + len(data) > size:
+                raise HTTPException(status_code=413, detail="More data than the declared size")
+            await run_in_threadpool(f.write, data)
+            current += len(data)
+    except ClientDisconnect:
+        # Keep what arrived; the client resumes from the stored offset
+        logger.info("Upload %s part %s interrupted at %s/%s", upload_id, index, current, size)
+    finally:
+        await run_in_threadpool(f.close)
+    return current
+
+def finalize(upload_id):
+    """Processes the complete parts into attachments and marks the freight DELIVERED.
+
+    Reads the parts and recompresses them with no session open; only the
+    attachment rows and the status go through the writer queue.
+    """
+    db = ReadSessionLocal()
+    try:
+        session = get_open(db, upload_id)
+        if session.status == "COMPLETED":
+            return json.loads(session.result)
+        state = describe(session)
+        if db.get(models.Freight, session.freight_id) is None:
+            raise HTTPException(status_code=404, detail="Freight not found")
+    finally:
+        db.close()
+
+    incomplete = [p["index"] for p in state["parts"] if p["offset"] != p["size"]]
+    if incomplete:
+        raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "parts": incomplete})
+
+    uploads = []
+    for part in state["parts"]:
+        with open(_part_path(upload_id, part["index"]), "rb") as f:
+            uploads.append((part["filename"], f.read()))
+    try:
+        photos = media.save_photos(uploads)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def work(wdb):
+        session = wdb.get(models.UploadSession, upload_id)
+        if session.status == "COMPLETED":
+            # Finalized by a concurrent request meanwhile
+            return json.loads(session.result)
+        freight = wdb.get(models.Freight, session.freight_id)
+        if freight is None:
+            raise HTTPException(status_code=404, detail="Freight not found")
+        result = media.confirm_delivery(wdb, freight, photos)
+        session.status = "COMPLETED"
+        session.result = json.dumps(result)
+        return result
+    result = writer.run(work)
+
+    shutil.rmtree(os.path.join(SESSIONS_DIR, upload_id), ignore_errors=True)
+    return result
@@ -0,0 +1,192 @@
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+from services import archive
+
+# Daily freight rollup (freight_daily_rollup)
+#
+# One row per (pickup day, status bucket, origin state, vehicle type) holding
+# count, revenue and driver cost. Rows are adjusted by deltas inside the same
+# transaction that writes the freight, so dashboard reads never touch the raw
+# freights table. Freights without a pickup date are not rolled up.
+
+ACTIVE_STATUSES = ['RECRUITING', 'ASSIGNED', 'IN_TRANSIT', 'LOADING']
+NO_VEHICLE = "Sem Veículo"
+
+def status_bucket(status):
+    if status in ACTIVE_STATUSES:
+        return "ACTIVE"
+    if status in ("QUOTED", "DELIVERED", "REJECTED"):
+        return status
+    return "OTHER"
+
+def origin_state_bucket(origin, origin_state):
+    # origin_state is resolved at write time by services/locations.py
+    if origin_state:
+        return origin_state
+    return "N/A" if not origin else "Outros"
+
+def _as_day(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def contribution(pickup_date, status, origin, origin_state, vehicle_type, valor_cliente, valor_motorista, count=1):
+    """Returns (key, count, revenue, cost) for one freight, or None if it has no pickup day."""
+    day = _as_day(pickup_date)
+    if day is None:
+        return None
+    key = (day, status_bucket(status), origin_state_bucket(origin, origin_state), vehicle_type or NO_VEHICLE)
+    return key, count, valor_cliente or 0.0, valor_motorista or 0.0
+
+def apply(session: Session, removed=(), added=()):
+    """Applies freight contributions to the rollup with one upsert per touched key."""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for sign, items in ((-1, removed), (1, added)):
+        for item in items:
+            if item is None:
+                continue
+            key, count, revenue, cost = item
+            delta = deltas[key]
+            delta[0] += sign * count
+            delta[1] += sign * revenue
+            delta[2] += sign * cost
+
+    table = models.FreightDailyRollup.__table__
+    touched = False
+    for (day, bucket, state, vehicle), (count, revenue, cost) in deltas.items():
+        if count == 0 and revenue == 0 and cost == 0:
+            continue
+        stmt = sqlite_insert(table).values(
+            day=day, status_bucket=bucket, origin_state=state, vehicle_type=vehicle,
+            freight_count=count, revenue=revenue, driver_cost=cost
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "status_bucket", "origin_state", "vehicle_type"],
+            set_={
+                "freight_count": table.c.freight_count + stmt.excluded.freight_count,
+                "revenue": table.c.revenue + stmt.excluded.revenue,
+                "driver_cost": table.c.driver_cost + stmt.excluded.driver_cost,
+            }
+        )
+        session.execute(stmt)
+        touched = True
+
+    if touched:
+        session.execute(table.delete().where(table.c.freight_count <= 0))
+
+def stored_contributions(session: Session, freight_ids):
+    """freight id -> contribution, as currently stored in the database."""
+    F = models.Freight
+    rows = session.execute(
+        select(
+            F.id, F.pickup_date, F.status, F.origin, F.origin_state, models.Driver.vehicle_type,
+            F.valor_cliente, F.valor_motorista
+        )
+        .outerjoin(models.Driver, F.driver_id == models.Driver.id)
+        .where(F.id.in_(freight_ids))
+    ).all()
+    return {row[0]: contribution(*row[1:]) for row in rows}
+
+def _current_contribution(session: Session, freight: models.Freight):
+    vehicle_type = None
+    if freight.driver_id is not None:
+        driver = session.get(models.Driver, freight.driver_id)
+        vehicle_type = driver.vehicle_type if driver else None
+    return contribution(
+        freight.pickup_date, freight.status, freight.origin, freight.origin_state, vehicle_type,
+        freight.valor_cliente, freight.valor_motorista
+    )
+
+def _before_flush(session: Session, flush_context, instances):
+    new = [o for o in session.new if isinstance(o, models.Freight)]
+    dirty = [o for o in session.dirty if isinstance(o, models.Freight) and session.is_modified(o)]
+    deleted = [o for o in session.deleted if isinstance(o, models.Freight)]
+
+    # Drivers whose vehicle type changes (or that disappear) move their freights between buckets
+    drivers = [
+        o for o in session.dirty
+        if isinstance(o, models.Driver) and session.is_modified(o) and "vehicle_type" in _changed_attrs(o)
+    ] + [o for o in session.deleted if isinstance(o, models.Driver)]
+
+    if not (new or dirty or deleted or drivers):
+        return
+
+    removed, added = [], []
+    stored_ids = [o.id for o in dirty + deleted if o.id is not None]
+    stored = stored_contributions(session, stored_ids) if stored_ids else {}
+
+    for freight in dirty + deleted:
+        removed.append(stored.get(freight.id))
+    for freight in new + dirty:
+        added.append(_current_contribution(session, freight))
+
+    if drivers:
+        handled = set(stored_ids)
+        F = models.Freight
+        for driver in drivers:
+            new_type = None if driver in session.deleted else driver.vehicle_type
+            rows = session.execute(
+                select(F.id, F.pickup_date, F.status, F.origin, F.origin_state, F.valor_cliente, F.valor_motorista)
+                .where(F.driver_id == driver.id)
+            ).all()
+            old_type = session.execute(
+                select(models.Driver.vehicle_type).where(models.Driver.id == driver.id)
+            ).scalar()
+            for freight_id, *values in rows:
+                if freight_id in handled:
+                    continue
+                pickup_date, status, origin, origin_state, valor_cliente, valor_motorista = values
+                removed.append(contribution(pickup_date, status, origin, origin_state, old_type, valor_cliente, valor_motorista))
+                added.append(contribution(pickup_date, status, origin, origin_state, new_type, valor_cliente, valor_motorista))
+
+    apply(session, removed, added)
+
+def _changed_attrs(obj):
+    return {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+
+def register(session_factory):
+    event.listen(session_factory, "before_flush", _before_flush)
+
+def _grouped(F, *where):
+    return (
+        select(
+            func.date(F.pickup_date), F.status, F.origin, F.origin_state, models.Driver.vehicle_type,
+            func.count(F.id), func.sum(F.valor_cliente), func.sum(F.valor_motorista)
+        )
+        .outerjoin(models.Driver, F.driver_id == models.Driver.id)
+        .where(F.pickup_date.isnot(None), *where)
+        .group_by(func.date(F.pickup_date), F.status, F.origin, F.origin_state, models.Driver.vehicle_type)
+    )
+
+def rebuild(session: Session):
+    """Recomputes the whole rollup from the freights table and the archive (backfill)."""
+    AF = models.ArchivedFreight
+    rows = session.execute(_grouped(models.Freight)).all()
+    # Archived freights still count (services/archive.py); equal keys add up in apply()
+    rows += session.execute(_grouped(AF, archive.not_in_hot(AF))).all()
+
+    session.execute(models.FreightDailyRollup.__table__.delete())
+    apply(session, added=[
+        contribution(day, status, origin, origin_state, vehicle_type, revenue, cost, count=count)
+        for day, status, origin, origin_state, vehicle_type, count, revenue, cost in rows
+    ])
+    session.commit()
+    return len(rows)
+
+def ensure_built(session: Session):
+    """Backfills the rollup on first start after the table was introduced."""
+    if session.query(models.FreightDailyRollup.id).first() is not None:
+        return
+    if session.query(models.Freight.id).filter(models.Freight.pickup_date.isnot(None)).first() is None:
+        return
+    rebuild(session)
@@ -0,0 +1,70 @@
+import logging
+import threading
+
+from database import ReadSessionLocal, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# In-process background jobs.
+#
+# Each job is one daemon thread that calls job(db) with its own session every
+# `interval` seconds, or right away when notify() is called (e.g. after a
+# commit that concerns it). Several notifications during a run collapse into
+# one more run. A failing run is logged and retried on the next tick.
+#
+# A writer session takes the database write lock (BEGIN IMMEDIATE) on its
+# first query, so a job with a check(read_db) -> bool first asks that on the
+# read pool and only opens the writer session when it returns True.
+
+class PeriodicJob:
+    def __init__(self, name, job, interval, check=None):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.check = check
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def notify(self, *args):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if self.check is not None and not self._has_work():
+                continue
+            db = SessionLocal()
+            try:
+                self.job(db)
+            except Exception:
+                logger.exception("Background job %s failed", self.name)
+                db.rollback()
+            finally:
+                db.close()
+
+    def _has_work(self):
+        db = ReadSessionLocal()
+        try:
+            return self.check(db)
+        except Exception:
+            logger.exception("Background job %s: check failed", self.name)
+            return False
+        finally:
+            db.close()
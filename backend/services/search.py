@@ -0,0 +1,91 @@
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import models
+from services import archive, loaders
+
+# Full-text search over freights (SQLite FTS5).
+#
+# freights_fts is an external-content index on freights: the text lives only
+# in freights, and triggers keep the index in sync on every INSERT, UPDATE and
+# DELETE - ORM or raw SQL alike. Accents are folded, so "sao paulo" matches
+# "São Paulo". The archive database (services/archive.py) has the same index
+# on its freights table, and searches read both.
+
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.freights_fts USING fts5(
+        origin, destination, observation, cte_number,
+        content='freights', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS {schema}.freights_fts_ai AFTER INSERT ON freights BEGIN
+        INSERT INTO freights_fts(rowid, origin, destination, observation, cte_number)
+        VALUES (new.id, new.origin, new.destination, new.observation, new.cte_number);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {schema}.freights_fts_ad AFTER DELETE ON freights BEGIN
+        INSERT INTO freights_fts(freights_fts, rowid, origin, destination, observation, cte_number)
+        VALUES ('delete', old.id, old.origin, old.destination, old.observation, old.cte_number);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {schema}.freights_fts_au AFTER UPDATE OF origin, destination, observation, cte_number ON freights BEGIN
+        INSERT INTO freights_fts(freights_fts, rowid, origin, destination, observation, cte_number)
+        VALUES ('delete', old.id, old.origin, old.destination, old.observation, old.cte_number);
+        INSERT INTO freights_fts(rowid, origin, destination, observation, cte_number)
+        VALUES (new.id, new.origin, new.destination, new.observation, new.cte_number);
+    END""",
+]
+
+# bm25 column weights: origin, destination, observation, cte_number
+RANK = "bm25(freights_fts, 2.0, 2.0, 1.0, 4.0)"
+
+def ensure_index(conn, schema="main"):
+    """Creates the FTS table and triggers; indexes existing rows the first time."""
+    existed = conn.exec_driver_sql(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'freights_fts'"
+    ).first()
+    for ddl in FTS_DDL:
+        conn.exec_driver_sql(ddl.format(schema=schema))
+    if not existed:
+        conn.exec_driver_sql(f"INSERT INTO {schema}.freights_fts(freights_fts) VALUES ('rebuild')")
+
+def build_match(query):
+    """Turns user input into an FTS5 query: every word must match, as a prefix."""
+    terms = re.findall(r"\w+", query or "")
+    if not terms:
+        raise HTTPException(status_code=400, detail="Empty search")
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _hits(db: Session, schema, match, limit):
+    # Archived freights also in the hot table are found there
+    where = "freights_fts MATCH :match"
+    if schema == "archive":
+        where += " AND rowid NOT IN (SELECT id FROM main.freights)"
+    params = {"match": match, "limit": limit}
+    hits = db.execute(
+        text(f"SELECT rowid, {RANK} FROM {schema}.freights_fts WHERE {where} ORDER BY 2 LIMIT :limit"), params
+    ).all()
+    total = db.execute(text(f"SELECT count(*) FROM {schema}.freights_fts WHERE {where}"), params).scalar()
+    return hits, total
+
+def search_freights(db: Session, query, limit=20, offset=0):
+    """Returns (ranked freights, total hits), archived freights included."""
+    match = build_match(query)
+    hot, total = _hits(db, "main", match, offset + limit)
+    cold = []
+    if archive.reaches(db, models.ArchiveState.freights_until):
+        cold, cold_total = _hits(db, "archive", match, offset + limit)
+        total += cold_total
+
+    page = sorted([(rank, i, models.Freight) for i, rank in hot] + [(rank, i, models.ArchivedFreight) for i, rank in cold],
+                  key=lambda hit: hit[0])[offset:offset + limit]
+    if not page:
+        return [], total
+
+    by_id = {}
+    for F in (models.Freight, models.ArchivedFreight):
+        ids = [i for _, i, model in page if model is F]
+        if ids:
+            by_id.update((f.id, f) for f in db.query(F).options(*loaders.freight_full(F)).filter(F.id.in_(ids)))
+    return [by_id[i] for _, i, _ in page if i in by_id], total
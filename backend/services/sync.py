@@ -0,0 +1,111 @@
+import hashlib
+from datetime import datetime
+
+from fastapi import Response
+from sqlalchemy import event, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+from services import loaders
+
+# Delta sync of freights, clients and drivers (GET /sync?since=<version>).
+#
+# Every transaction that writes one of the three tables takes the next value
+# of the sync_state counter and stamps it, with updated_at, on each row it
+# writes; deletes leave a tombstone carrying the same version. SQLite holds
+# the write lock from the counter bump until commit, so versions become
+# visible in order and "changed after N" never skips a row. ORM writes are
+# stamped by the flush hook below; Core/bulk writers use stamp_values() and
+# add_tombstones().
+#
+# The counter doubles as the weak ETag of the list endpoints: any write to
+# the three tables moves it, so an unchanged list answers 304 without
+# running its query.
+
+ENTITIES = {models.Freight: "freights", models.Client: "clients", models.Driver: "drivers"}
+
+def current_version(db: Session):
+    return db.scalar(select(models.SyncState.version).where(models.SyncState.id == 1)) or 0
+
+def stamp(session: Session):
+    """Change version of the session's transaction, allocated on first use."""
+    version = session.info.get("sync_version")
+    if version is None:
+        table = models.SyncState.__table__
+        stmt = sqlite_insert(table).values(id=1, version=1)
+        stmt = stmt.on_conflict_do_update(index_elements=["id"], set_={"version": table.c.version + 1})
+        version = session.execute(stmt.returning(table.c.version)).scalar_one()
+        session.info["sync_version"] = version
+    return version
+
+def stamp_values(session: Session):
+    """change_version/updated_at for Core inserts and updates."""
+    return {"change_version": stamp(session), "updated_at": datetime.now()}
+
+def add_tombstones(session: Session, entity, ids):
+    """Records Core deletes (entity: freights, clients or drivers)."""
+    if ids:
+        version = stamp(session)
+        now = datetime.now()
+        session.execute(insert(models.Tombstone), [
+            {"entity": entity, "entity_id": i, "change_version": version, "deleted_at": now} for i in ids
+        ])
+
+def changes(db: Session, since):
+    # Read the version first: rows committed while the lists below are read
+    # come back again on the next sync instead of being missed
+    version = current_version(db)
+    result = {"version": version, "deleted": {}}
+    for model, entity in ENTITIES.items():
+        query = db.query(model).filter(model.change_version > since)
+        if model is models.Freight:
+            query = query.options(*loaders.freight_full())
+        rows = query.order_by(model.change_version, model.id).all()
+        result[entity] = rows
+
+        # A deleted id that was handed out again is reported as a change only
+        alive = {row.id for row in rows}
+        deleted = db.scalars(
+            select(models.Tombstone.entity_id)
+            .where(models.Tombstone.entity == entity, models.Tombstone.change_version > since)
+            .distinct()
+        ).all()
+        result["deleted"][entity] = [i for i in deleted if i not in alive]
+    return result
+
+def list_etag(db: Session, request):
+    query = hashlib.md5(request.url.query.encode()).hexdigest()[:8]
+    return f'W/"{current_version(db)}-{query}"'
+
+def not_modified(db: Session, request, response):
+    """Sets the list ETag; returns a 304 response if If-None-Match already has it."""
+    tag = list_etag(db, request)
+    response.headers["ETag"] = tag
+    given = request.headers.get("if-none-match")
+    if given:
+        # Weak comparison: W/ prefixes are ignored on both sides
+        known = {t.strip().removeprefix("W/") for t in given.split(",")}
+        if "*" in known or tag.removeprefix("W/") in known:
+            return Response(status_code=304, headers={"ETag": tag})
+    return None
+
+def _before_flush(session: Session, flush_context, instances):
+    now = datetime.now()
+    written = list(session.new) + [o for o in session.dirty if session.is_modified(o)]
+    for obj in written:
+        if type(obj) in ENTITIES:
+            obj.change_version = stamp(session)
+            obj.updated_at = now
+    for obj in session.deleted:
+        entity = ENTITIES.get(type(obj))
+        if entity:
+            session.add(models.Tombstone(entity=entity, entity_id=obj.id, change_version=stamp(session), deleted_at=now))
+
+def _end_transaction(session: Session):
+    session.info.pop("sync_version", None)
+
+def register(session_factory):
+    event.listen(session_factory, "before_flush", _before_flush)
+    event.listen(session_factory, "after_commit", _end_transaction)
+    event.listen(session_factory, "after_rollback", _end_transaction)
@@ -0,0 +1,146 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Single-writer queue with group commit.
+#
+# Short write endpoints (freight status, accept/reject, new transactions, the
+# Asaas webhook, last_seen) hand their unit of work to one writer thread
+# instead of committing on their own. The thread runs the units that arrive
+# within GROUP_WINDOW_MS of the first one, each inside a SAVEPOINT, and
+# commits them together: one fsync and one lock acquisition for the group
+# instead of one per request.
+#
+# A unit is work(db) -> result. It must not commit and should return plain
+# values (ids, dicts), not ORM objects: the session belongs to the writer
+# thread and is closed after the group. If a unit raises (HTTPException
+# included) only its savepoint is rolled back and the exception goes to its
+# caller; the rest of the group still commits.
+#
+# Never wait on the queue while holding a get_db session: the group needs the
+# writer connection that session is holding.
+
+GROUP_WINDOW_MS = float(os.getenv("EAGLES_WRITE_GROUP_MS", "2"))
+MAX_GROUP = 64
+
+class WriteQueue:
+    def __init__(self, window_ms=GROUP_WINDOW_MS, max_group=MAX_GROUP):
+        self.window = window_ms / 1000
+        self.max_group = max_group
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def submit(self, work):
+        """Queues work(db); the returned Future resolves once its group has committed."""
+        future = Future()
+        if self._thread is None:
+            # Not started (scripts, tests): run it right away on its own session
+            self._run_group([(work, future)])
+        else:
+            self._queue.put((work, future))
+        return future
+
+    def run(self, work):
+        """submit() and wait for the result (or the unit's exception)."""
+        return self.submit(work).result()
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            group = [item]
+            deadline = time.monotonic() + self.window
+            stopping = False
+            while len(group) < self.max_group:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                group.append(item)
+            self._run_group(group)
+            if stopping:
+                break
+        # Whatever was still queued runs before the thread goes away
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftover.append(item)
+        if leftover:
+            self._run_group(leftover)
+
+    def _run_group(self, group):
+        db = SessionLocal()
+        done = []
+        try:
+            for work, future in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # Session hooks keep per-transaction state in db.info (sync
+                # version, cache/journal flags); a rolled back unit must not
+                # leave its part behind
+                info = dict(db.info)
+                savepoint = db.begin_nested()
+                try:
+                    result = work(db)
+                    savepoint.commit()
+                except Exception as exc:
+                    savepoint.rollback()
+                    db.info.clear()
+                    db.info.update(info)
+                    future.set_exception(exc)
+                else:
+                    done.append((future, result))
+            if done:
+                db.commit()
+            else:
+                db.rollback()
+        except Exception as exc:
+            logger.exception("Write group of %s units failed", len(group))
+            db.rollback()
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            db.close()
+        for future, result in done:
+            future.set_result(result)
+        if len(group) > 1:
+            logger.debug("Group commit: %s units, %s committed", len(group), len(done))
+
+write_queue = WriteQueue()
+
+def submit(work):
+    return write_queue.submit(work)
+
+def run(work):
+    return write_queue.run(work)
@@ -0,0 +1,88 @@
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+# Test setup.
+#
+# database.py opens ./eagles_v3.db relative to the working directory, so the
+# tests run from a fresh temporary directory, entered when the session starts:
+# after pytest has resolved testpaths, before any test module (and so models
+# or main) is imported. The tracked database is never opened.
+#
+# One app and one database serve the whole session; every test creates the
+# rows it asserts on. The archive job is off: tests call archive_settled()
+# themselves.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = tempfile.mkdtemp(prefix="eagles-tests-")
+
+os.environ["EAGLES_ARCHIVE_AFTER_DAYS"] = "0"
+os.environ.setdefault("EAGLES_LOG_LEVEL", "WARNING")
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.testclient import TestClient
+
+def pytest_sessionstart(session):
+    os.chdir(DATA_DIR)
+
+def pytest_unconfigure(config):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+    with TestClient(main.app) as client:
+        token = client.post("/login", json={"username": "admin", "password": "admin"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+@pytest.fixture(scope="session")
+def customer_id(client):
+    response = client.post("/clients/", json={"name": "Cliente Teste", "cnpj": "11222333000181", "phone": "1"})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+@pytest.fixture(scope="session")
+def driver_id(client):
+    response = client.post("/drivers/", json={"name": "Motorista Teste", "phone": "1", "cpf": "00000000000", "vehicle_type": "TRUCK"})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+@pytest.fixture
+def make_freight(client, customer_id):
+    """make_freight(days_ago=0, **fields) -> id of a new freight."""
+    def make(days_ago=0, **fields):
+        pickup = datetime.now() - timedelta(days=days_ago)
+        payload = {
+            "client_id": customer_id,
+            "origin": "CAMPINAS - SP",
+            "destination": "RIO DE JANEIRO - RJ",
+            "pickup_date": pickup.isoformat(),
+            "delivery_date": (pickup + timedelta(days=1)).isoformat(),
+            "valor_motorista": 100.0,
+            "valor_cliente": 200.0,
+            "status": "QUOTED",
+            **fields,
+        }
+        response = client.post("/freights/", json=payload)
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return make
+
+@pytest.fixture(scope="session")
+def all_pages(client):
+    """all_pages(url, **params) follows X-Next-Cursor to the end; returns every row, in order."""
+    def fetch(url, **params):
+        rows, cursor = [], None
+        while True:
+            response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+            assert response.status_code == 200, response.text
+            rows += response.json()
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return rows
+    return fetch
@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import pytest
+
+import database, models
+from services import archive
+
+def _settle(freight_ids, open_transaction=()):
+    """Marks the freights delivered and paid, each with a paid (or pending) income."""
+    db = database.SessionLocal()
+    try:
+        for freight_id in freight_ids:
+            freight = db.get(models.Freight, freight_id)
+            freight.status = "DELIVERED"
+            freight.billing_status = "PAID"
+            db.add(models.FinancialTransaction(
+                type="INCOME", category="FREIGHT", description=f"frete {freight_id}", amount=200.0,
+                date=freight.pickup_date, status="PENDING" if freight_id in open_transaction else "PAID",
+                related_freight_id=freight_id,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+def _archive():
+    db = database.SessionLocal()
+    try:
+        return archive.archive_settled(db, older_than_days=365)
+    finally:
+        db.close()
+
+@pytest.fixture(scope="module")
+def archived(client, customer_id, all_pages):
+    def make(old):
+        pickup = datetime.now().replace(microsecond=0)
+        if old:
+            pickup = pickup.replace(year=pickup.year - 2)
+        response = client.post("/freights/", json={
+            "client_id": customer_id, "origin": "CAMPINAS - SP", "destination": "RIO DE JANEIRO - RJ",
+            "pickup_date": pickup.isoformat(), "delivery_date": pickup.isoformat(),
+            "valor_motorista": 100.0, "valor_cliente": 200.0, "status": "QUOTED",
+            "observation": "lote manticora" if old else None,
+        })
+        return response.json()["id"]
+
+    # The newest ids are the ones archived: they must not be handed out again
+    recent = [make(old=False) for _ in range(3)]
+    old = [make(old=True) for _ in range(7)]
+    _settle(old, open_transaction={old[3]})
+    since = client.get("/sync/").json()["version"]
+    before = sorted(f["id"] for f in all_pages("/freights/", limit=100))
+
+    _archive()
+    moved = [i for i in old if i != old[3]]
+    return {"moved": moved, "kept": [old[3]] + recent, "before": before, "since": since}
+
+def test_settled_freights_move(archived):
+    db = database.ReadSessionLocal()
+    try:
+        assert db.query(models.Freight).filter(models.Freight.id.in_(archived["moved"])).count() == 0
+        assert db.query(models.ArchivedFreight).filter(models.ArchivedFreight.id.in_(archived["moved"])).count() == len(archived["moved"])
+        assert db.query(models.Freight).filter(models.Freight.id.in_(archived["kept"])).count() == len(archived["kept"])
+    finally:
+        db.close()
+    assert _archive() == 0
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_union_hot_and_archive(client, archived, all_pages, order):
+    rows = all_pages("/freights/", limit=3, order=order)
+    seen = [f["id"] for f in rows]
+    assert len(seen) == len(set(seen))
+    assert sorted(seen) == archived["before"]
+    keys = [(datetime.fromisoformat(f["pickup_date"]), f["id"]) for f in rows]
+    assert keys == sorted(keys, reverse=order == "desc")
+
+    total = client.get("/freights/", params={"limit": 1, "with_count": True}).headers["X-Total-Count"]
+    assert int(total) == len(archived["before"])
+
+def test_archived_freight_reads(client, archived):
+    response = client.get(f"/freights/{archived['moved'][0]}")
+    assert response.status_code == 200
+    assert response.json()["client"]["name"] == "Cliente Teste"
+
+    changes = client.get("/sync/", params={"since": archived["since"]}).json()
+    assert sorted(changes["deleted"]["freights"]) == sorted(archived["moved"])
+
+def test_archived_ids_are_not_reused(archived, make_freight):
+    assert make_freight() > max(archived["moved"])
+
+def test_search_and_billing_read_the_archive(client, archived):
+    old = sorted(archived["moved"] + archived["kept"][:1])
+    response = client.get("/freights/search", params={"q": "manticora", "limit": 5})
+    assert response.headers["X-Total-Count"] == str(len(old))
+    found = [f["id"] for f in response.json()]
+    found += [f["id"] for f in client.get("/freights/search", params={"q": "manticora", "limit": 5, "offset": 5}).json()]
+    assert sorted(found) == old
+
+    issued = {f["id"]: f for f in client.get("/billing/issued").json()}
+    assert set(old) <= set(issued)
+    assert issued[archived["moved"][0]]["client_name"] == "Cliente Teste"
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+import database, models
+from services import writer
+
+def _user(username):
+    db = database.ReadSessionLocal()
+    try:
+        return db.query(models.User).filter(models.User.username == username).one()
+    finally:
+        db.close()
+
+def _set_last_seen(username, when):
+    db = database.SessionLocal()
+    try:
+        db.query(models.User).filter(models.User.username == username).update({"last_seen": when})
+        db.commit()
+    finally:
+        db.close()
+
+def test_logout_stays_offline(client, monkeypatch):
+    assert client.post("/users/", json={"username": "presenca", "password": "segredo"}).status_code == 200
+    token = client.post("/login", json={"username": "presenca", "password": "segredo"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert _user("presenca").is_online
+
+    # Seen a while ago: the next authenticated request marks the user online again
+    _set_last_seen("presenca", datetime.now() - timedelta(minutes=5))
+    assert client.get("/users/me", headers=headers).status_code == 200
+    writer.run(lambda db: None) # its queued mark has committed
+
+    # An online mark queued during /logout could commit after it: none may be queued
+    _set_last_seen("presenca", datetime.now() - timedelta(minutes=5))
+    queued = []
+    monkeypatch.setattr(writer, "submit", queued.append)
+    assert client.post("/logout", headers=headers).status_code == 200
+    assert queued == []
+    assert not _user("presenca").is_online
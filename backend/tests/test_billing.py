@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import database, models
+from routers import billing
+
+class _Response:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+        self.text = str(data)
+
+    def json(self):
+        return self._data
+
+def _writer_idle(timeout=2.0):
+    """True once no writer connection is checked out (background jobs let go quickly)."""
+    deadline = time.monotonic() + timeout
+    while database.engine.pool.checkedout() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return database.engine.pool.checkedout() == 0
+
+@pytest.fixture
+def asaas(monkeypatch):
+    """Fake Asaas API; records, for each call, whether the writer was free while it ran."""
+    monkeypatch.setenv("ASAAS_API_KEY", "test-key")
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(("GET", url.split("/api/v3")[1], _writer_idle(), kwargs.get("timeout")))
+        return _Response(200, {"data": [{"id": "cus_1"}]})
+
+    def post(url, json=None, **kwargs):
+        calls.append(("POST", url.split("/api/v3")[1], _writer_idle(), kwargs.get("timeout")))
+        return _Response(200, {"id": f"pay_{json['externalReference']}", "bankSlipUrl": "https://asaas/boleto"})
+
+    monkeypatch.setattr(billing.requests, "get", get)
+    monkeypatch.setattr(billing.requests, "post", post)
+    return calls
+
+def test_emit_boleto(client, make_freight, asaas):
+    freight_id = make_freight(status="DELIVERED")
+    response = client.post(f"/billing/emit/{freight_id}", json={"value": 200.0, "due_date": "2026-12-10"})
+    assert response.status_code == 200, response.text
+
+    # The Asaas calls ran with a timeout and without holding the writer
+    assert [(method, path) for method, path, _, _ in asaas] == [("GET", "/customers?cpfCnpj=11222333000181"), ("POST", "/payments")]
+    assert all(idle and timeout for _, _, idle, timeout in asaas)
+
+    db = database.ReadSessionLocal()
+    try:
+        freight = db.get(models.Freight, freight_id)
+        assert (freight.billing_status, freight.boleto_id) == ("ISSUED", f"pay_{freight_id}")
+        income = db.query(models.FinancialTransaction).filter(models.FinancialTransaction.related_freight_id == freight_id).one()
+        assert (income.type, income.amount, income.status) == ("INCOME", 200.0, "PENDING")
+    finally:
+        db.close()
+
+    response = client.post(f"/billing/emit/{freight_id}", json={"value": 200.0, "due_date": "2026-12-10"})
+    assert response.status_code == 400
+
+def test_emit_boleto_asaas_error(client, make_freight, asaas, monkeypatch):
+    monkeypatch.setattr(billing.requests, "post", lambda url, **kwargs: _Response(400, {"errors": ["invalid"]}))
+    freight_id = make_freight(status="DELIVERED")
+    response = client.post(f"/billing/emit/{freight_id}", json={"value": 200.0, "due_date": "2026-12-10"})
+    assert response.status_code == 400
+    assert client.get(f"/freights/{freight_id}").json()["billing_status"] == "PENDING"
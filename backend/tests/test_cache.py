@@ -0,0 +1,75 @@
+import threading
+
+from services.cache import ResponseCache, dashboard_cache
+
+def test_computes_once_per_version():
+    cache = ResponseCache()
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+
+    assert cache.get_or_compute("k", compute) == 1
+    assert cache.get_or_compute("k", compute) == 1
+    cache.bump()
+    assert cache.get_or_compute("k", compute) == 2
+    assert cache.stats()["hits"] == 1
+
+def test_value_computed_across_a_bump_is_not_kept():
+    cache = ResponseCache()
+
+    def stale():
+        cache.bump() # a write commits while the value is being computed
+        return "stale"
+
+    assert cache.get_or_compute("k", stale) == "stale"
+    assert cache.get_or_compute("k", lambda: "fresh") == "fresh"
+
+def test_ttl_and_size_limit():
+    cache = ResponseCache(ttl_seconds=0)
+    cache.get_or_compute("k", lambda: 1)
+    assert cache.get_or_compute("k", lambda: 2) == 2
+
+    cache = ResponseCache(max_entries=2)
+    for key in "abc":
+        cache.get_or_compute(key, lambda: key)
+    assert cache.stats()["entries"] == 2
+
+def test_concurrent_misses_compute_once_and_release_the_key_lock():
+    cache = ResponseCache()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", slow))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert (len(calls), results) == (1, ["value"] * 3)
+
+    # Keys seen once (drilldown filters) leave nothing behind
+    for key in range(100):
+        cache.get_or_compute(("drilldown", key), lambda: key)
+    assert cache._key_locks == {}
+
+def test_writes_invalidate_the_dashboard(client, make_freight):
+    active = client.get("/dashboard/stats").json()["kpis"]["active_freights"]
+    version = dashboard_cache.version
+    assert client.get("/dashboard/stats").json()["kpis"]["active_freights"] == active
+    assert dashboard_cache.version == version
+
+    make_freight(status="IN_TRANSIT")
+    assert dashboard_cache.version > version
+    assert client.get("/dashboard/stats").json()["kpis"]["active_freights"] == active + 1
+
+def test_requests_that_write_nothing_keep_the_cache(client):
+    client.get("/dashboard/stats")
+    version = dashboard_cache.version
+    assert client.patch("/freights/999999/status", params={"status": "LOADING"}).status_code == 404
+    assert dashboard_cache.version == version
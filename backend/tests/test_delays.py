@@ -0,0 +1,47 @@
+import time
+from datetime import datetime, timedelta
+
+import database
+from services import delays
+
+def _delayed_ids(client):
+    response = client.get("/dashboard/drilldown", params={"filter_type": "kpi", "filter_value": "delayed"})
+    assert response.status_code == 200, response.text
+    return {f["id"] for f in response.json()}
+
+def _wait(condition, timeout=5.0):
+    """The delays job runs in the background, woken by dashboard data changes."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+def test_late_freights(make_freight):
+    late = make_freight(days_ago=3, status="IN_TRANSIT")
+    on_time = make_freight(status="IN_TRANSIT")
+    quoted = make_freight(days_ago=3)
+    db = database.SessionLocal()
+    try:
+        found = delays.late_freights(db)
+        assert late in found and on_time not in found and quoted not in found
+        assert on_time in delays.late_freights(db, now=datetime.now() + timedelta(days=2))
+    finally:
+        db.close()
+
+def test_delayed_set_follows_writes(client, make_freight):
+    freight_id = make_freight(days_ago=3, status="LOADING")
+    assert _wait(lambda: freight_id in _delayed_ids(client))
+    assert client.get("/dashboard/stats").json()["kpis"]["delays"] >= 1
+
+    events = client.get(f"/freights/{freight_id}/events").json()
+    assert [e["type"] for e in events].count("DELAYED") == 1
+    assert events[-1]["data"]["state"]["status"] == "LOADING"
+
+    client.patch(f"/freights/{freight_id}/status", params={"status": "DELIVERED"})
+    assert _wait(lambda: freight_id not in _delayed_ids(client))
+
+def test_deleted_freight_leaves_the_drilldown(client, make_freight):
+    freight_id = make_freight(days_ago=3, status="RECRUITING")
+    assert _wait(lambda: freight_id in _delayed_ids(client))
+    client.delete(f"/freights/{freight_id}")
+    assert freight_id not in _delayed_ids(client)
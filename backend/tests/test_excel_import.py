@@ -0,0 +1,170 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import openpyxl
+import pytest
+from sqlalchemy.orm import joinedload
+
+import database, models
+from routers import imports
+from services import excel_import
+
+COLUMNS = {
+    "client_name": "Cliente",
+    "cte_number": "CT-e",
+    "origin": "Origem",
+    "destination": "Destino",
+    "pickup_date": "Data Coleta",
+    "status": "Situação",
+    "driver_name": "Motorista",
+    "driver_cpf": "CPF",
+}
+
+def _profile(name, **fields):
+    return {"name": name, "sheet": "Cargas", "header_row": 2, "columns": COLUMNS,
+            "status_map": {"ENTREGUE": "DELIVERED", "Em Trânsito": "IN_TRANSIT"}, **fields}
+
+def _workbook(path, rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Cargas"
+    sheet.append(["PROGRAMAÇÃO DE CARGAS"])
+    # Headers differ from the profile in case, accents and spacing
+    sheet.append(["CLIENTE", "ct-e", " ORIGEM ", "DESTINO", "DATA  COLETA", "SITUACAO", "MOTORISTA", "CPF"])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+@pytest.fixture
+def run(client):
+    """run(profile_name, path) -> the finished ImportJob (run inline, not in a thread)."""
+    def run(profile_name, path, job_id=None):
+        db = database.SessionLocal()
+        try:
+            if job_id is None:
+                profile = db.query(models.ImportProfile).filter(models.ImportProfile.name == profile_name).one()
+                job = models.ImportJob(profile_id=profile.id, filename="grade.xlsx", file_path=path)
+                db.add(job)
+                db.commit()
+                job_id = job.id
+        finally:
+            db.close()
+        excel_import.run_job(job_id)
+        db = database.SessionLocal()
+        try:
+            job = db.get(models.ImportJob, job_id)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+    return run
+
+def _freights(client_name):
+    db = database.SessionLocal()
+    try:
+        return db.query(models.Freight).join(models.Client).options(joinedload(models.Freight.driver)).filter(
+            models.Client.name == client_name
+        ).order_by(models.Freight.id).all()
+    finally:
+        db.close()
+
+@pytest.mark.parametrize("columns, message", [
+    ({**COLUMNS, "color": "Cor"}, "Unknown fields: color"),
+    ({k: v for k, v in COLUMNS.items() if k != "pickup_date"}, "Missing required fields: pickup_date"),
+])
+def test_profile_validation(client, columns, message):
+    response = client.post("/imports/profiles", json=_profile("Inválido", columns=columns))
+    assert response.status_code == 400
+    assert response.json()["detail"] == message
+
+def test_profile_names_are_unique(client):
+    assert client.post("/imports/profiles", json=_profile("Duplicado")).status_code == 200
+    assert client.post("/imports/profiles", json=_profile("Duplicado")).status_code == 400
+
+def test_import_and_reimport(client, run, tmp_path):
+    assert client.post("/imports/profiles", json=_profile("Grade Teste")).status_code == 200
+    rows = [
+        ["Importadora Um", 910001, "Campinas - SP", "Santos - SP", "05/03/2026 08:00h", "Entregue", "João Import", "123.456.789-09"],
+        ["Importadora Um", None, "Campinas - SP", "Sorocaba - SP", datetime(2026, 3, 6, 9, 0), "em transito", None, None],
+        [None, None, None, None, None, None, None, None],
+        ["Importadora Um", None, "Campinas - SP", None, "07/03/2026", None, None, None],
+        ["Importadora Um", None, "Campinas - SP", "Jundiaí - SP", "amanhã", None, None, None],
+        ["Importadora Um", None, "Campinas - SP", "Jundiaí - SP", "08/03/2026", "Perdido", None, None],
+    ]
+    path = _workbook(tmp_path / "grade.xlsx", rows)
+
+    job = run("Grade Teste", path)
+    assert job.status == "DONE", job.message
+    assert (job.inserted, job.updated, job.skipped, job.failed, job.processed_rows) == (2, 0, 1, 3, 6)
+    assert [(e["row"], e["message"]) for e in json.loads(job.errors)] == [
+        (6, "Missing destination"),
+        (7, "Invalid date: 'amanhã'"),
+        (8, "Unknown status: 'Perdido'"),
+    ]
+
+    first, second = _freights("IMPORTADORA UM")
+    assert (first.cte_number, first.status, first.origin) == ("910001", "DELIVERED", "CAMPINAS - SP")
+    assert first.pickup_date == datetime(2026, 3, 5, 8, 0)
+    assert first.driver.cpf == "123.456.789-09" and first.driver.name == "JOÃO IMPORT"
+    assert (second.cte_number, second.status, second.driver_id) == (None, "IN_TRANSIT", None)
+
+    # Same sheet again: matched by CT-e or by client, pickup, origin and destination
+    rows[0][5], rows[1][5] = "Em trânsito", "Entregue"
+    job = run("Grade Teste", _workbook(tmp_path / "grade2.xlsx", rows))
+    assert (job.inserted, job.updated) == (0, 2)
+    assert [(f.id, f.status) for f in _freights("IMPORTADORA UM")] == [(first.id, "IN_TRANSIT"), (second.id, "DELIVERED")]
+
+def test_resume_after_failure(client, run, tmp_path, monkeypatch):
+    assert client.post("/imports/profiles", json=_profile("Grade Retomada")).status_code == 200
+    rows = [["Importadora Dois", 920000 + i, "Campinas - SP", "Santos - SP", f"{i + 1:02d}/04/2026", None, None, None]
+            for i in range(5)]
+    path = _workbook(tmp_path / "grade.xlsx", rows)
+
+    import_batch, calls = excel_import._import_batch, []
+    def failing_batch(db, job, batch, *args):
+        calls.append([row for row, _ in batch])
+        if len(calls) == 2:
+            raise OSError("disk full")
+        import_batch(db, job, batch, *args)
+    monkeypatch.setattr(excel_import, "BATCH_SIZE", 2)
+    monkeypatch.setattr(excel_import, "_import_batch", failing_batch)
+
+    job = run("Grade Retomada", path)
+    assert (job.status, job.message, job.checkpoint_row, job.inserted) == ("FAILED", "disk full", 4, 2)
+    assert len(_freights("IMPORTADORA DOIS")) == 2
+
+    job = run("Grade Retomada", path, job_id=job.id)
+    assert job.status == "DONE", job.message
+    # The committed batch is not read again
+    assert calls == [[3, 4], [5, 6], [5, 6], [7]]
+    assert (job.inserted, job.updated, job.processed_rows, job.checkpoint_row) == (5, 0, 5, 7)
+    assert [f.cte_number for f in _freights("IMPORTADORA DOIS")] == [str(920000 + i) for i in range(5)]
+
+@pytest.mark.parametrize("cte, expected", [
+    ("CTE-181", None), ("CTe 7", None), ("CTE-", None), ("-", None),
+    (98765, "98765"), ("CTE 123456", "CTE 123456"),
+])
+def test_cte_placeholders(cte, expected):
+    row = {"client_name": "Cliente", "origin": "A", "destination": "B", "pickup_date": "01/04/2026", "cte_number": cte}
+    assert excel_import._parse_row(row, {})["cte_number"] == expected
+
+def test_upload_job(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(imports, "IMPORTS_DIR", str(tmp_path / "imports"))
+    profile = client.post("/imports/profiles", json=_profile("Grade Upload")).json()
+    path = _workbook(tmp_path / "grade.xlsx", [
+        ["Importadora Três", 930001, "Campinas - SP", "Santos - SP", "02/05/2026", None, None, None],
+    ])
+    with open(path, "rb") as f:
+        response = client.post("/imports/jobs", data={"profile_id": profile["id"]}, files={"file": ("grade.xlsx", f)})
+    assert response.status_code == 200, response.text
+    job_id = response.json()["id"]
+
+    deadline = time.monotonic() + 5
+    while client.get(f"/imports/jobs/{job_id}").json()["status"] not in ("DONE", "FAILED") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    job = client.get(f"/imports/jobs/{job_id}").json()
+    assert (job["status"], job["inserted"]) == ("DONE", 1)
+    assert len(os.listdir(tmp_path / "imports")) == 1
@@ -0,0 +1,71 @@
+import csv
+import io
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+from services import export
+
+@pytest.fixture(scope="module")
+def exported(client):
+    """Id of a client whose three freights are the only rows of the filtered exports."""
+    response = client.post("/clients/", json={"name": "Exportação Ltda", "cnpj": "11444777000161", "phone": "1"})
+    assert response.status_code == 200, response.text
+    client_id = response.json()["id"]
+    for day in (3, 1, 2):
+        response = client.post("/freights/", json={
+            "client_id": client_id,
+            "origin": "CAMPINAS - SP",
+            "destination": "SÃO PAULO - SP",
+            "pickup_date": datetime(2026, 2, day, 8, 30).isoformat(),
+            "delivery_date": datetime(2026, 2, day + 1, 17, 0).isoformat(),
+            "valor_cliente": 1500.5,
+            "valor_motorista": 900.0,
+            "status": "QUOTED",
+            "observation": f"carga {day}; frágil",
+        })
+        assert response.status_code == 200, response.text
+    return client_id
+
+def test_csv(client, exported, monkeypatch):
+    monkeypatch.setattr(export, "CSV_FLUSH_ROWS", 2)
+    response = client.get("/freights/export", params={"client_id": exported})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="fretes_' in response.headers["content-disposition"]
+    assert response.content.startswith(b"\xef\xbb\xbf")
+
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig")), delimiter=";"))
+    assert rows[0] == export.FREIGHT_HEADERS
+    columns = {name: i for i, name in enumerate(rows[0])}
+    # Ordered by pickup date; dates and decimals in the pt-BR format; separators inside values quoted
+    assert [r[columns["Coleta"]] for r in rows[1:]] == ["01/02/2026 08:30", "02/02/2026 08:30", "03/02/2026 08:30"]
+    assert {r[columns["Cliente"]] for r in rows[1:]} == {"Exportação Ltda"}
+    assert rows[1][columns["Observação"]] == "carga 1; frágil"
+    assert rows[1][columns["Valor Cliente"]] == "1500,50"
+
+def test_xlsx(client, exported):
+    response = client.get("/freights/export", params={"client_id": exported, "format": "xlsx"})
+    assert response.status_code == 200
+    sheet = openpyxl.load_workbook(io.BytesIO(response.content), read_only=True)["Fretes"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == export.FREIGHT_HEADERS
+    assert [r[2] for r in rows[1:]] == [datetime(2026, 2, day, 8, 30) for day in (1, 2, 3)]
+    assert all(r[11] == 1500.5 and r[12] == 900.0 for r in rows[1:])
+
+def test_status_filter_and_format(client, exported):
+    response = client.get("/freights/export", params={"client_id": exported, "status": ["DELIVERED"]})
+    assert response.content.decode("utf-8-sig").splitlines() == [";".join(export.FREIGHT_HEADERS)]
+    assert client.get("/freights/export", params={"format": "pdf"}).status_code == 422
+
+def test_transactions(client):
+    response = client.post("/financial/transactions", json={
+        "type": "EXPENSE", "category": "Pedágio", "description": "Exportação", "amount": 42.5,
+        "date": datetime(2026, 2, 10).isoformat(), "status": "PAID",
+    })
+    assert response.status_code == 200, response.text
+    response = client.get("/financial/transactions/export", params={"type": "EXPENSE", "date_from": "2026-02-10T00:00:00", "date_to": "2026-02-11T00:00:00"})
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig")), delimiter=";"))
+    assert rows[0] == export.TRANSACTION_HEADERS
+    assert [r[1:6] for r in rows[1:] if r[4] == "Exportação"] == [["10/02/2026 00:00", "EXPENSE", "Pedágio", "Exportação", "42,50"]]
@@ -0,0 +1,31 @@
+def test_partial_failure(client, make_freight, driver_id):
+    ids = [make_freight() for _ in range(6)]
+    missing = max(ids) + 1000
+
+    response = client.post("/freights/batch", json={"operations": [
+        {"op": "status", "freight_ids": ids[:2] + [missing], "status": "DELIVERED"},
+        {"op": "assign", "freight_ids": ids[2:3], "driver_id": 999999},
+        {"op": "status", "freight_ids": ids[3:4], "status": "BOGUS"},
+        {"op": "assign", "freight_ids": ids[4:5], "driver_id": driver_id},
+        {"op": "delete", "freight_ids": ids[5:6]},
+        {"op": "status", "freight_ids": ids[5:6], "status": "QUOTED"},
+    ]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["applied"], result["failed"]) == (4, 4)
+    failed = {(r["index"], r["freight_id"]): r["error"] for r in result["results"] if not r["ok"]}
+    assert failed == {
+        (0, missing): "Freight not found",
+        (1, ids[2]): "Driver not found",
+        (2, ids[3]): "Invalid status: BOGUS",
+        (5, ids[5]): "Freight not found",
+    }
+
+    # What succeeded was committed; the failures left their freights alone
+    freights = {i: client.get(f"/freights/{i}") for i in ids}
+    assert [freights[i].json()["status"] for i in ids[:2]] == ["DELIVERED", "DELIVERED"]
+    assert all(freights[i].json()["delivered_at"] for i in ids[:2])
+    assert freights[ids[2]].json()["driver_id"] is None
+    assert freights[ids[3]].json()["status"] == "QUOTED"
+    assert freights[ids[4]].json()["driver_id"] == driver_id
+    assert freights[ids[5]].status_code == 404
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+import database, models
+from services import ingest
+
+def _record(customer_id, **fields):
+    now = datetime.now().isoformat()
+    return {"client_id": customer_id, "origin": "CAMPINAS - SP", "destination": "RIO DE JANEIRO - RJ",
+            "pickup_date": now, "delivery_date": now, "valor_motorista": 100.0, "valor_cliente": 200.0, **fields}
+
+def _feed_in_pieces(parser, text, size):
+    records = []
+    for i in range(0, len(text), size):
+        records += parser.feed(text[i:i + size])
+    return records + parser.close()
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_array_split_anywhere(size):
+    text = ' [ {"a": 1}, {"b": "x,]}"} ,{"c": [1, 2]}]\n'
+    assert _feed_in_pieces(ingest.RecordParser(ndjson=False), text, size) == [{"a": 1}, {"b": "x,]}"}, {"c": [1, 2]}]
+
+@pytest.mark.parametrize("size", [1, 4, 1000])
+def test_ndjson_split_anywhere(size):
+    records = _feed_in_pieces(ingest.RecordParser(ndjson=True), '{"a": 1}\n\nnot json\n{"b": 2}', size)
+    assert records[0] == {"a": 1} and records[2] == {"b": 2}
+    assert isinstance(records[1], ValueError)
+
+def test_truncated_array():
+    parser = ingest.RecordParser(ndjson=False)
+    assert parser.feed('[{"a": 1}, {"b":') == [{"a": 1}]
+    with pytest.raises(ValueError):
+        parser.close()
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_malformed_array_element_is_a_row_error(size):
+    text = '[{"a": 1}, {"b": tru}, {"c": "x]"}, nope, {"d": 4}]'
+    records = _feed_in_pieces(ingest.RecordParser(ndjson=False), text, size)
+    assert [r if isinstance(r, dict) else "error" for r in records] == [{"a": 1}, "error", {"c": "x]"}, "error", {"d": 4}]
+
+def test_not_an_array():
+    with pytest.raises(ValueError):
+        ingest.RecordParser(ndjson=False).feed('{"a": 1}')
+
+def test_chunks_commit_independently(client, customer_id):
+    records = [
+        _record(customer_id, observation="ingest ok 1"),
+        _record(customer_id, valor_cliente="muito"),
+        _record(customer_id, observation="ingest ok 2"),
+        _record(999999),
+        _record(customer_id, observation="ingest ok 3"),
+    ]
+
+    async def body():
+        for record in records:
+            yield (json.dumps(record) + "\n").encode()
+        yield b"{broken\n"
+
+    db = database.SessionLocal()
+    try:
+        result = asyncio.run(ingest.ingest_stream(db, body(), ndjson=True, chunk_size=2))
+    finally:
+        db.close()
+
+    assert (result["received"], result["inserted"], result["failed"]) == (6, 3, 3)
+    assert [e["row"] for e in result["errors"]] == [2, 4, 6]
+    assert result["errors"][0]["errors"][0]["field"] == "valor_cliente"
+    assert result["errors"][1]["errors"][0]["message"] == "Client not found"
+
+    db = database.SessionLocal()
+    try:
+        stored = db.query(models.Freight).filter(models.Freight.observation.like("ingest ok %")).all()
+        assert sorted(f.observation for f in stored) == ["ingest ok 1", "ingest ok 2", "ingest ok 3"]
+        assert {(f.status, f.origin_state) for f in stored} == {("QUOTED", "SP")}
+    finally:
+        db.close()
+
+def test_bulk_endpoint(client, customer_id):
+    body = json.dumps([_record(customer_id, observation="bulk array")] * 3)
+    response = client.post("/freights/bulk", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 3
+    assert client.get("/freights/search", params={"q": "bulk array"}).headers["X-Total-Count"] == "3"
+
+def test_bulk_endpoint_reports_partial_work(client, customer_id):
+    records = [json.dumps(_record(customer_id, observation="bulk partial"))] * 2
+    body = "[" + ", ".join(records + ["{broken}", records[0]]) + ", {\"client_id\":"
+    response = client.post("/freights/bulk", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    result = response.json()
+    assert result["detail"] == result["error"] == "Unexpected end of JSON array"
+    assert (result["received"], result["inserted"], result["failed"]) == (4, 3, 1)
+    assert result["errors"][0]["row"] == 3
+    assert client.get("/freights/search", params={"q": "bulk partial"}).headers["X-Total-Count"] == "3"
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+import database, models
+from services import cache, loaders
+
+# With EAGLES_RAISE_ON_LAZY=1 a relationship the loaders did not list raises
+# instead of running one SELECT per row: every list endpoint must still answer.
+
+@pytest.fixture
+def strict(monkeypatch):
+    monkeypatch.setenv("EAGLES_RAISE_ON_LAZY", "1")
+
+@pytest.fixture
+def freights(client, make_freight, driver_id):
+    ids = [make_freight(days_ago=i) for i in range(4)]
+    for freight_id in ids:
+        client.patch(f"/freights/{freight_id}/assign/{driver_id}")
+    client.patch(f"/freights/{ids[0]}/status", params={"status": "DELIVERED"})
+    client.patch(f"/freights/{ids[2]}/status", params={"status": "IN_TRANSIT"})
+    db = database.SessionLocal()
+    try:
+        db.get(models.Freight, ids[1]).billing_status = "ISSUED"
+        db.commit()
+    finally:
+        db.close()
+    cache.dashboard_cache.bump() # nothing cached from before the loader switch
+    return ids
+
+def test_unlisted_relationship_raises(strict, freights):
+    db = database.SessionLocal()
+    try:
+        freight = db.query(models.Freight).options(*loaders.freight_with_client()).filter(
+            models.Freight.id == freights[0]
+        ).one()
+        assert freight.client.name
+        with pytest.raises(InvalidRequestError):
+            freight.driver
+    finally:
+        db.close()
+
+@pytest.mark.parametrize("url, params", [
+    ("/freights/", {}),
+    ("/freights/", {"order": "asc", "limit": 2}),
+    ("/freights/search", {"q": "CAMPINAS"}),
+    ("/dashboard/stats", {}),
+    ("/dashboard/drilldown", {"filter_type": "kpi", "filter_value": "active"}),
+    ("/dashboard/drilldown", {"filter_type": "state", "filter_value": "SP"}),
+    ("/dashboard/drilldown", {"filter_type": "vehicle", "filter_value": "TRUCK"}),
+    ("/billing/pending", {}),
+    ("/billing/issued", {}),
+    ("/sync/", {}),
+])
+def test_list_endpoints_load_eagerly(client, strict, freights, url, params):
+    response = client.get(url, params=params)
+    assert response.status_code == 200, response.text
+    assert response.json()
+
+def test_detail_loads_eagerly(client, strict, freights):
+    response = client.get(f"/freights/{freights[0]}")
+    assert response.status_code == 200, response.text
+    assert response.json()["driver"]["name"] == "Motorista Teste"
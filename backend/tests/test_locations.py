@@ -0,0 +1,36 @@
+import pytest
+
+from services import locations
+
+@pytest.mark.parametrize("text, expected", [
+    ("CAMPINAS - SP", ("CAMPINAS", "SP")),
+    ("Curitiba, PR", ("CURITIBA", "PR")),
+    ("São Paulo/SP", ("SAO PAULO", "SP")),
+    ("  belo   horizonte -mg ", ("BELO HORIZONTE", "MG")),
+    ("RJ", (None, "RJ")),
+    ("Campinas", ("CAMPINAS", None)),
+    ("CAMPINAS - XX", ("CAMPINAS - XX", None)),
+    ("", (None, None)),
+    (None, (None, None)),
+])
+def test_parse(text, expected):
+    assert locations.parse(text) == expected
+
+def test_freights_get_resolved_locations(client, make_freight):
+    freight_id = make_freight(origin="São Paulo/SP", destination="Curitiba")
+    freight = client.get(f"/freights/{freight_id}").json()
+    assert freight["origin_state"] == "SP" and freight["origin_city_id"] is not None
+    # A name without UF is trusted when only one city has it
+    assert freight["destination_state"] == "PR" and freight["destination_city_id"] is not None
+
+    unknown = client.get(f"/freights/{make_freight(origin='Fazenda Boa Vista', destination='xx - MG')}").json()
+    assert (unknown["origin_city_id"], unknown["origin_state"]) == (None, None)
+    assert (unknown["destination_city_id"], unknown["destination_state"]) == (None, "MG")
+
+def test_editing_the_origin_resolves_it_again(client, make_freight, customer_id):
+    freight_id = make_freight(origin="CAMPINAS - SP")
+    freight = client.get(f"/freights/{freight_id}").json()
+    fields = ("client_id", "origin", "destination", "pickup_date", "delivery_date", "valor_motorista", "valor_cliente", "status")
+    response = client.put(f"/freights/{freight_id}", json={**{k: freight[k] for k in fields}, "origin": "Belo Horizonte, MG"})
+    assert response.status_code == 200, response.text
+    assert response.json()["origin_state"] == "MG"
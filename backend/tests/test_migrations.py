@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import pytest
+from sqlalchemy import inspect, text
+
+import database, models
+from services import migrations
+
+# The tracked eagles_v3.db predates the migrations: it is copied, never opened.
+LEGACY_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eagles_v3.db")
+
+@pytest.fixture
+def legacy_engine(tmp_path, monkeypatch):
+    path = tmp_path / "legacy.db"
+    shutil.copyfile(LEGACY_DB, path)
+    monkeypatch.setattr(database, "ARCHIVE_DATABASE_PATH", str(tmp_path / "legacy_archive.db"))
+    engine = database.create_db_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+def _scalar(engine, sql):
+    with engine.connect() as conn:
+        return conn.scalar(text(sql))
+
+def test_upgrade_existing_database(legacy_engine):
+    freights = _scalar(legacy_engine, "SELECT count(*) FROM freights")
+
+    assert migrations.upgrade(legacy_engine) == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.upgrade(legacy_engine) == []
+
+    inspector = inspect(legacy_engine)
+    for table in models.Base.metadata.sorted_tables:
+        columns = {c["name"] for c in inspector.get_columns(table.name, schema=table.schema)}
+        assert {c.name for c in table.columns} <= columns, table.fullname
+        indexes = {i["name"] for i in inspector.get_indexes(table.name, schema=table.schema)}
+        assert {i.name for i in table.indexes} <= indexes, table.fullname
+
+    assert _scalar(legacy_engine, "SELECT count(*) FROM freights") == freights
+    assert _scalar(legacy_engine, "SELECT count(*) FROM freights WHERE change_version IS NULL") == 0
+    assert _scalar(legacy_engine, "SELECT version FROM sync_state WHERE id = 1") >= 1
+    assert _scalar(legacy_engine, "SELECT count(*) FROM freights_fts") == freights
+    assert _scalar(legacy_engine, "SELECT count(*) FROM drivers WHERE status IS NULL") == 0
+    # AUTOINCREMENT: ids of archived or deleted rows are never handed out again
+    for table in ("freights", "financial_transactions"):
+        assert "AUTOINCREMENT" in _scalar(legacy_engine, f"SELECT sql FROM sqlite_master WHERE name = '{table}'")
+    assert _scalar(legacy_engine, "SELECT seq FROM sqlite_sequence WHERE name = 'freights'") >= _scalar(legacy_engine, "SELECT max(id) FROM freights")
+
+def test_failed_step_leaves_nothing(legacy_engine, monkeypatch):
+    def add_then_fail(db):
+        migrations._add_columns(db, "clients", [("nickname", "VARCHAR")])
+        raise RuntimeError("step failed")
+
+    steps = migrations.MIGRATIONS[:2] + [(99, "failing step", add_then_fail)]
+    monkeypatch.setattr(migrations, "MIGRATIONS", steps)
+    with pytest.raises(RuntimeError):
+        migrations.upgrade(legacy_engine)
+
+    # The steps before it stay applied; the failing one is retried next time
+    assert migrations.applied_versions(legacy_engine) == {1, 2}
+    assert "nickname" not in {c["name"] for c in inspect(legacy_engine).get_columns("clients")}
+    assert [version for version, _, _ in migrations.pending(legacy_engine)] == [99]
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import database, models
+from services.pagination import decode_cursor, encode_cursor, paginate
+
+def _key(freight):
+    return datetime.fromisoformat(freight["pickup_date"]), freight["id"]
+
+def test_cursor_round_trip():
+    when = datetime(2026, 3, 1, 8, 30, 15, 250)
+    assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+def test_invalid_cursor():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_the_list_once(client, make_freight, all_pages, order):
+    same_day = datetime(2026, 1, 10, 9, 0).isoformat()
+    ids = [make_freight(days_ago=i % 4) for i in range(6)] + [make_freight(pickup_date=same_day) for _ in range(3)]
+
+    rows = all_pages("/freights/", limit=4, order=order)
+    total = int(client.get("/freights/", params={"limit": 1, "with_count": True}).headers["X-Total-Count"])
+
+    seen = [f["id"] for f in rows]
+    assert len(seen) == len(set(seen)) == total
+    assert set(ids) <= set(seen)
+    keys = [_key(f) for f in rows]
+    assert keys == sorted(keys, reverse=order == "desc")
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_null_sort_values(make_freight, descending):
+    F = models.Freight
+    ids = [make_freight(days_ago=i) for i in range(5)]
+    # Inside one transaction that is rolled back: the schema never sees a NULL pickup date
+    db = database.SessionLocal()
+    try:
+        db.query(F).filter(F.id.in_(ids[::2])).update({F.pickup_date: None})
+        query = db.query(F).filter(F.id.in_(ids))
+        seen, cursor = [], None
+        while True:
+            rows, cursor = paginate(query, F.pickup_date, F.id, cursor, 2, descending=descending)
+            seen += [f.id for f in rows]
+            if not cursor:
+                break
+        expected = [f.id for f in query.order_by(
+            *((F.pickup_date.desc(), F.id.desc()) if descending else (F.pickup_date.asc(), F.id.asc()))
+        )]
+    finally:
+        db.rollback()
+        db.close()
+    assert seen == expected
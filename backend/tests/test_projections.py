@@ -0,0 +1,92 @@
+import time
+from datetime import datetime
+
+import pytest
+
+import database, models
+
+@pytest.fixture
+def new_driver(client):
+    """new_driver(cpf) -> id of a driver with no freights yet."""
+    def create(cpf):
+        response = client.post("/drivers/", json={"name": f"Projeção {cpf}", "phone": "1", "cpf": cpf, "vehicle_type": "TRUCK"})
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return create
+
+def _stats(client, driver_id, expected, timeout=5.0):
+    """Waits for the background runner to bring the driver's row to `expected`."""
+    deadline = time.monotonic() + timeout
+    while True:
+        row = next((s for s in client.get("/drivers/stats").json() if s["driver_id"] == driver_id), {})
+        current = {k: row.get(k) for k in expected}
+        if current == expected or time.monotonic() > deadline:
+            return current
+        time.sleep(0.05)
+
+def test_journal(client, make_freight, driver_id):
+    freight_id = make_freight()
+    client.patch(f"/freights/{freight_id}/assign/{driver_id}")
+    client.patch(f"/freights/{freight_id}/status", params={"status": "DELIVERED"})
+
+    events = client.get(f"/freights/{freight_id}/events").json()
+    assert [e["type"] for e in events] == ["CREATED", "UPDATED", "UPDATED"]
+    assert events[0]["data"]["state"]["status"] == "QUOTED"
+    assert events[1]["data"]["changes"]["driver_id"] == [None, driver_id]
+    assert events[2]["data"]["changes"]["status"] == ["QUOTED", "DELIVERED"]
+    assert events[2]["data"]["state"] == {"status": "DELIVERED", "driver_id": driver_id, "client_id": events[0]["data"]["state"]["client_id"],
+                                          "valor_cliente": 200.0, "valor_motorista": 100.0}
+
+def test_driver_stats(client, make_freight, new_driver):
+    driver = new_driver("00000000016")
+    accepted, rejected, delivered = (make_freight() for _ in range(3))
+    for freight_id in (accepted, rejected, delivered):
+        client.patch(f"/freights/{freight_id}/assign/{driver}")
+    client.post(f"/freights/{accepted}/accept")
+    client.post(f"/freights/{rejected}/reject", json={"reason": "sem agenda"})
+    client.patch(f"/freights/{delivered}/status", params={"status": "DELIVERED"})
+
+    expected = {"assigned_count": 3, "accepted_count": 1, "rejected_count": 1, "delivered_count": 1,
+                "delivered_revenue": 200.0, "delivered_driver_pay": 100.0}
+    assert _stats(client, driver, expected) == expected
+
+    # Values corrected after delivery, then the delivery undone
+    freight = client.get(f"/freights/{delivered}").json()
+    payload = {k: freight[k] for k in ("client_id", "origin", "destination", "pickup_date", "delivery_date", "status")}
+    client.put(f"/freights/{delivered}", json={**payload, "valor_cliente": 250.0, "valor_motorista": 120.0})
+    expected.update(delivered_revenue=250.0, delivered_driver_pay=120.0)
+    assert _stats(client, driver, expected) == expected
+
+    client.patch(f"/freights/{delivered}/status", params={"status": "IN_TRANSIT"})
+    expected.update(delivered_count=0, delivered_revenue=0.0, delivered_driver_pay=0.0)
+    assert _stats(client, driver, expected) == expected
+
+def test_created_delivered(client, customer_id, new_driver):
+    # As the spreadsheet import writes them: assigned and delivered from the start
+    driver = new_driver("00000000017")
+    db = database.SessionLocal()
+    try:
+        db.add(models.Freight(client_id=customer_id, driver_id=driver, origin="CAMPINAS - SP", destination="SANTOS - SP",
+                              pickup_date=datetime.now(), delivery_date=datetime.now(), status="DELIVERED", valor_cliente=300.0, valor_motorista=150.0))
+        db.commit()
+    finally:
+        db.close()
+    expected = {"assigned_count": 1, "delivered_count": 1, "delivered_revenue": 300.0, "delivered_driver_pay": 150.0}
+    assert _stats(client, driver, expected) == expected
+
+def test_deleted_freights_leave_the_stats(client, make_freight, new_driver):
+    driver = new_driver("00000000018")
+    kept, deleted, batch_deleted = (make_freight() for _ in range(3))
+    for freight_id in (kept, deleted, batch_deleted):
+        client.patch(f"/freights/{freight_id}/assign/{driver}")
+        client.post(f"/freights/{freight_id}/accept")
+        client.patch(f"/freights/{freight_id}/status", params={"status": "DELIVERED"})
+    expected = {"assigned_count": 3, "accepted_count": 3, "delivered_count": 3, "delivered_revenue": 600.0}
+    assert _stats(client, driver, expected) == expected
+
+    # Through the ORM and through a batch delete
+    assert client.delete(f"/freights/{deleted}").status_code == 200
+    response = client.post("/freights/batch", json={"operations": [{"op": "delete", "freight_ids": [batch_deleted]}]})
+    assert response.status_code == 200, response.text
+    expected = {"assigned_count": 1, "accepted_count": 1, "delivered_count": 1, "delivered_revenue": 200.0}
+    assert _stats(client, driver, expected) == expected
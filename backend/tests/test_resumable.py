@@ -0,0 +1,79 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from services import media, resumable
+
+def _photo(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Part files and processed photos go under tmp_path; images are processed inline."""
+    monkeypatch.setattr(resumable, "SESSIONS_DIR", str(tmp_path / "upload_sessions"))
+    monkeypatch.setattr(media, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(media, "WORKERS", 0)
+    return tmp_path
+
+def _create(client, freight_id, photos):
+    files = [{"filename": f"foto{i}.png", "size": len(data)} for i, data in enumerate(photos)]
+    response = client.post(f"/freights/{freight_id}/uploads", json={"files": files})
+    assert response.status_code == 201, response.text
+    return response.json()["upload_id"]
+
+def _send(client, upload_id, index, start, data):
+    return client.patch(f"/freights/uploads/{upload_id}/parts/{index}", content=data,
+                        headers={"Upload-Offset": str(start)})
+
+def test_photo_count_is_checked(client, storage, make_freight):
+    photos = [_photo("red"), _photo("blue")]
+    files = [{"filename": f"foto{i}.png", "size": len(data)} for i, data in enumerate(photos)]
+    response = client.post(f"/freights/{make_freight()}/uploads", json={"files": files})
+    assert response.status_code == 400
+
+def test_resume_and_finalize(client, storage, make_freight):
+    freight_id = make_freight()
+    photos = [_photo(color) for color in ("red", "green", "blue")]
+    upload_id = _create(client, freight_id, photos)
+
+    # A connection dropped after half of the first part: the client resumes from the stored offset
+    half = len(photos[0]) // 2
+    response = _send(client, upload_id, 0, 0, photos[0][:half])
+    assert response.status_code == 204 and response.headers["Upload-Offset"] == str(half)
+
+    response = _send(client, upload_id, 0, 0, photos[0])
+    assert response.status_code == 409 and response.headers["Upload-Offset"] == str(half)
+
+    offsets = [p["offset"] for p in client.get(f"/freights/uploads/{upload_id}").json()["parts"]]
+    assert offsets == [half, 0, 0]
+
+    response = client.post(f"/freights/uploads/{upload_id}/finalize")
+    assert response.status_code == 409
+    assert response.json()["detail"]["parts"] == [0, 1, 2]
+
+    assert _send(client, upload_id, 0, half, photos[0][half:]).status_code == 204
+    for index in (1, 2):
+        assert _send(client, upload_id, index, 0, photos[index]).status_code == 204
+
+    response = client.post(f"/freights/uploads/{upload_id}/finalize")
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert len(result["photos"]) == len(result["thumbnails"]) == 3
+    assert all(os.path.exists(storage / path) for path in result["photos"] + result["thumbnails"])
+    assert not os.path.exists(storage / "upload_sessions" / upload_id)
+
+    freight = client.get(f"/freights/{freight_id}").json()
+    assert freight["status"] == "DELIVERED" and freight["delivered_at"]
+
+    # Finalize is idempotent; the part endpoint refuses a finalized upload
+    assert client.post(f"/freights/uploads/{upload_id}/finalize").json() == result
+    assert _send(client, upload_id, 0, 0, photos[0]).status_code == 409
+
+def test_more_data_than_declared(client, storage, make_freight):
+    photos = [_photo(color) for color in ("white", "black", "gray")]
+    upload_id = _create(client, make_freight(), photos)
+    assert _send(client, upload_id, 0, 0, photos[0] + b"extra").status_code == 413
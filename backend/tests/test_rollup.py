@@ -0,0 +1,53 @@
+from sqlalchemy import func, select
+
+import database, models
+from services import rollup
+
+def _rollup_totals():
+    R = models.FreightDailyRollup
+    key = [c for c in R.__table__.columns if c.name not in ("id", "freight_count", "revenue", "driver_cost")]
+    db = database.SessionLocal()
+    try:
+        rows = db.execute(
+            select(*key, func.sum(R.freight_count), func.round(func.sum(R.revenue), 2), func.round(func.sum(R.driver_cost), 2))
+            .group_by(*key)
+            .having(func.sum(R.freight_count) != 0)
+            .order_by(*key)
+        ).all()
+    finally:
+        db.close()
+    return [tuple(row) for row in rows]
+
+def test_deltas_match_rebuild(client, make_freight):
+    response = client.post("/drivers/", json={"name": "Rollup", "phone": "1", "cpf": "00000000001", "vehicle_type": "CARRETA"})
+    driver_id = response.json()["id"]
+    ids = [make_freight(days_ago=i, origin=origin) for i, origin in enumerate(["CAMPINAS - SP", "Curitiba, PR", "xx", "", "São Paulo/SP", "BELO HORIZONTE - MG"])]
+
+    client.patch(f"/freights/{ids[0]}/status", params={"status": "DELIVERED"})
+    client.post(f"/freights/{ids[1]}/reject", json={"reason": "sem caminhão"})
+    client.delete(f"/freights/{ids[2]}")
+    client.patch(f"/freights/{ids[3]}/assign/{driver_id}")
+    client.patch(f"/freights/{ids[4]}/assign/{driver_id}")
+    client.put(f"/drivers/{driver_id}", json={"name": "Rollup", "phone": "1", "cpf": "00000000001", "vehicle_type": "BITREM"})
+    client.post("/freights/batch", json={"operations": [{"op": "status", "freight_ids": ids[4:], "status": "IN_TRANSIT"}]})
+
+    incremental = _rollup_totals()
+    db = database.SessionLocal()
+    try:
+        rollup.rebuild(db)
+    finally:
+        db.close()
+    assert _rollup_totals() == incremental
+
+def test_vehicle_drilldown_matches_the_chart(client, make_freight):
+    response = client.post("/drivers/", json={"name": "Caminhoneiro", "phone": "1", "cpf": "00000000002", "vehicle_type": "Caminhão"})
+    driver_id = response.json()["id"]
+    assigned = make_freight(status="LOADING")
+    client.patch(f"/freights/{assigned}/assign/{driver_id}")
+    unassigned = make_freight(status="LOADING")
+
+    buckets = {b["name"]: b["value"] for b in client.get("/dashboard/stats").json()["charts"]["by_vehicle"]}
+    for name, freight_id in (("Caminhão", assigned), (rollup.NO_VEHICLE, unassigned)):
+        response = client.get("/dashboard/drilldown", params={"filter_type": "vehicle", "filter_value": name})
+        assert freight_id in [f["id"] for f in response.json()]
+        assert response.headers["X-Total-Count"] == str(buckets[name])
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+
+from services import search
+
+def _hits(client, q):
+    response = client.get("/freights/search", params={"q": q})
+    assert response.status_code == 200, response.text
+    return [f["id"] for f in response.json()], int(response.headers["X-Total-Count"])
+
+def test_build_match():
+    assert search.build_match("São  Paulo-SP") == '"São"* "Paulo"* "SP"*'
+    with pytest.raises(HTTPException):
+        search.build_match(" -- ")
+
+def test_accents_and_prefixes(client, make_freight):
+    freight_id = make_freight(origin="São José dos Campos - SP", observation="carga frágil zanzibar")
+    assert freight_id in _hits(client, "sao jose")[0]
+    assert _hits(client, "zanzi fragil") == ([freight_id], 1)
+    assert _hits(client, "zanzibar inexistente") == ([], 0)
+
+def test_cte_number_ranks_first(client, make_freight):
+    in_observation = make_freight(observation="ver cte 778899")
+    in_cte = make_freight(cte_number="778899")
+    assert _hits(client, "778899") == ([in_cte, in_observation], 2)
+
+def test_index_follows_writes(client, make_freight):
+    freight_id = make_freight(observation="palavra quimera")
+    freight = client.get(f"/freights/{freight_id}").json()
+    fields = ("client_id", "origin", "destination", "pickup_date", "delivery_date", "valor_motorista", "valor_cliente", "status")
+    client.put(f"/freights/{freight_id}", json={**{k: freight[k] for k in fields}, "observation": "palavra hipogrifo"})
+    assert _hits(client, "quimera") == ([], 0)
+    assert _hits(client, "hipogrifo") == ([freight_id], 1)
+
+    client.delete(f"/freights/{freight_id}")
+    assert _hits(client, "hipogrifo") == ([], 0)
+
+def test_empty_query(client):
+    assert client.get("/freights/search", params={"q": "!!"}).status_code == 400
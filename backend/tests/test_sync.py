@@ -0,0 +1,26 @@
+def test_tombstones(client, make_freight):
+    ids = [make_freight() for _ in range(4)]
+    since = client.get("/sync/", params={"since": 0}).json()["version"]
+
+    client.delete(f"/freights/{ids[0]}") # ORM delete
+    client.post("/freights/batch", json={"operations": [{"op": "delete", "freight_ids": [ids[1]]}]}) # Core delete
+    client.patch(f"/freights/{ids[2]}/status", params={"status": "LOADING"})
+
+    changes = client.get("/sync/", params={"since": since}).json()
+    assert changes["version"] > since
+    assert sorted(changes["deleted"]["freights"]) == sorted(ids[:2])
+    assert [f["id"] for f in changes["freights"]] == [ids[2]]
+    assert changes["freights"][0]["status"] == "LOADING"
+
+    # Caught up: the next delta is empty
+    again = client.get("/sync/", params={"since": changes["version"]}).json()
+    assert again["version"] == changes["version"]
+    assert again["freights"] == [] and again["deleted"]["freights"] == []
+
+def test_list_etag(client, make_freight):
+    freight_id = make_freight()
+    tag = client.get("/freights/", params={"limit": 5}).headers["ETag"]
+    assert client.get("/freights/", params={"limit": 5}, headers={"If-None-Match": tag}).status_code == 304
+
+    client.patch(f"/freights/{freight_id}/status", params={"status": "RECRUITING"})
+    assert client.get("/freights/", params={"limit": 5}, headers={"If-None-Match": tag}).status_code == 200
@@ -0,0 +1,105 @@
+from concurrent.futures import Future
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import database, models
+from services import cache, events, sync, writer
+
+def _run(*units):
+    """Runs the units as one group; returns their futures."""
+    group = [(work, Future()) for work in units]
+    writer.WriteQueue()._run_group(group)
+    return [future for _, future in group]
+
+def test_failed_unit_rolls_back_alone(client, make_freight):
+    kept, failed = make_freight(), make_freight()
+
+    def add_transaction(db):
+        transaction = models.FinancialTransaction(type="EXPENSE", category="X", description="grupo",
+                                                  amount=1.0, date=datetime.now(), status="PAID")
+        db.add(transaction)
+        db.flush()
+        return transaction.id
+
+    def write_then_fail(db):
+        db.get(models.Freight, failed).status = "LOADING"
+        db.flush()
+        raise HTTPException(status_code=409, detail="conflict")
+
+    def set_status(db):
+        db.get(models.Freight, kept).status = "LOADING"
+        db.flush()
+        return kept
+
+    added, failing, updated = _run(add_transaction, write_then_fail, set_status)
+    with pytest.raises(HTTPException):
+        failing.result()
+    assert updated.result() == kept
+
+    db = database.ReadSessionLocal()
+    try:
+        assert db.get(models.FinancialTransaction, added.result()) is not None
+        assert db.get(models.Freight, failed).status == "QUOTED"
+        # The failed unit's sync version was rolled back with it, not reused
+        freight = db.get(models.Freight, kept)
+        assert freight.status == "LOADING"
+        assert freight.change_version == sync.current_version(db)
+    finally:
+        db.close()
+
+    changes = [e["data"].get("changes", {}) for e in client.get(f"/freights/{failed}/events").json()]
+    assert not any("status" in c for c in changes)
+
+def test_failed_unit_keeps_earlier_units_hooks(make_freight):
+    freight_id = make_freight()
+
+    def set_status(db):
+        db.get(models.Freight, freight_id).status = "RECRUITING"
+        db.flush()
+
+    def fail(db):
+        raise ValueError("no")
+
+    version = cache.dashboard_cache.version
+    _run(set_status, fail)
+    # The rollback of the second unit must not drop the cache flag of the first
+    assert cache.dashboard_cache.version > version
+
+def test_commit_hooks_see_the_committed_group(make_freight, monkeypatch):
+    freight_id = make_freight()
+    seen = []
+
+    def listener():
+        db = database.ReadSessionLocal()
+        try:
+            seen.append(db.get(models.Freight, freight_id).status)
+        finally:
+            db.close()
+    monkeypatch.setattr(events, "_listeners", [listener])
+
+    def set_status(db):
+        db.get(models.Freight, freight_id).status = "LOADING"
+        db.flush()
+
+    _run(set_status)
+    # Not when the unit's SAVEPOINT is released, before the group commits
+    assert seen == ["LOADING"]
+
+def test_group_with_only_failures_commits_nothing(make_freight):
+    freight_id = make_freight()
+
+    def fail(db):
+        db.get(models.Freight, freight_id).status = "IN_TRANSIT"
+        db.flush()
+        raise ValueError("no")
+
+    first, second = _run(fail, fail)
+    assert isinstance(first.exception(), ValueError) and isinstance(second.exception(), ValueError)
+
+    db = database.ReadSessionLocal()
+    try:
+        assert db.get(models.Freight, freight_id).status == "QUOTED"
+    finally:
+        db.close()
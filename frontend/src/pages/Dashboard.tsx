@@ -36,6 +36,23 @@ const Dashboard = () => {
 
     useEffect(() => {
         fetchStats();
+
+        // Live updates: full snapshot on connect, then only the changed parts
+        const source = new EventSource(`${API_URL}/dashboard/stream`);
+        source.addEventListener('snapshot', (event) => {
+            setStats(JSON.parse((event as MessageEvent).data));
+            setLoading(false);
+        });
+        source.addEventListener('delta', (event) => {
+            const delta = JSON.parse((event as MessageEvent).data);
+            setStats((prev: any) => prev ? {
+                ...prev,
+                ...delta,
+                kpis: { ...prev.kpis, ...(delta.kpis || {}) }
+            } : prev);
+        });
+
+        return () => source.close();
     }, []);
 
     const formatCurrency = (value: number) => {
@@ -22,7 +22,12 @@ interface Freight {
     valor_cliente: number;
     observation?: string;
     rejection_reason?: string;
-    delivery_photos?: string;
+    delivery_photos?: string; // legacy, before attachments
+    attachments?: {
+        id: number;
+        path: string;
+        thumb_path: string;
+    }[];
     driver_id?: number;
     driver?: {
         name: string;
@@ -75,7 +80,7 @@ const Freights = () => {
     const [isAssignModalOpen, setIsAssignModalOpen] = useState(false);
     const [isCalculatorOpen, setIsCalculatorOpen] = useState(false);
     const [isPhotosModalOpen, setIsPhotosModalOpen] = useState(false);
-    const [selectedPhotos, setSelectedPhotos] = useState<string[]>([]);
+    const [selectedPhotos, setSelectedPhotos] = useState<{ path: string; thumb: string }[]>([]);
     const [selectedFreightId, setSelectedFreightId] = useState<number | null>(null);
 
     // Form State
@@ -329,9 +334,12 @@ const Freights = () => {
         alert("Link copiado! Envie para o motorista.");
     };
 
-    const handleViewPhotos = (photosJson: string) => {
+    const handleViewPhotos = (freight: Freight) => {
         try {
-            const photos = JSON.parse(photosJson);
+            // Thumbnails in the grid; legacy freights only have full-size paths
+            const photos = freight.attachments && freight.attachments.length > 0
+                ? freight.attachments.map(a => ({ path: a.path, thumb: a.thumb_path }))
+                : (JSON.parse(freight.delivery_photos || '[]') as string[]).map(p => ({ path: p, thumb: p }));
             setSelectedPhotos(photos);
             setIsPhotosModalOpen(true);
         } catch (e) {
@@ -442,7 +450,7 @@ const Freights = () => {
                         onNotifyClient={() => notifyClient(freight)}
                         onAssign={() => openAssignModal(freight.id)}
                         onCopyLink={() => handleCopyDriverLink(freight.id)}
-                        onViewPhotos={() => handleViewPhotos(freight.delivery_photos || '[]')}
+                        onViewPhotos={() => handleViewPhotos(freight)}
                         onEdit={() => handleEdit(freight)}
                         onDelete={() => handleDelete(freight.id)}
                         hasPermission={hasPermission}
@@ -626,12 +634,13 @@ const Freights = () => {
                     {selectedPhotos.map((photo, idx) => (
                         <div key={idx} className="relative group rounded-lg overflow-hidden border border-slate-200">
                             <img
-                                src={`${API_URL}/${photo}`}
+                                src={`${API_URL}/${photo.thumb}`}
                                 alt={`Comprovante ${idx + 1}`}
+                                loading="lazy"
                                 className="w-full h-auto object-cover"
                             />
                             <a
-                                href={`${API_URL}/${photo}`}
+                                href={`${API_URL}/${photo.path}`}
                                 target="_blank"
                                 className="absolute inset-0 bg-black/50 flex items-center justify-center opacity-0 group-hover:opacity-100 transition text-white font-bold"
                             >
@@ -778,7 +787,7 @@ const FreightCard = ({ freight, isNotified, onWhatsApp, onNotifyClient, onAssign
                     </div>
                 )}
 
-                {freight.status === 'DELIVERED' && freight.delivery_photos && (
+                {freight.status === 'DELIVERED' && (freight.attachments?.length || freight.delivery_photos) && (
                     <button
                         onClick={onViewPhotos}
                         className="w-full mt-2 bg-green-100 hover:bg-green-200 text-green-700 text-xs font-bold py-2 rounded-lg flex items-center justify-center transition"
@@ -50,3 +50,14 @@ for f in freights:
 print("-" * 80)
 print(f"TOTAL CLIENTE (Dashboard): R$ {total_cliente:,.2f}")
 print(f"TOTAL MOTORISTA          : R$ {total_motorista:,.2f}")
+
+# Cross-check against the daily rollup the dashboard reads
+rollup_revenue, rollup_cost = session.query(
+    func.sum(models.FreightDailyRollup.revenue), func.sum(models.FreightDailyRollup.driver_cost)
+).filter(
+    models.FreightDailyRollup.day >= start_of_month.date(),
+    models.FreightDailyRollup.status_bucket.notin_(['REJECTED', 'QUOTED'])
+).one()
+
+print(f"TOTAL CLIENTE (Rollup)   : R$ {rollup_revenue or 0:,.2f}")
+print(f"TOTAL MOTORISTA (Rollup) : R$ {rollup_cost or 0:,.2f}")